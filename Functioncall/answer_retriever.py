@@ -4,11 +4,26 @@ CSV 파일에서 해당하는 답변들을 찾고 정리하여 반환하는 모
 """
 
 import os
+import re
 import sys
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.answer_cleaner import clean_answer
+from VectorStore.embedding_cache import normalize_text
+from VectorStore.token_counter import count_tokens
 
 _csv_data = None
+# 질문 ID -> 답변 / 정리된 답변 인덱스 (CSV 로드 시 한 번만 생성)
+_answer_index = None
+_cleaned_answer_index = None
+# 질문 ID -> 정리된 답변 토큰 수 인덱스
+_answer_token_index = None
+# 정규화된 질문 텍스트 -> 질문 ID 인덱스
+_question_index = None
+
 
 def load_csv_data(csv_path: str = None):
     """CSV 파일을 로드하여 전역 변수에 저장하는 함수"""
@@ -31,6 +46,125 @@ def load_csv_data(csv_path: str = None):
     return _csv_data
 
 
+def load_answer_index() -> Dict[int, str]:
+    """CSV 데이터를 질문 ID로 바로 찾을 수 있는 {ID: 답변} 딕셔너리로 한 번만 변환하여 반환하는 함수"""
+    global _answer_index
+    if _answer_index is None:
+        csv_data = load_csv_data()
+        if csv_data.empty:
+            _answer_index = {}
+        else:
+            _answer_index = dict(
+                zip(
+                    csv_data["ID"].astype(int).tolist(),
+                    csv_data["답변"].astype(str).tolist(),
+                )
+            )
+    return _answer_index
+
+
+def load_cleaned_answer_index() -> Dict[int, str]:
+    """{ID: 정리된 답변} 딕셔너리를 반환하는 함수
+
+    전처리 단계에서 저장된 "정리된_답변" 컬럼을 사용하고,
+    이전 형식의 CSV라면 로드 시 한 번만 정리하여 요청마다 정규식을 실행하지 않는다.
+    """
+    global _cleaned_answer_index
+    if _cleaned_answer_index is None:
+        csv_data = load_csv_data()
+        if csv_data.empty:
+            _cleaned_answer_index = {}
+        elif "정리된_답변" in csv_data.columns:
+            _cleaned_answer_index = dict(
+                zip(
+                    csv_data["ID"].astype(int).tolist(),
+                    csv_data["정리된_답변"].fillna("").astype(str).tolist(),
+                )
+            )
+        else:
+            _cleaned_answer_index = {
+                question_id: clean_answer(answer)
+                for question_id, answer in load_answer_index().items()
+            }
+    return _cleaned_answer_index
+
+
+def load_answer_token_index() -> Dict[int, int]:
+    """{ID: 정리된 답변 토큰 수} 딕셔너리를 반환하는 함수
+
+    전처리 단계에서 저장된 "답변_토큰수" 컬럼을 사용하고,
+    이전 형식의 CSV라면 로드 시 한 번만 토큰 수를 계산한다.
+    """
+    global _answer_token_index
+    if _answer_token_index is None:
+        csv_data = load_csv_data()
+        if csv_data.empty:
+            _answer_token_index = {}
+        elif "답변_토큰수" in csv_data.columns:
+            _answer_token_index = dict(
+                zip(
+                    csv_data["ID"].astype(int).tolist(),
+                    csv_data["답변_토큰수"].fillna(0).astype(int).tolist(),
+                )
+            )
+        else:
+            _answer_token_index = {
+                question_id: count_tokens(answer)
+                for question_id, answer in load_cleaned_answer_index().items()
+            }
+    return _answer_token_index
+
+
+def question_key(question: str) -> str:
+    """질문을 대소문자, 공백, 끝 문장부호 차이 없이 비교하기 위한 키를 만드는 함수"""
+    return normalize_text(question).lower().rstrip("?？.!~ ")
+
+
+def load_question_index() -> Dict[str, int]:
+    """{정규화된 질문: ID} 딕셔너리를 한 번만 만들어 반환하는 함수
+
+    "[가입절차] ..."처럼 앞에 붙은 태그를 뺀 질문으로도 찾을 수 있도록 두 가지 키를 모두 등록한다.
+    """
+    global _question_index
+    if _question_index is None:
+        csv_data = load_csv_data()
+        _question_index = {}
+        if not csv_data.empty:
+            for question_id, question in zip(
+                csv_data["ID"].astype(int).tolist(), csv_data["질문"].astype(str).tolist()
+            ):
+                for text in (question, re.sub(r"^\s*\[[^\[\]]+\]\s*", "", question)):
+                    key = question_key(text)
+                    if key:
+                        _question_index.setdefault(key, question_id)
+    return _question_index
+
+
+def find_question_id(question: str) -> Optional[int]:
+    """정규화했을 때 저장된 질문과 똑같은 질문의 ID를 반환하는 함수 (없으면 None)"""
+    return load_question_index().get(question_key(question))
+
+
+def _parse_question_id(question_id) -> Optional[int]:
+    """질문 ID를 정수로 변환하는 함수 (변환할 수 없으면 None)"""
+    try:
+        return int(question_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def lookup_answers(ids: List[str], cleaned: bool = False) -> List[Optional[str]]:
+    """질문 ID 리스트에 해당하는 답변(cleaned=True이면 정리된 답변)들을 한 번에 조회하여 입력 순서대로 반환하는 함수 (없는 ID는 None)"""
+    answer_index = load_cleaned_answer_index() if cleaned else load_answer_index()
+    return [answer_index.get(_parse_question_id(id_val)) for id_val in ids]
+
+
+def lookup_answer_tokens(ids: List[str]) -> List[Optional[int]]:
+    """질문 ID 리스트에 해당하는 정리된 답변의 토큰 수를 입력 순서대로 반환하는 함수 (없는 ID는 None)"""
+    token_index = load_answer_token_index()
+    return [token_index.get(_parse_question_id(id_val)) for id_val in ids]
+
+
 def extract_ids_from_results(results: Dict[str, Any]) -> List[str]:
     """ChromaDB 검색 결과에서 질문 ID값들을 추출하는 함수"""
     ids = []
@@ -43,122 +177,43 @@ def extract_ids_from_results(results: Dict[str, Any]) -> List[str]:
 def get_answers_by_ids(ids: List[str]) -> List[str]:
     """질문 ID 리스트를 기반으로 CSV 파일에서 해당하는 답변들을 검색하여 반환하는 함수"""
     answers = []
-    csv_data = load_csv_data()
-
-    if csv_data.empty:
+    if not load_answer_index():
         return answers
 
-    for id_val in ids:
-        try:
-            # ID로 해당 행 찾기
-            row = csv_data[csv_data["ID"] == int(id_val)]
-            if not row.empty:
-                answer = row.iloc[0]["답변"]
-                answers.append(str(answer))
-            else:
-                answers.append(f"ID {id_val}에 대한 답변을 찾을 수 없습니다.")
-        except (ValueError, KeyError) as e:
-            answers.append(f"ID {id_val} 처리 중 오류: {e}")
+    for id_val, answer in zip(ids, lookup_answers(ids)):
+        if answer is not None:
+            answers.append(answer)
+        elif _parse_question_id(id_val) is None:
+            answers.append(f"ID {id_val} 처리 중 오류: 잘못된 ID 형식입니다.")
+        else:
+            answers.append(f"ID {id_val}에 대한 답변을 찾을 수 없습니다.")
 
     return answers
 
 
-def clean_answer(answer: str) -> str:
-    """답변 텍스트에서 별점 평가, 도움말 관련 등 불필요한 내용을 제거하여 정리하는 함수"""
-    # 도움말 평가 관련 문구들 제거
-    patterns_to_remove = [
-        r"위 도움말이 도움이 되었나요\?.*?$",
-        r"별점.*?주세요.*?$",
-        r"평가해.*?주세요.*?$",
-        r"만족도.*?평가.*?$",
-        r"★.*?★.*?$",
-        r"⭐.*?⭐.*?$",
-        r"도움이.*?되었다면.*?$",
-        r"별점\d+점",
-        r"소중한 의견을 남겨주시면.*?$",
-        r"보완하도록 노력하겠습니다.*?$",
-        r"보내기\s*$",
-        r"도움말 닫기\s*$",
-        r"별점\s*\d+\s*점\s*",
-        r"^별점.*",
-        r".*별점.*점.*",
-        r"소중한.*의견.*",
-        r"보완.*노력.*",
-        r"^보내기$",
-        r"^도움말.*닫기$",
-    ]
-
-    import re
-
-    # 1. 정규식으로 패턴 제거
-    cleaned = answer
-    for pattern in patterns_to_remove:
-        cleaned = re.sub(pattern, "", cleaned, flags=re.MULTILINE | re.DOTALL)
-
-    # 2. 줄 단위로 불필요한 내용 제거
-    lines = cleaned.split("\n")
-    filtered_lines = []
-
-    unwanted_phrases = [
-        "별점1점",
-        "별점2점",
-        "별점3점",
-        "별점4점",
-        "별점5점",
-        "소중한 의견을 남겨주시면",
-        "보완하도록 노력하겠습니다",
-        "보내기",
-        "도움말 닫기",
-        "별점",
-        "★",
-        "⭐",
-        "위 도움말이 도움이 되었나요",
-        "평가",
-        "만족도",
-    ]
-
-    for line in lines:
-        line = line.strip()
-        # 빈 줄이거나 불필요한 구문이 포함된 줄 제거
-        if line and not any(phrase in line for phrase in unwanted_phrases):
-            filtered_lines.append(line)
-
-    # 3. 연속된 공백이나 줄바꿈 정리
-    cleaned = "\n".join(filtered_lines)
-    cleaned = re.sub(r"\n\s*\n", "\n", cleaned)
-    cleaned = cleaned.strip()
-
-    return cleaned
-
-
 def get_answers_from_retriever_results(results: Dict[str, Any]) -> str:
     """ChromaDB 검색 결과에서 질문 ID를 추출하여 해당 답변들을 찾고 정리된 형태로 반환하는 함수"""
     if not results.get("metadatas") or not results["metadatas"][0]:
         return "관련 답변을 찾을 수 없습니다."
 
-    csv_data = load_csv_data()
-    if csv_data.empty:
+    if not load_answer_index():
         return "답변 데이터를 로드할 수 없습니다."
 
+    question_ids = extract_ids_from_results(results)
     formatted_answers = []
 
-    for metadata in results["metadatas"][0]:
-        question_id = str(metadata.get("question_id", ""))
-
-        try:
-            # ID로 해당 행 찾기
-            row = csv_data[csv_data["ID"] == int(question_id)]
-            if not row.empty:
-                answer = str(row.iloc[0]["답변"])
-                # 답변 정리
-                cleaned_answer = clean_answer(answer)
-                formatted_answers.append(f"[ID: {question_id}] {cleaned_answer}")
-            else:
-                formatted_answers.append(
-                    f"[ID: {question_id}] 답변을 찾을 수 없습니다."
-                )
-        except (ValueError, KeyError) as e:
-            formatted_answers.append(f"[ID: {question_id}] 처리 중 오류: {e}")
+    # 전처리 단계에서 정리된 답변 사용
+    for question_id, answer in zip(
+        question_ids, lookup_answers(question_ids, cleaned=True)
+    ):
+        if answer is not None:
+            formatted_answers.append(f"[ID: {question_id}] {answer}")
+        elif _parse_question_id(question_id) is None:
+            formatted_answers.append(
+                f"[ID: {question_id}] 처리 중 오류: 잘못된 ID 형식입니다."
+            )
+        else:
+            formatted_answers.append(f"[ID: {question_id}] 답변을 찾을 수 없습니다.")
 
     return (
         "\n\n".join(formatted_answers)
@@ -171,3 +226,4 @@ def get_answers_from_retriever_results(results: Dict[str, Any]) -> str:
 if __name__ == "__main__":
     csv_data = load_csv_data()
     print(f"CSV 데이터 로드 완료: {len(csv_data)}개 행")
+    print(f"답변 인덱스 생성 완료: {len(load_answer_index())}개 ID")
@@ -3,73 +3,343 @@
 적절한 카테고리별 검색 함수를 실행하고 답변을 반환하는 메인 함수
 """
 
+import asyncio
 import os
 import sys
 import time
+from collections import Counter
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 
-from available_functions import update_available_functions, all_functions
-from function_to_call import tool_call_function
-from prompt.system_setup import SYSTEM_SETUP, FALLBACK_PROMPT
+from available_functions import all_functions, available_functions, routing_system_prompt
+from chat_history import compact_history, history_stats, schedule_history_summary
+from conversation_store import assign_message_ids, conversation_store
+from function_to_call import parse_search_tool_call, tool_call_function
+from local_router import local_route
+from operation_function import (
+    build_category_prompt,
+    llm_response,
+    find_exact_faq,
+    find_near_faq,
+    llm_response_stream,
+    lookup_cached_answer,
+    merge_category_contexts,
+    prompt_stats,
+    retrieve_category_context,
+    semantic_cache_stats,
+    store_cached_answer,
+)
+from prompt.system_setup import FALLBACK_PROMPT
+from VectorStore.retriever import (
+    INDEX_LAYOUT,
+    chroma_executor,
+    embedding_cache_stats,
+    query_cache_stats,
+)
 
 load_dotenv()
-client = OpenAI()
+client = AsyncOpenAI()
 
+# 한 질문에서 여러 검색 함수가 호출될 때 동시에 실행할 최대 개수
+TOOL_CALL_CONCURRENCY = int(os.getenv("TOOL_CALL_CONCURRENCY", "4"))
 
-def ask_gpt_functioncall(query, chat_history=None):
-    """사용자 질문을 받아 GPT 함수 호출을 통해 적절한 카테고리별 검색 함수를 실행하고 답변을 반환하는 메인 함수"""
-    try:
-        start_time = time.time()
-        messages = [
-            {"role": "system", "content": SYSTEM_SETUP},
+# 답변 경로별 요청 수 (GET /metrics)
+request_metrics = Counter()
+# OpenAI 호출 프롬프트 토큰 중 프롬프트 캐시에서 처리된 토큰 수 (GET /metrics)
+usage_metrics = Counter()
+
+
+def _answer_path(routed):
+    """요청이 어떤 경로로 답변되었는지를 지표 이름으로 반환하는 함수"""
+    if routed["faq"]:
+        return f"faq_{routed['faq']['reason']}"
+    if routed["cached"]:
+        return "semantic_cache"
+    if routed["contexts"]:
+        return "generated"
+    return "no_context" if routed["tool_called"] else "fallback"
+
+
+async def get_metrics():
+    """요청 경로별 횟수, FAQ 바로 응답 비율, 캐시 통계를 반환하는 함수"""
+    loop = asyncio.get_running_loop()
+    conversations = await loop.run_in_executor(chroma_executor, conversation_store.stats)
+    # 임베딩 캐시 통계는 SQLite 쓰기와 같은 잠금을 사용하므로 이벤트 루프 밖에서 읽는다
+    embedding_cache = await loop.run_in_executor(chroma_executor, embedding_cache_stats)
+    total = request_metrics["requests"]
+    short_circuited = request_metrics["faq_exact"] + request_metrics["faq_distance"]
+    return {
+        "requests": dict(request_metrics),
+        "faq_short_circuit_rate": short_circuited / total if total else 0.0,
+        "semantic_cache": semantic_cache_stats(),
+        "prompt_cache": prompt_cache_stats(),
+        "prompt": prompt_stats(),
+        "chat_history": history_stats(),
+        "conversations": conversations,
+        "query_embedding_cache": query_cache_stats(),
+        "embedding_cache": embedding_cache,
+    }
+
+
+def prompt_cache_stats():
+    """OpenAI 호출 수, 프롬프트 토큰 합계, 그중 프롬프트 캐시 적중 토큰 수와 비율을 반환하는 함수"""
+    prompt_tokens = usage_metrics["prompt_tokens"]
+    return {
+        "calls": usage_metrics["calls"],
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": usage_metrics["cached_tokens"],
+        "cached_ratio": usage_metrics["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0,
+    }
+
+
+def _short_circuit_info(routed):
+    """FAQ 바로 응답 정보를 응답 메타데이터 형태로 반환하는 함수 (해당 없으면 None)"""
+    faq_hit = routed["faq"]
+    if not faq_hit:
+        return None
+    return {
+        "reason": faq_hit["reason"],
+        "question_id": faq_hit["question_id"],
+        "distance": faq_hit["distance"],
+    }
+
+
+def build_routing_messages(query, chat_history=None):
+    """시스템 프롬프트, 채팅 기록, 사용자 질문으로 function call 요청 메시지를 만드는 함수
+
+    함수 정의와 시스템 프롬프트는 요청마다 같은 접두사가 되어 프롬프트 캐시가 적용되므로,
+    요청마다 바뀌는 채팅 기록과 질문은 항상 그 뒤에 붙인다.
+    """
+    messages = [
+        {"role": "system", "content": routing_system_prompt},
+    ]
+
+    # 멀티턴 지원: 최근 턴 + 이전 대화 요약으로 줄인 채팅 기록 추가
+    messages.extend(compact_history(chat_history))
+
+    messages.append({"role": "user", "content": query})
+    return messages
+
+
+async def route_query(messages, tools=None):
+    """GPT function call로 질문에 맞는 카테고리 검색 함수를 고르는 함수 (tools를 주지 않으면 ROUTING_MODE의 함수 목록 사용)"""
+    tools = tools or all_functions
+
+    return await client.chat.completions.create(
+        model="gpt-4o",
+        messages=messages,
+        temperature=0.0,
+        tools=tools,
+        tool_choice="auto",  # default: "auto"
+    )
+
+
+async def gather_tool_call_contexts(tool_calls, query):
+    """여러 검색 함수 호출을 최대 TOOL_CALL_CONCURRENCY개씩 동시에 실행하고 검색 컨텍스트 목록을 반환하는 함수"""
+    semaphore = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
+
+    async def run(tool_call):
+        async with semaphore:
+            return await tool_call_function(tool_call, available_functions, query)
+
+    results = await asyncio.gather(
+        *(run(tool_call) for tool_call in tool_calls), return_exceptions=True
+    )
+
+    contexts = []
+    for tool_call, result in zip(tool_calls, results):
+        if isinstance(result, Exception):
+            print(f"{tool_call.function.name} 검색 에러: {result}")
+        elif result is not None:
+            contexts.append(result)
+    return contexts
+
+
+def _elapsed_ms(since):
+    """perf_counter 기준 경과 시간을 ms 단위로 반환하는 함수"""
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+def _tool_call_targets(tool_calls):
+    """검색 함수 호출 목록에서 (함수 이름, 컬렉션 이름) 목록을 뽑는 함수 (파싱할 수 없는 호출은 제외)"""
+    targets = []
+    for tool_call in tool_calls:
+        try:
+            parsed = parse_search_tool_call(tool_call)
+        except Exception:
+            parsed = None
+        if parsed:
+            targets.append((parsed[0], parsed[1]))
+    return targets
+
+
+async def route_and_retrieve(query, chat_history=None, timings=None):
+    """질문의 카테고리를 정하고 검색까지 실행하는 함수
+
+    첫 질문 중 로컬 라우터가 확실하게 판단한 질문은 GPT 라우팅 호출 없이 바로 검색하고,
+    애매한 질문과 이전 대화가 있는 질문은 채팅 기록과 함께 GPT function call로 라우팅한다.
+    같은 카테고리에서 비슷한 질문에 답한 적이 있으면 검색 없이 캐시된 답변(cached)을 반환한다.
+    저장된 FAQ 질문과 같거나 거의 같은 첫 질문이면 그 FAQ의 답변(faq)을 함께 반환한다.
+    """
+    timings = timings if timings is not None else {}
+    routing_start = time.perf_counter()
+
+    # 저장된 FAQ 질문과 똑같은 첫 질문은 라우팅/검색/생성 없이 바로 답변
+    # (이어지는 질문은 같은 문장이라도 이전 대화에 따라 뜻이 달라질 수 있으므로 답변을 생성한다)
+    faq_hit = None if chat_history else find_exact_faq(query)
+    if faq_hit:
+        timings["routing_ms"] = _elapsed_ms(routing_start)
+        return {
+            "source": "faq",
+            "tool_called": True,
+            "targets": [],
+            "contexts": [],
+            "usage": None,
+            "cached": None,
+            "faq": faq_hit,
+        }
+
+    # 이어지는 질문("그럼 반품은요?")은 이전 대화를 봐야 카테고리를 알 수 있으므로 첫 질문만 로컬 라우터를 사용한다
+    local_decision = None if chat_history else await local_route(query)
+    if local_decision:
+        source, usage, tool_calls = "local", None, []
+        targets = [(local_decision["function"], local_decision["collection"])]
+    else:
+        response = await route_query(build_routing_messages(query, chat_history))
+        source, usage = "llm", response.usage
+        tool_calls = response.choices[0].message.tool_calls or []
+        targets = _tool_call_targets(tool_calls)
+    timings["routing_ms"] = _elapsed_ms(routing_start)
+
+    routed = {
+        "source": source,
+        "tool_called": bool(local_decision or tool_calls),
+        "targets": targets,
+        "contexts": [],
+        "usage": usage,
+        "cached": None,
+        "faq": None,
+    }
+
+    # 이전 대화에 따라 뜻이 달라질 수 있으므로 첫 질문만 캐시를 사용한다
+    if not chat_history:
+        cached = await lookup_cached_answer(
+            [collection for _, collection in targets], query
+        )
+        if cached:
+            routed["cached"] = cached
+            return routed
+
+    retrieval_start = time.perf_counter()
+    if local_decision:
+        search_function = available_functions[local_decision["function"]]
+        routed["contexts"] = [await search_function(text=query)]
+    elif INDEX_LAYOUT == "unified" and len(targets) > 1:
+        # 통합 컬렉션에서는 여러 카테고리를 카테고리 필터 한 번의 검색으로 처리
+        routed["contexts"] = [
+            await retrieve_category_context(
+                [collection for _, collection in targets], query
+            )
         ]
+    else:
+        routed["contexts"] = await gather_tool_call_contexts(tool_calls, query)
+    if routed["tool_called"]:
+        timings["retrieval_ms"] = _elapsed_ms(retrieval_start)
 
-        # 멀티턴 지원: 채팅 기록 추가
-        if chat_history:
-            messages.extend(chat_history)
+    # 검색된 FAQ 질문과 거의 같은 첫 질문이면 생성 없이 그 답변을 사용
+    routed["faq"] = None if chat_history else find_near_faq(routed["contexts"])
+    return routed
 
-        messages.append({"role": "user", "content": query})
 
-        tools = all_functions
+async def load_chat_history(chat_history=None, session_id=None):
+    """세션 ID가 있으면 서버에 저장된 대화 기록을, 없으면 클라이언트가 보낸 채팅 기록을 반환하는 함수
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0.0,
-            tools=tools,
-            tool_choice="auto",  # default: "auto"
+    대화 저장소 조회(SQLite일 수 있음)는 이벤트 루프를 막지 않도록 전용 스레드 풀에서 실행한다.
+    """
+    if session_id:
+        return await asyncio.get_running_loop().run_in_executor(
+            chroma_executor, conversation_store.get, session_id
         )
+    return chat_history
 
-        response_message = response.choices[0].message
-        usage = response.usage
-        messages.append(response_message)
 
-        tool_calls = response_message.tool_calls
-        end_time = time.time()
-        
+async def finish_turn(chat_history, session_id, query, answer):
+    """답변을 보낸 뒤 세션 대화 기록에 한 턴을 덧붙이고, 밀려날 이전 대화의 요약을 예약하는 함수"""
+    turn = [{"role": "user", "content": query}, {"role": "assistant", "content": answer}]
+    if session_id:
+        # 저장소와 요약이 같은 메시지 ID를 쓰도록 ID를 먼저 붙인다
+        turn = assign_message_ids(turn)
+        await asyncio.get_running_loop().run_in_executor(
+            chroma_executor, conversation_store.append, session_id, turn
+        )
+    schedule_history_summary(chat_history, turn)
 
-        if tool_calls:
-            available_functions = update_available_functions()
 
-            for tool_call in tool_calls:
-                tool_call_reponse = tool_call_function(tool_call, available_functions)
-            
+async def delete_chat_history(session_id):
+    """세션의 저장된 대화 기록을 지우는 함수 (대화 저장소 호출은 전용 스레드 풀에서 실행)"""
+    await asyncio.get_running_loop().run_in_executor(
+        chroma_executor, conversation_store.delete, session_id
+    )
+
+
+async def cache_generated_answer(query, chat_history, routed, answer):
+    """첫 질문에 대해 생성한 답변을 라우팅된 카테고리 조합의 시맨틱 캐시에 저장하는 함수"""
+    if chat_history or not routed["contexts"]:
+        return
+    await store_cached_answer(
+        [collection for _, collection in routed["targets"]], query, answer
+    )
+
+
+async def ask_gpt_functioncall(query, chat_history=None, session_id=None):
+    """사용자 질문을 받아 GPT 함수 호출을 통해 적절한 카테고리별 검색 함수를 실행하고 답변을 반환하는 메인 함수
+
+    session_id를 주면 chat_history 대신 서버에 저장된 대화 기록을 사용하고 이번 턴을 덧붙인다.
+    """
+    try:
+        start_time = time.time()
+        chat_history = await load_chat_history(chat_history, session_id)
+        routed = await route_and_retrieve(query, chat_history)
+        usage_total = _empty_usage()
+        _add_usage(usage_total, routed["usage"])
+        contexts = routed["contexts"]
+        prompt_info = None
+
+        request_metrics["requests"] += 1
+        request_metrics[_answer_path(routed)] += 1
+
+        if routed["tool_called"]:
+            if routed["faq"]:
+                tool_call_reponse = routed["faq"]["answer"]
+            elif routed["cached"]:
+                tool_call_reponse = routed["cached"]["answer"]
+            # 검색 결과를 합쳐 답변은 한 번만 생성
+            elif contexts:
+                context = merge_category_contexts(contexts)
+                prompt, text, prompt_info = build_category_prompt(query, context)
+                tool_call_reponse, generation_usage = await llm_response(text, prompt)
+                _add_usage(usage_total, generation_usage)
+                await cache_generated_answer(query, chat_history, routed, tool_call_reponse)
+            else:
+                tool_call_reponse = "관련 답변을 찾을 수 없습니다."
+            await finish_turn(chat_history, session_id, query, tool_call_reponse)
+
+            end_time = time.time()
             processing_time = end_time - start_time
             return {
                 "response": tool_call_reponse,
-                "usage": {
-                    "prompt_tokens": usage.prompt_tokens if usage else 0,
-                    "completion_tokens": usage.completion_tokens if usage else 0,
-                    "total_tokens": usage.total_tokens if usage else 0,
-                },
+                "usage": usage_total,
                 "time": processing_time,
+                "route": routed["source"],
+                "cached": routed["cached"] is not None,
+                "short_circuit": _short_circuit_info(routed),
+                "prompt": prompt_info,
             }
         
         else:
-            fallback_response = client.chat.completions.create(
+            fallback_response = await client.chat.completions.create(
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": FALLBACK_PROMPT},
@@ -80,28 +350,182 @@ def ask_gpt_functioncall(query, chat_history=None):
             
             end_time = time.time()  # 실제 종료 시간으로 업데이트
             processing_time = end_time - start_time
-            fallback_usage = fallback_response.usage
+            _add_usage(usage_total, fallback_response.usage)
+            fallback_text = fallback_response.choices[0].message.content
+            await finish_turn(chat_history, session_id, query, fallback_text)
             
             return {
-                "response": fallback_response.choices[0].message.content,
-                "usage": {
-                    "prompt_tokens": fallback_usage.prompt_tokens if fallback_usage else 0,
-                    "completion_tokens": fallback_usage.completion_tokens if fallback_usage else 0,
-                    "total_tokens": fallback_usage.total_tokens if fallback_usage else 0,
-                },
+                "response": fallback_text,
+                "usage": usage_total,
                 "time": processing_time,
+                "route": "fallback",
+                "cached": False,
+                "short_circuit": None,
+                "prompt": None,
             }
 
     except Exception as e:
+        request_metrics["errors"] += 1
         return {
             "response": f"죄송합니다. 처리 중 오류가 발생했습니다: {str(e)}",
-            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            "usage": _empty_usage(),
             "time": 0,
         }
 
 
+def _empty_usage():
+    return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+
+
+def _add_usage(total, usage):
+    """한 요청 중 여러 번의 API 호출 토큰 사용량을 합산하고 프롬프트 캐시 지표에 기록하는 함수
+
+    cached_tokens는 프롬프트 토큰 중 프로바이더의 프롬프트 접두사 캐시로 처리된 토큰 수이다.
+    """
+    if usage:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        total["prompt_tokens"] += usage.prompt_tokens or 0
+        total["completion_tokens"] += usage.completion_tokens or 0
+        total["total_tokens"] += usage.total_tokens or 0
+        total["cached_tokens"] += cached_tokens
+
+        usage_metrics["calls"] += 1
+        usage_metrics["prompt_tokens"] += usage.prompt_tokens or 0
+        usage_metrics["cached_tokens"] += cached_tokens
+
+
+async def stream_gpt_functioncall(query, chat_history=None, session_id=None):
+    """ask_gpt_functioncall의 스트리밍 버전
+
+    (이벤트 이름, 데이터) 튜플을 순서대로 내보내는 비동기 제너레이터로,
+    라우팅 결과(route)와 검색된 FAQ 질문(retrieval)을 먼저 보내고
+    생성되는 답변을 토큰 단위(token)로 보낸 뒤 사용량과 단계별 소요 시간(done)을 보낸다.
+    session_id를 주면 chat_history 대신 서버에 저장된 대화 기록을 사용하고 이번 턴을 덧붙인다.
+    """
+    start_time = time.perf_counter()
+    timings = {}
+    usage_total = _empty_usage()
+    prompt_info = None
+
+    try:
+        chat_history = await load_chat_history(chat_history, session_id)
+        routed = await route_and_retrieve(query, chat_history, timings)
+        _add_usage(usage_total, routed["usage"])
+        contexts = routed["contexts"]
+        request_metrics["requests"] += 1
+        request_metrics[_answer_path(routed)] += 1
+
+        if routed["faq"]:
+            # 저장된 FAQ와 거의 같은 질문: 정리된 답변을 그대로 보낸다
+            faq_hit = routed["faq"]
+            for function_name, collection_name in routed["targets"] or [(None, None)]:
+                yield "route", {
+                    "function": function_name,
+                    "collection": collection_name,
+                    "source": routed["source"],
+                }
+            yield "retrieval", {
+                "questions": [{"id": faq_hit["question_id"], "question": faq_hit["question"]}]
+            }
+            yield "token", {"text": faq_hit["answer"]}
+            await finish_turn(chat_history, session_id, query, faq_hit["answer"])
+            timings["total_ms"] = _elapsed_ms(start_time)
+            yield "done", {
+                "usage": usage_total,
+                "timings": timings,
+                "cached": None,
+                "short_circuit": _short_circuit_info(routed),
+            }
+            return
+
+        if routed["cached"]:
+            # 비슷한 질문에 생성했던 답변을 그대로 보낸다
+            for function_name, collection_name in routed["targets"]:
+                yield "route", {
+                    "function": function_name,
+                    "collection": collection_name,
+                    "source": routed["source"],
+                }
+            yield "token", {"text": routed["cached"]["answer"]}
+            await finish_turn(chat_history, session_id, query, routed["cached"]["answer"])
+            timings["total_ms"] = _elapsed_ms(start_time)
+            yield "done", {
+                "usage": usage_total,
+                "timings": timings,
+                "cached": {
+                    "question": routed["cached"]["question"],
+                    "similarity": routed["cached"]["similarity"],
+                },
+                "short_circuit": None,
+            }
+            return
+
+        if contexts:
+            for function_name, collection_name in routed["targets"]:
+                yield "route", {
+                    "function": function_name,
+                    "collection": collection_name,
+                    "source": routed["source"],
+                }
+
+            context = merge_category_contexts(contexts)
+            metadatas = (context["results"].get("metadatas") or [[]])[0]
+            yield "retrieval", {
+                "questions": [
+                    {"id": metadata.get("question_id"), "question": metadata.get("question")}
+                    for metadata in metadatas
+                ]
+            }
+            prompt, text, prompt_info = build_category_prompt(query, context)
+        elif routed["tool_called"]:
+            # 검색 함수가 호출되었지만 모든 검색이 실패한 경우
+            yield "token", {"text": "관련 답변을 찾을 수 없습니다."}
+            await finish_turn(chat_history, session_id, query, "관련 답변을 찾을 수 없습니다.")
+            timings["total_ms"] = _elapsed_ms(start_time)
+            yield "done", {
+                "usage": usage_total,
+                "timings": timings,
+                "cached": None,
+                "short_circuit": None,
+            }
+            return
+        else:
+            # 카테고리에 해당하지 않는 질문은 폴백 프롬프트로 답변
+            yield "route", {"function": None, "collection": None, "source": "fallback"}
+            text, prompt = query, FALLBACK_PROMPT
+
+        generation_start = time.perf_counter()
+        answer_parts = []
+        async for kind, value in llm_response_stream(text, prompt):
+            if kind == "token":
+                if "first_token_ms" not in timings:
+                    timings["first_token_ms"] = _elapsed_ms(start_time)
+                answer_parts.append(value)
+                yield "token", {"text": value}
+            else:
+                _add_usage(usage_total, value)
+        timings["generation_ms"] = _elapsed_ms(generation_start)
+        timings["total_ms"] = _elapsed_ms(start_time)
+
+        answer = "".join(answer_parts)
+        await cache_generated_answer(query, chat_history, routed, answer)
+        await finish_turn(chat_history, session_id, query, answer)
+        yield "done", {
+            "usage": usage_total,
+            "timings": timings,
+            "cached": None,
+            "short_circuit": None,
+            "prompt": prompt_info,
+        }
+
+    except Exception as e:
+        request_metrics["errors"] += 1
+        yield "error", {"message": f"죄송합니다. 처리 중 오류가 발생했습니다: {str(e)}"}
+
+
 if __name__ == "__main__":
     # query = "판매자 계정 생성 방법을 알려줘"
     query = "안녕"
-    response = ask_gpt_functioncall(query)
+    response = asyncio.run(ask_gpt_functioncall(query))
     print(response)
@@ -6,7 +6,12 @@ OpenAI 함수 호출에 사용할 함수 목록과
 import os
 import sys
 
-from function_description import Function_Description
+from function_description import (
+    FAQ_SEARCH_FUNCTION,
+    Compact_Function_Description,
+    Function_Description,
+)
+from prompt.system_setup import COMPACT_SYSTEM_SETUP, SYSTEM_SETUP
 
 from operation_function import (
     account_seller_management_function,
@@ -15,17 +20,32 @@ from operation_function import (
     operation_logistics_management_function,
     analytics_ai_tools_function,
     general_inquiry_function,
+    faq_search_function,
 )
 
 # from functools import partial
 
-all_functions = Function_Description
+# GPT 라우팅 방식
+# full: 카테고리별 검색 함수 6개 (함수 설명마다 질문 예시 포함)
+# compact: faq_search 함수 하나(category enum + 질문) + 시스템 프롬프트의 카테고리 요약 (요청마다 보내는 토큰이 적다)
+# compact는 라벨된 질문으로 라우팅 정확도를 확인한 뒤(benchmarks/bench_routing_schema.py --samples N) 사용한다
+ROUTING_MODE = os.getenv("ROUTING_MODE", "full")
+
+if ROUTING_MODE == "compact":
+    all_functions = Compact_Function_Description
+    routing_system_prompt = COMPACT_SYSTEM_SETUP
+else:
+    all_functions = Function_Description
+    routing_system_prompt = SYSTEM_SETUP
 
 
 # function이 실행될때 어떤 기능 함수가 실행될지 정하는 함수
 def update_available_functions():
-    """함수 설명에서 함수명을 추출하여 실제 실행할 함수들과 매핑하는 딕셔너리를 생성하는 함수"""
-    functions = all_functions
+    """함수 설명에서 함수명을 추출하여 실제 실행할 함수들과 매핑하는 딕셔너리를 생성하는 함수
+
+    로컬 라우터는 라우팅 방식과 관계없이 카테고리별 검색 함수 이름을 고르므로 두 방식의 함수를 모두 매핑한다.
+    """
+    functions = Function_Description + Compact_Function_Description
     available_functions = {}
     for function in functions:
         function_name = function["function"]["name"]
@@ -48,4 +68,10 @@ def update_available_functions():
         elif function_name == "general_inquiry_search":
             available_functions[function_name] = general_inquiry_function
 
+        elif function_name == FAQ_SEARCH_FUNCTION:
+            available_functions[function_name] = faq_search_function
+
     return available_functions
+
+
+available_functions = update_available_functions()
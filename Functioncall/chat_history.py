@@ -0,0 +1,197 @@
+"""
+멀티턴 질문의 채팅 기록을 일정한 크기로 유지하는 모듈
+최근 HISTORY_MAX_TURNS턴은 그대로 두고 그보다 오래된 대화는 누적 요약 하나로 접어 라우팅 요청에 넣는다.
+요약은 답변을 보낸 뒤 백그라운드에서 만들어 두므로 요청 처리 중에는 요약을 기다리지 않는다.
+대화 저장소가 붙인 메시지 ID가 있으면 요약을 마지막 메시지 ID로 찾으므로, 저장소가 앞부분을 잘라내도 요약이 유지된다
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from VectorStore.lru_cache import LRUTTLCache
+from VectorStore.token_counter import truncate_tokens
+from prompt.system_setup import HISTORY_SUMMARY_PROMPT
+
+load_dotenv()
+
+
+client = AsyncOpenAI()
+
+# 그대로 보낼 최근 대화 턴 수 (사용자 질문 + 챗봇 답변이 한 턴)
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "3"))
+# false이면 최근 턴만 보내고 오래된 대화는 버린다
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "true").lower() == "true"
+HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "300"))
+# 요약할 때 메시지 하나에서 사용할 최대 토큰 수 (긴 답변 전체를 요약 모델에 보내지 않도록)
+HISTORY_MESSAGE_MAX_TOKENS = int(os.getenv("HISTORY_MESSAGE_MAX_TOKENS", "400"))
+
+# 오래된 대화 메시지(접두사)의 마지막 메시지 ID 또는 해시 -> 요약
+summary_cache = LRUTTLCache(
+    max_size=int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("HISTORY_SUMMARY_TTL", "86400")),
+)
+
+_ROLES = ("user", "assistant")
+# 요약 중인 접두사 해시 -> 작업 (같은 요약을 두 번 만들지 않고, 작업이 가비지 컬렉션되지 않도록 참조를 유지)
+_pending: Dict[str, asyncio.Task] = {}
+history_metrics = Counter()
+
+
+def clean_history(chat_history) -> List[Dict[str, str]]:
+    """채팅 기록에서 내용이 있는 user/assistant 메시지의 role, content(와 저장소 메시지 ID)만 남기는 함수 (tokens, time 같은 클라이언트 필드 제거)"""
+    messages = []
+    for message in chat_history or []:
+        if not isinstance(message, dict) or message.get("role") not in _ROLES:
+            continue
+        content = message.get("content")
+        if isinstance(content, str) and content.strip():
+            cleaned = {"role": message["role"], "content": content}
+            if isinstance(message.get("id"), str):
+                cleaned["id"] = message["id"]
+            messages.append(cleaned)
+    return messages
+
+
+def _api_messages(messages) -> List[Dict[str, str]]:
+    """OpenAI 요청에 넣을 수 있도록 메시지 ID를 뺀 role, content만 남기는 함수"""
+    return [{"role": message["role"], "content": message["content"]} for message in messages]
+
+
+def split_history(messages, max_turns) -> Tuple[list, list]:
+    """메시지를 (오래된 메시지, 최근 max_turns턴 메시지)로 나누는 함수 (턴은 user 메시지에서 시작)"""
+    starts = [i for i, message in enumerate(messages) if message["role"] == "user"]
+    if len(starts) <= max_turns:
+        return [], messages
+    cut = starts[-max_turns] if max_turns > 0 else len(messages)
+    return messages[:cut], messages[cut:]
+
+
+def _prefix_keys(messages) -> List[str]:
+    """keys[n] = 앞 n개 메시지의 키인 목록을 만드는 함수
+
+    n번째 메시지에 저장소 메시지 ID가 있으면 그 ID를 키로 쓰고 (앞부분이 잘려도 같은 키),
+    없으면(클라이언트가 보낸 채팅 기록) 메시지를 앞에서부터 누적 해시한 값을 쓴다.
+    """
+    digest = hashlib.sha1()
+    keys = [digest.hexdigest()]
+    for message in messages:
+        digest.update(json.dumps(message, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        keys.append(f"id:{message['id']}" if "id" in message else digest.hexdigest())
+    return keys
+
+
+def _latest_summary(messages, keys) -> Tuple[int, Optional[str]]:
+    """턴 경계 중 요약이 있는 가장 긴 접두사의 (메시지 수, 요약)을 찾는 함수 (없으면 (0, None))"""
+    boundaries = [len(messages)] + [
+        i for i in range(len(messages) - 1, 0, -1) if messages[i]["role"] == "user"
+    ]
+    for length in boundaries:
+        summary = summary_cache.get(keys[length])
+        if summary:
+            return length, summary
+    return 0, None
+
+
+def compact_history(chat_history) -> List[Dict[str, str]]:
+    """라우팅 요청에 넣을 채팅 기록을 만드는 함수
+
+    최근 HISTORY_MAX_TURNS턴은 그대로, 그 이전 대화는 백그라운드에서 만들어 둔 요약 메시지 하나로 바꾼다.
+    요약이 아직 따라잡지 못한 턴은 HISTORY_MAX_TURNS턴까지만 그대로 넣고 나머지는 버린다.
+    """
+    messages = clean_history(chat_history)
+    older, recent = split_history(messages, HISTORY_MAX_TURNS)
+    if not older or not HISTORY_SUMMARY_ENABLED:
+        return _api_messages(recent)
+
+    length, summary = _latest_summary(older, _prefix_keys(older))
+    _, unsummarized = split_history(older[length:], HISTORY_MAX_TURNS)
+    history_metrics["compacted"] += 1
+    history_metrics["dropped_messages"] += len(older) - length - len(unsummarized)
+
+    compacted = []
+    if summary:
+        compacted.append({"role": "system", "content": f"이전 대화 요약:\n{summary}"})
+    return compacted + _api_messages(unsummarized + recent)
+
+
+def _format_messages(messages) -> str:
+    lines = []
+    for message in messages:
+        speaker = "사용자" if message["role"] == "user" else "챗봇"
+        content = truncate_tokens(message["content"], HISTORY_MESSAGE_MAX_TOKENS)
+        lines.append(f"{speaker}: {content}")
+    return "\n".join(lines)
+
+
+async def summarize_messages(previous_summary, messages) -> str:
+    """이전 요약에 새 메시지들을 합쳐 새 누적 요약을 만드는 함수"""
+    response = await client.chat.completions.create(
+        model=HISTORY_SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": HISTORY_SUMMARY_PROMPT},
+            {
+                "role": "user",
+                "content": f"이전 요약:\n{previous_summary or '없음'}\n\n새 대화:\n{_format_messages(messages)}",
+            },
+        ],
+        max_tokens=HISTORY_SUMMARY_MAX_TOKENS,
+        temperature=0.0,
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def _summarize_prefix(older, keys):
+    """오래된 대화를 가장 최근 요약에 이어 요약하여 캐시에 저장하는 함수"""
+    key = keys[len(older)]
+    try:
+        length, summary = _latest_summary(older, keys)
+        summary_cache.set(key, await summarize_messages(summary, older[length:]))
+        history_metrics["summaries"] += 1
+    except Exception as e:
+        history_metrics["summary_errors"] += 1
+        print(f"채팅 기록 요약 에러: {e}")
+    finally:
+        _pending.pop(key, None)
+
+
+def schedule_history_summary(chat_history, turn) -> None:
+    """한 턴이 끝난 뒤, 다음 요청에서 최근 턴 밖으로 밀려날 대화를 백그라운드에서 미리 요약하는 함수
+
+    turn은 이번 턴의 질문/답변 메시지이며, 대화 저장소에 덧붙였다면 저장소가 붙인 메시지 ID를 포함한다.
+    """
+    if not HISTORY_SUMMARY_ENABLED or not turn[-1]["content"]:
+        return
+    messages = clean_history(chat_history) + clean_history(turn)
+    older, _ = split_history(messages, HISTORY_MAX_TURNS)
+    if not older:
+        return
+
+    keys = _prefix_keys(older)
+    key = keys[len(older)]
+    if key in _pending or summary_cache.get(key):
+        return
+    _pending[key] = asyncio.get_running_loop().create_task(_summarize_prefix(older, keys))
+
+
+def history_stats():
+    """기록을 줄인 요청 수, 버린 메시지 수, 만든 요약 수, 진행 중인 요약 수와 요약 캐시 통계를 반환하는 함수"""
+    return {
+        "compacted_requests": history_metrics["compacted"],
+        "dropped_messages": history_metrics["dropped_messages"],
+        "summaries": history_metrics["summaries"],
+        "summary_errors": history_metrics["summary_errors"],
+        "pending_summaries": len(_pending),
+        "summary_cache": summary_cache.stats(),
+    }
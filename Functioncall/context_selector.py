@@ -0,0 +1,100 @@
+"""
+검색 결과를 프롬프트에 넣기 전에 정리하는 모듈
+같은(또는 거의 같은) 답변을 가진 질문은 하나로 합치고, 더 많은 후보 중에서
+MMR(maximal marginal relevance)로 관련도가 높으면서 서로 다른 답변을 가진 질문 k개를 고른다
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+@lru_cache(maxsize=8192)
+def answer_shingles(answer: Optional[str]) -> frozenset:
+    """답변을 비교하기 위한 문자 3-gram 집합을 만드는 함수 (공백/문장부호/대소문자 차이는 무시)
+
+    답변은 CSV 로드 후 바뀌지 않으므로 결과를 캐시한다.
+    """
+    text = _NON_WORD.sub("", (answer or "").lower())
+    return frozenset(text[i : i + 3] for i in range(max(len(text) - 2, 1)))
+
+
+def similarity_matrix(shingles: List[frozenset]) -> np.ndarray:
+    """후보 답변 사이의 Jaccard 유사도 행렬을 계산하는 함수
+
+    후보들의 n-gram을 열로 하는 0/1 행렬을 만들어 교집합 크기를 행렬곱 한 번으로 계산한다.
+    """
+    vocabulary: Dict[str, int] = {}
+    rows, columns = [], []
+    for row, grams in enumerate(shingles):
+        for gram in grams:
+            rows.append(row)
+            columns.append(vocabulary.setdefault(gram, len(vocabulary)))
+
+    matrix = np.zeros((len(shingles), len(vocabulary)), dtype=np.float32)
+    matrix[rows, columns] = 1
+    intersection = matrix @ matrix.T
+    sizes = matrix.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - intersection
+    return np.divide(intersection, union, out=np.ones_like(intersection), where=union > 0)
+
+
+def collapse_duplicates(order: List[int], similarity: np.ndarray, threshold: float) -> List[int]:
+    """순위순 후보 번호 목록에서 앞선 후보와 답변 유사도가 threshold 이상인 후보를 제외하는 함수"""
+    kept = []
+    for i in order:
+        if not kept or similarity[i, kept].max() < threshold:
+            kept.append(i)
+    return kept
+
+
+def mmr_order(candidates: List[int], similarity: np.ndarray, k: int, lambda_: float) -> List[int]:
+    """순위순 후보 중에서 MMR 점수(lambda * 관련도 - (1 - lambda) * 이미 고른 답변과의 최대 유사도)가 높은 순서로 k개를 고르는 함수
+
+    관련도는 검색 순위로 계산한다 (1위 1.0에서 마지막 후보까지 선형 감소). 벡터/어휘 검색을 합친 결과에는
+    공통 유사도 점수가 없으므로 합쳐진 순위를 그대로 관련도로 사용한다.
+    """
+    candidates = np.asarray(candidates, dtype=np.int64)
+    relevance = 1 - np.arange(len(candidates)) / len(candidates)
+    redundancy = np.zeros(len(candidates), dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    selected: List[int] = []
+    while available.any() and len(selected) < k:
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(int(candidates[best]))
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[candidates[best], candidates])
+    return selected
+
+
+def select_results(
+    results: Dict,
+    answers: List[Optional[str]],
+    k: int,
+    duplicate_threshold: float = 0.9,
+    lambda_: float = 0.7,
+) -> Dict:
+    """ChromaDB 형식 검색 결과(순위순)에서 중복 답변을 합치고 MMR로 k개를 골라 같은 형식으로 반환하는 함수
+
+    answers는 검색 결과의 질문 순서와 같은 순서의 답변 목록이다.
+    """
+    metadatas = (results.get("metadatas") or [[]])[0]
+    if not metadatas:
+        return results
+
+    similarity = similarity_matrix([answer_shingles(answer) for answer in answers])
+    candidates = collapse_duplicates(list(range(len(metadatas))), similarity, duplicate_threshold)
+    chosen = mmr_order(candidates, similarity, k, lambda_)
+
+    selected = {}
+    for key in ("ids", "metadatas", "documents", "distances"):
+        values = (results.get(key) or [None])[0]
+        if values:
+            selected[key] = [[values[i] for i in chosen]]
+    return selected
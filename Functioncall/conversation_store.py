@@ -0,0 +1,233 @@
+"""
+세션 ID별 대화 기록을 서버에 저장하는 대화 저장소 모듈
+클라이언트는 매 요청마다 전체 채팅 기록 대신 세션 ID와 새 질문만 보내고,
+서버가 저장된 기록을 읽어 사용한 뒤 질문/답변 한 턴을 덧붙인다.
+기본은 인메모리 저장소(LRU/TTL 제거)이며, CONVERSATION_STORE=sqlite이면 SQLite 파일에 영구 저장한다
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from dotenv import load_dotenv
+
+from VectorStore.lru_cache import LRUTTLCache
+
+load_dotenv()
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "memory")
+CONVERSATION_STORE_PATH = os.getenv(
+    "CONVERSATION_STORE_PATH", os.path.join(current_dir, "conversations.sqlite3")
+)
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+# 마지막 요청 후 이 시간(초)이 지난 세션은 제거한다
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "86400"))
+# 세션 하나에 저장할 최대 메시지 수
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "100"))
+
+
+def assign_message_ids(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """ID가 없는 메시지에 고유 ID를 붙인 사본을 반환하는 함수
+
+    chat_history는 누적 요약을 마지막 메시지 ID로 찾으므로, 오래된 메시지를 잘라내도 요약이 그대로 쓰인다.
+    """
+    return [message if "id" in message else {"id": uuid.uuid4().hex, **message} for message in messages]
+
+
+def trim_messages(messages: List[Dict[str, str]], max_messages: int) -> List[Dict[str, str]]:
+    """메시지 수가 max_messages를 넘으면 가장 오래된 턴부터 잘라내는 함수 (user 메시지에서 시작하도록 맞춘다)"""
+    if len(messages) <= max_messages:
+        return messages
+    kept = messages[-max(max_messages, 1) :]
+    while kept and kept[0]["role"] != "user":
+        kept = kept[1:]
+    return kept
+
+
+class ConversationStore(ABC):
+    """대화 저장소 인터페이스 (메서드를 모두 구현하지 않은 저장소는 만들 때 TypeError가 난다)"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> List[Dict[str, str]]:
+        """세션의 대화 기록(role, content 메시지 목록)을 반환하는 함수 (없거나 만료되면 빈 목록)"""
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        """세션의 대화 기록 끝에 메시지들을 덧붙이는 함수"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """세션의 대화 기록을 지우는 함수"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """저장소 종류와 조회 적중률 등 통계를 반환하는 함수"""
+
+
+class MemoryConversationStore(ConversationStore):
+    """세션 수가 max_sessions를 넘으면 가장 오래 사용되지 않은 세션을, ttl이 지나면 만료된 세션을 제거하는 인메모리 저장소"""
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = 86400, max_messages: int = 100):
+        self.max_messages = max_messages
+        self._sessions = LRUTTLCache(max_size=max_sessions, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        return list(self._sessions.get(session_id) or [])
+
+    def append(self, session_id, messages):
+        with self._lock:
+            # 덧붙이기는 조회가 아니므로 적중률 통계에 넣지 않는다 (set이 최근 사용으로 표시한다)
+            history = list(self._sessions.peek(session_id) or []) + assign_message_ids(messages)
+            self._sessions.set(session_id, tuple(trim_messages(history, self.max_messages)))
+
+    def delete(self, session_id):
+        self._sessions.pop(session_id)
+
+    def stats(self):
+        return {"backend": "memory", **self._sessions.stats()}
+
+
+class SqliteConversationStore(ConversationStore):
+    """SQLite 파일에 대화 기록을 저장하여 서버를 다시 시작해도 유지되는 저장소
+
+    세션 수가 max_sessions를 넘으면 오래 사용되지 않은 세션을, ttl이 지난 세션은 기록할 때 함께 제거한다.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_sessions: int = 10000,
+        ttl: float = 86400,
+        max_messages: int = 100,
+    ):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                session_id TEXT PRIMARY KEY,
+                messages TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_conversations_updated_at ON conversations (updated_at)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def _load(self, session_id):
+        row = self._conn.execute(
+            "SELECT messages FROM conversations WHERE session_id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, session_id):
+        with self._lock:
+            messages = self._load(session_id)
+            if messages is None:
+                self.misses += 1
+                return []
+            self.hits += 1
+            return messages
+
+    def append(self, session_id, messages):
+        now = time.time()
+        with self._lock:
+            history = trim_messages(
+                (self._load(session_id) or []) + assign_message_ids(messages), self.max_messages
+            )
+            exists = self._conn.execute(
+                "SELECT 1 FROM conversations WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversations (session_id, messages, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(history, ensure_ascii=False), now),
+            )
+            if not exists:
+                self._count += 1
+
+            # 만료된 세션 제거
+            before = self._conn.total_changes
+            self._conn.execute("DELETE FROM conversations WHERE updated_at < ?", (now - self.ttl,))
+            expired = self._conn.total_changes - before
+            self._count -= expired
+            self.evictions += expired
+
+            if self._count > self.max_sessions:
+                # 매번 제거하지 않도록 최대 개수의 90%까지 한 번에 줄인다
+                remove_count = self._count - int(self.max_sessions * 0.9)
+                self._conn.execute(
+                    """
+                    DELETE FROM conversations WHERE session_id IN (
+                        SELECT session_id FROM conversations ORDER BY updated_at ASC LIMIT ?
+                    )
+                    """,
+                    (remove_count,),
+                )
+                self.evictions += remove_count
+                self._count -= remove_count
+
+            self._conn.commit()
+
+    def delete(self, session_id):
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+            self._count -= self._conn.total_changes - before
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": "sqlite",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": self._count,
+                "max_size": self.max_sessions,
+                "evictions": self.evictions,
+            }
+
+
+def create_conversation_store() -> ConversationStore:
+    """CONVERSATION_STORE 설정에 맞는 대화 저장소를 만드는 함수"""
+    if CONVERSATION_STORE == "sqlite":
+        return SqliteConversationStore(
+            CONVERSATION_STORE_PATH,
+            max_sessions=CONVERSATION_MAX_SESSIONS,
+            ttl=CONVERSATION_TTL,
+            max_messages=CONVERSATION_MAX_MESSAGES,
+        )
+    return MemoryConversationStore(
+        max_sessions=CONVERSATION_MAX_SESSIONS,
+        ttl=CONVERSATION_TTL,
+        max_messages=CONVERSATION_MAX_MESSAGES,
+    )
+
+
+conversation_store = create_conversation_store()
@@ -3,6 +3,8 @@ OpenAI 함수 호출에 사용할 6가지 카테고리별 검색 함수들의
 설명과 매개변수를 정의하는 모듈
 """
 
+from VectorStore.categories import COLLECTION_FUNCTIONS
+
 Function_Description = [
     {
         "type": "function",
@@ -214,3 +216,26 @@ Function_Description = [
         },
     },
 ]
+
+
+# 압축 라우팅 모드(ROUTING_MODE=compact)에서 사용하는 단일 검색 함수
+# 카테고리 설명과 질문 예시는 함수 설명 대신 시스템 프롬프트(COMPACT_SYSTEM_SETUP)에 한 줄씩 요약한다
+FAQ_SEARCH_FUNCTION = "faq_search"
+
+Compact_Function_Description = [
+    {
+        "type": "function",
+        "function": {
+            "name": FAQ_SEARCH_FUNCTION,
+            "description": "카테고리에서 스마트스토어 FAQ를 검색합니다. 여러 카테고리에 걸친 질문은 카테고리마다 호출합니다.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "category": {"type": "string", "enum": list(COLLECTION_FUNCTIONS)},
+                    "text": {"type": "string", "description": "검색할 질문"},
+                },
+                "required": ["category", "text"],
+            },
+        },
+    },
+]
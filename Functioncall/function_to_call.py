@@ -5,29 +5,53 @@ OpenAI 함수 호출 결과를 파싱하여
 
 import json
 
+from function_description import FAQ_SEARCH_FUNCTION
+from operation_function import FUNCTION_COLLECTIONS
+from VectorStore.categories import COLLECTION_FUNCTIONS
+
 
 # 해당 function의 어떤 argument를 넘겨줄건지 정하는 함수
-def tool_call_function(tool_call, available_functions):
-    """OpenAI 함수 호출 결과를 파싱하여 해당하는 함수를 실행하고 결과를 반환하는 함수"""
+async def tool_call_function(tool_call, available_functions, query):
+    """OpenAI 함수 호출 결과를 파싱하여 해당하는 검색 함수를 실행하고 검색 컨텍스트를 반환하는 함수
+
+    컨텍스트에는 카테고리 검색 함수 이름(function)과 컬렉션 이름(collection)을 함께 담는다.
+    검색어 인자가 없으면 사용자 질문으로 검색한다. 검색 함수 호출이 아니면 None을 반환한다.
+    """
+    parsed = parse_search_tool_call(tool_call)
+    function_to_call = available_functions.get(tool_call.function.name)
+    if parsed is None or not function_to_call:
+        return None
+
+    function_name, collection_name, text = parsed
+    if tool_call.function.name == FAQ_SEARCH_FUNCTION:
+        context = await function_to_call(category=collection_name, text=text or query)
+    else:
+        context = await function_to_call(text=text or query)
+
+    if context is None:
+        return None
+    context["function"] = function_name
+    context["collection"] = collection_name
+    return context
 
-    function_name = tool_call.function.name
 
-    function_to_call = available_functions.get(function_name)
+def parse_search_tool_call(tool_call):
+    """카테고리 검색 함수 호출이면 (함수 이름, 컬렉션 이름, 검색어)를, 아니면 None을 반환하는 함수
 
-    if not function_to_call:
+    faq_search 호출은 category 인자로 컬렉션을 정하고, 함수 이름은 그 카테고리의 검색 함수 이름으로 바꿔 반환한다.
+    """
+    function_name = tool_call.function.name
+    if function_name == FAQ_SEARCH_FUNCTION:
+        function_args = json.loads(tool_call.function.arguments)
+        collection_name = function_args.get("category")
+        function_name = COLLECTION_FUNCTIONS.get(collection_name)
+        if function_name is None:
+            return None
+        return function_name, collection_name, function_args.get("text")
+
+    collection_name = FUNCTION_COLLECTIONS.get(function_name)
+    if collection_name is None:
         return None
 
     function_args = json.loads(tool_call.function.arguments)
-
-    if function_name in (
-        "account_seller_management_search",
-        "product_platform_management_search",
-        "marketing_promotion_search",
-        "operation_logistics_management_search",
-        "analytics_ai_tools_search",
-        "general_inquiry_search",
-    ):
-        return function_to_call(text=function_args.get("text"))
-    else:
-        # 다른 함수들은 모든 args를 그대로 전달하여 호출합니다.
-        return function_to_call(**function_args)
+    return function_name, collection_name, function_args.get("text")
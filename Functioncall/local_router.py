@@ -0,0 +1,173 @@
+"""
+키워드 규칙과 카테고리별 임베딩 중심점(nearest-centroid) 분류기로 질문의 카테고리를 로컬에서 판단하여
+확실한 질문은 GPT 라우팅 호출 없이 바로 해당 카테고리 검색으로 보내는 모듈
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.categories import CATEGORY_COLLECTIONS, COLLECTION_FUNCTIONS, UNIFIED_COLLECTION
+from VectorStore.categorize_to_csv import smart_categorize_questions
+from VectorStore.retriever import (
+    INDEX_LAYOUT,
+    chroma_client,
+    chroma_executor,
+    get_query_embedding_async,
+    index_version,
+)
+
+LOCAL_ROUTER_ENABLED = os.getenv("LOCAL_ROUTER_ENABLED", "true").lower() == "true"
+# 가장 가까운 중심점과의 코사인 유사도가 이 값보다 낮으면 스마트스토어 질문이 아닐 수 있으므로 GPT에 맡긴다
+LOCAL_ROUTER_MIN_SIMILARITY = float(os.getenv("LOCAL_ROUTER_MIN_SIMILARITY", "0.35"))
+# 1, 2위 중심점 유사도 차이가 이 값 이상이면 중심점 분류만으로 확정
+LOCAL_ROUTER_MARGIN = float(os.getenv("LOCAL_ROUTER_MARGIN", "0.08"))
+# 키워드 규칙과 중심점 1위가 일치하면 더 작은 차이로도 확정
+LOCAL_ROUTER_AGREE_MARGIN = float(os.getenv("LOCAL_ROUTER_AGREE_MARGIN", "0.02"))
+
+# (카테고리별 인덱스 버전, 중심점). 인덱스 버전이 바뀌면 다음 요청에서 다시 계산한다
+_centroids = None
+_centroid_lock = threading.Lock()
+
+
+def compute_centroids(embeddings_by_collection):
+    """컬렉션별 임베딩 목록으로 정규화된 중심점 행렬과 컬렉션 이름 목록을 만드는 함수"""
+    names = []
+    rows = []
+    for collection_name, embeddings in embeddings_by_collection.items():
+        if embeddings is None or len(embeddings) == 0:
+            continue
+        centroid = np.asarray(embeddings, dtype=np.float32).mean(axis=0)
+        norm = np.linalg.norm(centroid)
+        if norm == 0:
+            continue
+        names.append(collection_name)
+        rows.append(centroid / norm)
+
+    if not rows:
+        return None
+    return names, np.vstack(rows)
+
+
+def load_category_embeddings():
+    """ChromaDB에서 카테고리(컬렉션 이름)별 질문 임베딩 목록을 읽는 함수
+
+    INDEX_LAYOUT이 "unified"이면 통합 컬렉션의 임베딩을 category 메타데이터로 나누고,
+    아니면 카테고리별 컬렉션에서 각각 읽는다.
+    """
+    if INDEX_LAYOUT == "unified":
+        data = chroma_client.get_collection(UNIFIED_COLLECTION).get(
+            include=["embeddings", "metadatas"]
+        )
+        embeddings_by_collection = {name: [] for name in CATEGORY_COLLECTIONS.values()}
+        for embedding, metadata in zip(data["embeddings"], data["metadatas"]):
+            category = (metadata or {}).get("category")
+            if category in embeddings_by_collection:
+                embeddings_by_collection[category].append(embedding)
+        return embeddings_by_collection
+
+    embeddings_by_collection = {}
+    for collection_name in CATEGORY_COLLECTIONS.values():
+        try:
+            collection = chroma_client.get_collection(collection_name)
+            embeddings_by_collection[collection_name] = collection.get(
+                include=["embeddings"]
+            )["embeddings"]
+        except Exception as e:
+            print(f"⚠️ {collection_name} 중심점 계산 제외: {e}")
+    return embeddings_by_collection
+
+
+def load_centroids():
+    """ChromaDB에 저장된 카테고리별 질문 임베딩으로 중심점을 계산하여 반환하는 함수
+
+    계산한 중심점은 인덱스 버전(매니페스트 수정 시각)과 함께 보관하고,
+    chromaDB.py가 컬렉션을 다시 동기화하여 버전이 바뀐 경우에만 다시 계산한다.
+    중심점을 하나도 만들 수 없으면 로컬 라우팅을 끄고 그 사실을 로그로 남긴다.
+    """
+    global _centroids
+    versions = tuple(index_version(name) for name in CATEGORY_COLLECTIONS.values())
+    with _centroid_lock:
+        if _centroids is None or _centroids[0] != versions:
+            try:
+                centroids = compute_centroids(load_category_embeddings())
+            except Exception as e:
+                print(f"⚠️ 중심점 계산 실패: {e}")
+                centroids = None
+            if centroids is None:
+                print(
+                    f"⚠️ 중심점을 계산할 임베딩이 없어 로컬 라우팅을 끄고 GPT 라우팅만 사용합니다 "
+                    f"(INDEX_LAYOUT={INDEX_LAYOUT}, chromaDB.py를 먼저 실행하세요)"
+                )
+            _centroids = (versions, centroids or ())
+        return _centroids[1] or None
+
+
+def keyword_collection(query):
+    """기존 키워드 규칙(smart_categorize_questions)으로 찾은 컬렉션 이름을 반환하는 함수 (매칭 없으면 None)"""
+    category = smart_categorize_questions(query)
+    if category == "기타":
+        return None
+    return CATEGORY_COLLECTIONS.get(category)
+
+
+def classify(query, query_embedding, centroids):
+    """키워드 규칙과 중심점 유사도로 카테고리를 판단하는 함수
+
+    확정한 경우 collection에 컬렉션 이름이, 애매한 경우 None이 들어간 판단 결과를 반환한다.
+    """
+    names, matrix = centroids
+    vector = np.asarray(query_embedding, dtype=np.float32)
+    vector = vector / (np.linalg.norm(vector) or 1.0)
+
+    similarities = matrix @ vector
+    order = np.argsort(similarities)[::-1]
+    top_name = names[order[0]]
+    top_similarity = float(similarities[order[0]])
+    margin = (
+        top_similarity - float(similarities[order[1]]) if len(order) > 1 else 1.0
+    )
+    keyword_name = keyword_collection(query)
+
+    decided = None
+    source = None
+    if top_similarity >= LOCAL_ROUTER_MIN_SIMILARITY:
+        if keyword_name == top_name and margin >= LOCAL_ROUTER_AGREE_MARGIN:
+            decided, source = top_name, "keyword+centroid"
+        elif margin >= LOCAL_ROUTER_MARGIN:
+            decided, source = top_name, "centroid"
+
+    return {
+        "collection": decided,
+        "function": COLLECTION_FUNCTIONS.get(decided) if decided else None,
+        "source": source,
+        "centroid_collection": top_name,
+        "keyword_collection": keyword_name,
+        "similarity": round(top_similarity, 4),
+        "margin": round(margin, 4),
+    }
+
+
+async def local_route(query):
+    """로컬 라우터로 질문의 카테고리를 판단하여 확실한 경우에만 판단 결과를 반환하는 함수 (애매하면 None)"""
+    if not LOCAL_ROUTER_ENABLED:
+        return None
+
+    try:
+        loop = asyncio.get_running_loop()
+        centroids = await loop.run_in_executor(chroma_executor, load_centroids)
+        if not centroids:
+            return None
+
+        query_embedding = await get_query_embedding_async(query)
+        decision = classify(query, query_embedding, centroids)
+    except Exception as e:
+        print(f"로컬 라우터 에러 (GPT 라우팅으로 대체): {e}")
+        return None
+
+    return decision if decision["collection"] else None
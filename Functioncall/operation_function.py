@@ -5,27 +5,60 @@ GPT를 통해 답변을 생성하는 핵심 함수들을 포함하는 모듈
 
 import os
 import sys
+from collections import Counter
 
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
+
+from VectorStore.categories import COLLECTION_FUNCTIONS
+from VectorStore.retriever import (
+    chromadb_retriever_invoke_async,
+    get_query_embedding_async,
+    index_version,
+    parse_results,
+    search_categories_async,
+)
+from VectorStore.semantic_cache import SemanticAnswerCache
+from answer_retriever import (
+    extract_ids_from_results,
+    find_question_id,
+    lookup_answer_tokens,
+    lookup_answers,
+)
+from context_selector import (
+    answer_shingles,
+    collapse_duplicates,
+    select_results,
+    similarity_matrix,
+)
+
+from prompt.system_setup import ANSWER_SYSTEM_PROMPT, PROMPT_TEMPLATE
+from prompt.template import budgeted_prompt_template
 
-from VectorStore.retriever import chromadb_retriever_invoke, parse_results
-from answer_retriever import get_answers_from_retriever_results
+load_dotenv()
 
-from prompt.system_setup import PROMPT_TEMPLATE
-from prompt.template import simple_prompt_template
 
-load_dotenv()
+client = AsyncOpenAI()
 
+# 이전에 생성한 답변을 비슷한 질문에 재사용하는 시맨틱 캐시 (카테고리별)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+semantic_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000")),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "86400")),
+)
 
-client = OpenAI()
+# 저장된 FAQ 질문과 거의 같은 질문은 GPT 생성 없이 정리된 답변을 그대로 반환한다
+# (거리는 ChromaDB 기본값인 제곱 L2 거리. 정규화된 임베딩에서는 2 * (1 - 코사인 유사도))
+FAQ_SHORTCIRCUIT_ENABLED = os.getenv("FAQ_SHORTCIRCUIT_ENABLED", "true").lower() == "true"
+FAQ_SHORTCIRCUIT_MAX_DISTANCE = float(os.getenv("FAQ_SHORTCIRCUIT_MAX_DISTANCE", "0.05"))
 
 
-def llm_response(text, prompt):
-    """OpenAI GPT-4o 모델을 사용하여 주어진 텍스트와 프롬프트에 대한 응답을 생성하는 함수"""
-    response = client.chat.completions.create(
+async def llm_response(text, prompt):
+    """OpenAI GPT-4o 모델을 사용하여 주어진 텍스트와 프롬프트에 대한 (응답, 토큰 사용량)을 생성하는 함수"""
+    response = await client.chat.completions.create(
         model="gpt-4o",
         messages=[
             {"role": "system", "content": prompt},
@@ -36,169 +69,297 @@ def llm_response(text, prompt):
     )
 
     # response = response.to_dict_recursive()
-    response = response.choices[0].message.content
-    return response
-
+    return response.choices[0].message.content, response.usage
 
-k = 5
 
+async def llm_response_stream(text, prompt):
+    """llm_response의 스트리밍 버전: ("token", 텍스트 조각)을 생성되는 대로 내보내고 마지막에 ("usage", 사용량)을 내보내는 함수"""
+    stream = await client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": text},
+        ],
+        temperature=0.5,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
 
-def account_seller_management_function(text):
-    """계정/판매자 관리 관련 질문에 대해 ChromaDB에서 관련 정보를 검색하고 GPT로 답변을 생성하는 함수"""
-    try:
-        retriever_results = chromadb_retriever_invoke(
-            collection_name="account_seller_management", query=text, k=k
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield "token", chunk.choices[0].delta.content
+        if chunk.usage:
+            yield "usage", chunk.usage
+
+
+# 카테고리 검색 시 프롬프트에 넣을 유사 질문 수 (하이브리드 검색을 쓰면 더 작은 값으로도 같은 재현율을 얻을 수 있다)
+k = int(os.getenv("RETRIEVAL_K", "5"))
+
+# 검색 후처리: RERANK_CANDIDATES개 후보에서 답변이 (거의) 같은 질문을 합치고 MMR로 서로 다른 답변 k개를 고른다
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "15"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+# 답변 문자 3-gram Jaccard 유사도가 이 값 이상이면 같은 답변으로 본다
+DUPLICATE_ANSWER_THRESHOLD = float(os.getenv("DUPLICATE_ANSWER_THRESHOLD", "0.9"))
+
+# 답변 생성 프롬프트(시스템 프롬프트 전체)의 토큰 예산. 예시는 순위순으로 넣고 넘치면 잘라 넣거나 뺀다 (0이면 제한 없음)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+# 예시 답변 하나의 최대 토큰 수 (0이면 제한 없음)
+PASSAGE_MAX_TOKENS = int(os.getenv("PASSAGE_MAX_TOKENS", "600"))
+# 남은 예산이 이보다 적으면 답변을 잘라 넣지 않고 예시를 뺀다
+PASSAGE_MIN_TOKENS = int(os.getenv("PASSAGE_MIN_TOKENS", "80"))
+
+# 조립한 프롬프트 크기 통계 (GET /metrics)
+prompt_metrics = Counter()
+
+# function call 이름 -> 검색할 ChromaDB 컬렉션 이름
+FUNCTION_COLLECTIONS = {
+    function_name: collection_name
+    for collection_name, function_name in COLLECTION_FUNCTIONS.items()
+}
+
+
+async def retrieve_category_context(collection_name, text):
+    """컬렉션에서 유사 질문을 검색하고 질문 예시, 답변 예시, 원본 검색 결과를 반환하는 함수
+
+    collection_name에 컬렉션 이름 목록을 주면 여러 카테고리에서 한 번에 검색한다.
+    """
+    candidates = max(k, RERANK_CANDIDATES) if RERANK_ENABLED else k
+    if isinstance(collection_name, str):
+        retriever_results = await chromadb_retriever_invoke_async(
+            collection_name=collection_name, query=text, k=candidates
         )
-
-        retriever = "\n".join(parse_results(retriever_results))
-        print("질문예시: ", retriever)
-
-        # 답변 예시들 (answer)
-        answer = get_answers_from_retriever_results(retriever_results)
-        print("답변예시: ", answer)
-
-        prompt = simple_prompt_template(
-            PROMPT_TEMPLATE, text=text, retriever=retriever, answer=answer
+    else:
+        retriever_results = await search_categories_async(
+            text, candidates, categories=collection_name
         )
-        response = llm_response(text, prompt)
-        print(response)
-        return response
-    except Exception as e:
-        print(f"account_seller_management_function 에러: {e}")
-        import traceback
-
-        traceback.print_exc()
-        return f"죄송합니다. 처리 중 오류가 발생했습니다: {e}"
 
+    if RERANK_ENABLED:
+        retriever_results = select_results(
+            retriever_results,
+            lookup_answers(extract_ids_from_results(retriever_results), cleaned=True),
+            k,
+            duplicate_threshold=DUPLICATE_ANSWER_THRESHOLD,
+            lambda_=MMR_LAMBDA,
+        )
 
-def product_platform_management_function(text):
-    """상품/플랫폼 관리 관련 질문에 대해 ChromaDB에서 관련 정보를 검색하고 GPT로 답변을 생성하는 함수"""
-    try:
-        retriever_results = chromadb_retriever_invoke(
-            collection_name="product_platform_management", query=text, k=k
+    print("질문예시: ", "\n".join(parse_results(retriever_results)))
+
+    return {"results": retriever_results}
+
+
+def merge_category_contexts(contexts):
+    """여러 검색 함수의 검색 결과를 중복 질문 ID 없이 하나의 컨텍스트로 합치는 함수"""
+    if len(contexts) == 1:
+        return contexts[0]
+
+    seen_ids = set()
+    merged_metadatas = []
+    merged_documents = []
+    for context in contexts:
+        results = context["results"]
+        metadatas = (results.get("metadatas") or [[]])[0]
+        documents = (results.get("documents") or [[]])[0] or [None] * len(metadatas)
+        for metadata, document in zip(metadatas, documents):
+            question_id = metadata.get("question_id")
+            if question_id in seen_ids:
+                continue
+            seen_ids.add(question_id)
+            merged_metadatas.append(metadata)
+            merged_documents.append(document)
+
+    if RERANK_ENABLED:
+        # 다른 카테고리에서 같은 답변이 검색된 경우도 하나만 남긴다
+        similarity = similarity_matrix(
+            [
+                answer_shingles(answer)
+                for answer in lookup_answers(
+                    [metadata.get("question_id") for metadata in merged_metadatas],
+                    cleaned=True,
+                )
+            ]
         )
+        kept = collapse_duplicates(
+            list(range(len(merged_metadatas))), similarity, DUPLICATE_ANSWER_THRESHOLD
+        )
+        merged_metadatas = [merged_metadatas[i] for i in kept]
+        merged_documents = [merged_documents[i] for i in kept]
 
-        retriever = "\n".join(parse_results(retriever_results))
-        print("질문예시: ", retriever)
+    return {"results": {"metadatas": [merged_metadatas], "documents": [merged_documents]}}
 
-        answer = get_answers_from_retriever_results(retriever_results)
-        print("답변예시: ", answer)
 
-        prompt = simple_prompt_template(
-            PROMPT_TEMPLATE, text=text, retriever=retriever, answer=answer
-        )
-        response = llm_response(text, prompt)
-        print(response)
-        return response
-    except Exception as e:
-        print(f"product_platform_management_function 에러: {e}")
-        import traceback
+def _cache_scope(collection_names):
+    """검색한 컬렉션 조합을 캐시 스코프와 현재 인덱스 버전으로 바꾸는 함수"""
+    names = tuple(sorted(set(collection_names)))
+    return names, tuple(index_version(name) for name in names)
 
-        traceback.print_exc()
-        return f"죄송합니다. 처리 중 오류가 발생했습니다: {e}"
 
+async def lookup_cached_answer(collection_names, text):
+    """같은 카테고리에서 비슷한 질문에 생성했던 답변을 찾는 함수 (없으면 None)"""
+    if not SEMANTIC_CACHE_ENABLED or not collection_names:
+        return None
 
-def marketing_promotion_function(text):
-    """마케팅/프로모션 관련 질문에 대해 ChromaDB에서 관련 정보를 검색하고 GPT로 답변을 생성하는 함수"""
     try:
-        retriever_results = chromadb_retriever_invoke(
-            collection_name="marketing_promotion", query=text, k=k
-        )
+        scope, version = _cache_scope(collection_names)
+        embedding = await get_query_embedding_async(text)
+        return semantic_cache.lookup(scope, embedding, version)
+    except Exception as e:
+        print(f"시맨틱 캐시 조회 에러: {e}")
+        return None
 
-        retriever = "\n".join(parse_results(retriever_results))
-        print("질문예시: ", retriever)
 
-        answer = get_answers_from_retriever_results(retriever_results)
-        print("답변예시: ", answer)
+async def store_cached_answer(collection_names, text, answer):
+    """생성한 답변을 카테고리별 시맨틱 캐시에 저장하는 함수"""
+    if not SEMANTIC_CACHE_ENABLED or not collection_names or not answer:
+        return
 
-        prompt = simple_prompt_template(
-            PROMPT_TEMPLATE, text=text, retriever=retriever, answer=answer
-        )
-        response = llm_response(text, prompt)
-        print(response)
-        return response
+    try:
+        scope, version = _cache_scope(collection_names)
+        embedding = await get_query_embedding_async(text)
+        semantic_cache.store(scope, text, embedding, answer, version)
     except Exception as e:
-        print(f"marketing_promotion_function 에러: {e}")
-        import traceback
+        print(f"시맨틱 캐시 저장 에러: {e}")
+
+
+def semantic_cache_stats():
+    """시맨틱 답변 캐시의 적중률 통계를 반환하는 함수"""
+    return semantic_cache.stats()
+
+
+def _faq_hit(question_id, reason, distance, question=None):
+    """저장된 질문 ID의 정리된 답변으로 바로 응답할 FAQ 적중 결과를 만드는 함수 (답변이 없으면 None)"""
+    answer = lookup_answers([question_id], cleaned=True)[0]
+    if not answer:
+        return None
+    return {
+        "question_id": str(question_id),
+        "question": question,
+        "answer": answer,
+        "reason": reason,
+        "distance": distance,
+    }
+
+
+def find_exact_faq(text):
+    """정규화했을 때 저장된 FAQ 질문과 똑같은 질문이면 그 답변을 반환하는 함수 (없으면 None)"""
+    if not FAQ_SHORTCIRCUIT_ENABLED:
+        return None
+
+    question_id = find_question_id(text)
+    if question_id is None:
+        return None
+    return _faq_hit(question_id, "exact", 0.0)
+
+
+def find_near_faq(contexts):
+    """검색 결과 중 거리가 FAQ_SHORTCIRCUIT_MAX_DISTANCE 이하인 가장 가까운 FAQ의 답변을 반환하는 함수 (없으면 None)"""
+    if not FAQ_SHORTCIRCUIT_ENABLED:
+        return None
+
+    best = None
+    for context in contexts:
+        results = context["results"]
+        metadatas = (results.get("metadatas") or [[]])[0]
+        distances = (results.get("distances") or [[]])[0]
+        for metadata, distance in zip(metadatas, distances):
+            # 어휘 검색에서만 나온 질문은 벡터 거리가 없다(None)
+            if distance is None:
+                continue
+            if distance <= FAQ_SHORTCIRCUIT_MAX_DISTANCE and (
+                best is None or distance < best[1]
+            ):
+                best = (metadata, distance)
+
+    if best is None:
+        return None
+    metadata, distance = best
+    return _faq_hit(
+        metadata.get("question_id"),
+        "distance",
+        round(float(distance), 4),
+        metadata.get("question"),
+    )
 
-        traceback.print_exc()
-        return f"죄송합니다. 처리 중 오류가 발생했습니다: {e}"
 
+def build_category_prompt(text, context):
+    """검색된 질문/답변 예시를 토큰 예산에 맞춰 답변 생성 프롬프트로 만드는 함수
+
+    (시스템 프롬프트, 사용자 메시지, 프롬프트 정보(토큰 수, 예산, 넣은/잘린/뺀 예시 수))를 반환한다.
+    시스템 프롬프트는 요청마다 같은 고정 지시문이고, 검색 예시와 질문은 사용자 메시지에 들어간다.
+    """
+    metadatas = (context["results"].get("metadatas") or [[]])[0]
+    question_ids = extract_ids_from_results(context["results"])
+    message, prompt_info = budgeted_prompt_template(
+        PROMPT_TEMPLATE,
+        text,
+        list(
+            zip(
+                question_ids,
+                [metadata.get("question") for metadata in metadatas],
+                lookup_answers(question_ids, cleaned=True),
+                lookup_answer_tokens(question_ids),
+            )
+        ),
+        PROMPT_TOKEN_BUDGET,
+        passage_max_tokens=PASSAGE_MAX_TOKENS,
+        min_passage_tokens=PASSAGE_MIN_TOKENS,
+        system_prompt=ANSWER_SYSTEM_PROMPT,
+    )
+    print("프롬프트: ", prompt_info)
 
-def operation_logistics_management_function(text):
-    """운영/물류 관리 관련 질문에 대해 ChromaDB에서 관련 정보를 검색하고 GPT로 답변을 생성하는 함수"""
-    try:
-        retriever_results = chromadb_retriever_invoke(
-            collection_name="operation_logistics_management", query=text, k=k
-        )
+    prompt_metrics["prompts"] += 1
+    for key in ("prompt_tokens", "passages", "trimmed", "dropped"):
+        prompt_metrics[key] += prompt_info[key]
+    return ANSWER_SYSTEM_PROMPT, message, prompt_info
 
-        retriever = "\n".join(parse_results(retriever_results))
-        print("질문예시: ", retriever)
 
-        answer = get_answers_from_retriever_results(retriever_results)
-        print("답변예시: ", answer)
+def prompt_stats():
+    """조립한 프롬프트 수와 프롬프트당 평균 토큰 수, 잘리거나 빠진 예시 수를 반환하는 함수"""
+    prompts = prompt_metrics["prompts"]
+    return {
+        "prompts": prompts,
+        "budget": PROMPT_TOKEN_BUDGET,
+        "avg_prompt_tokens": prompt_metrics["prompt_tokens"] / prompts if prompts else 0.0,
+        "avg_passages": prompt_metrics["passages"] / prompts if prompts else 0.0,
+        "trimmed_passages": prompt_metrics["trimmed"],
+        "dropped_passages": prompt_metrics["dropped"],
+    }
 
-        prompt = simple_prompt_template(
-            PROMPT_TEMPLATE, text=text, retriever=retriever, answer=answer
-        )
-        response = llm_response(text, prompt)
-        print(response)
-        return response
-    except Exception as e:
-        print(f"operations_logistics_function 에러: {e}")
-        import traceback
 
-        traceback.print_exc()
-        return f"죄송합니다. 처리 중 오류가 발생했습니다: {e}"
+# 카테고리 검색 함수: GPT function call(또는 로컬 라우터)이 고른 카테고리 컬렉션에서 검색만 하고,
+# 답변은 호출된 검색 함수들의 결과를 합쳐 ask_functioncall에서 한 번만 생성한다
+async def account_seller_management_function(text):
+    """계정/판매자 관리 컬렉션에서 질문과 비슷한 FAQ를 검색하여 검색 컨텍스트를 반환하는 함수"""
+    return await retrieve_category_context("account_seller_management", text)
 
 
-def analytics_ai_tools_function(text):
-    """분석/AI 도구 관련 질문에 대해 ChromaDB에서 관련 정보를 검색하고 GPT로 답변을 생성하는 함수"""
-    try:
-        retriever_results = chromadb_retriever_invoke(
-            collection_name="analytics_ai_tools", query=text, k=k
-        )
+async def product_platform_management_function(text):
+    """상품/플랫폼 관리 컬렉션에서 질문과 비슷한 FAQ를 검색하여 검색 컨텍스트를 반환하는 함수"""
+    return await retrieve_category_context("product_platform_management", text)
 
-        retriever = "\n".join(parse_results(retriever_results))
-        print("질문예시: ", retriever)
 
-        answer = get_answers_from_retriever_results(retriever_results)
-        print("답변예시: ", answer)
+async def marketing_promotion_function(text):
+    """마케팅/프로모션 컬렉션에서 질문과 비슷한 FAQ를 검색하여 검색 컨텍스트를 반환하는 함수"""
+    return await retrieve_category_context("marketing_promotion", text)
 
-        prompt = simple_prompt_template(
-            PROMPT_TEMPLATE, text=text, retriever=retriever, answer=answer
-        )
-        response = llm_response(text, prompt)
-        print(response)
-        return response
-    except Exception as e:
-        print(f"analytics_ai_tools_function 에러: {e}")
-        import traceback
 
-        traceback.print_exc()
-        return f"죄송합니다. 처리 중 오류가 발생했습니다: {e}"
+async def operation_logistics_management_function(text):
+    """운영/물류 관리 컬렉션에서 질문과 비슷한 FAQ를 검색하여 검색 컨텍스트를 반환하는 함수"""
+    return await retrieve_category_context("operation_logistics_management", text)
 
 
-def general_inquiry_function(text):
-    """기타 일반적인 문의에 대해 ChromaDB에서 관련 정보를 검색하고 GPT로 답변을 생성하는 함수"""
-    try:
-        retriever_results = chromadb_retriever_invoke(
-            collection_name="general_inquiry", query=text, k=k
-        )
+async def analytics_ai_tools_function(text):
+    """분석/AI 도구 컬렉션에서 질문과 비슷한 FAQ를 검색하여 검색 컨텍스트를 반환하는 함수"""
+    return await retrieve_category_context("analytics_ai_tools", text)
 
-        retriever = "\n".join(parse_results(retriever_results))
-        print("질문예시: ", retriever)
 
-        answer = get_answers_from_retriever_results(retriever_results)
-        print("답변예시: ", answer)
-        prompt = simple_prompt_template(
-            PROMPT_TEMPLATE, text=text, retriever=retriever, answer=answer
-        )
-        response = llm_response(text, prompt)
-        return response
-    except Exception as e:
-        print(f"general_inquiry_function 에러: {e}")
-        import traceback
+async def general_inquiry_function(text):
+    """기타 일반 문의 컬렉션에서 질문과 비슷한 FAQ를 검색하여 검색 컨텍스트를 반환하는 함수"""
+    return await retrieve_category_context("general_inquiry", text)
+
 
-        traceback.print_exc()
-        return f"죄송합니다. 처리 중 오류가 발생했습니다: {e}"
+async def faq_search_function(category, text):
+    """faq_search 함수 호출(압축 라우팅 모드)의 category 컬렉션에서 검색하여 검색 컨텍스트를 반환하는 함수 (알 수 없는 카테고리면 None)"""
+    if category not in COLLECTION_FUNCTIONS:
+        return None
+    return await retrieve_category_context(category, text)
@@ -30,6 +30,18 @@ SYSTEM_SETUP = """
     
     """
 
+# 압축 라우팅 모드: faq_search 함수 하나에 카테고리를 enum으로 넘기고, 카테고리 설명은 여기에 한 줄씩 요약한다
+COMPACT_SYSTEM_SETUP = """
+사용자 질문을 분석하여 faq_search 함수를 호출하세요. category는 다음 중 하나입니다.
+- account_seller_management: 계정/판매자 관리 (가입 서류, 가입 심사, 계좌인증, 미성년자 가입, 통신판매업 신고)
+- product_platform_management: 상품/플랫폼 관리 (네이버쇼핑 입점, 쇼핑윈도, 풀필먼트, 그룹 설정, 천원샵)
+- marketing_promotion: 마케팅/프로모션 (숏클립, 라이브 숏클립, 쇼핑라이브)
+- operation_logistics_management: 운영/물류 관리 (물류센터, 반품안심케어, 내일도착, 택배사)
+- analytics_ai_tools: 분석/AI 도구 (CLOVA 상품추천, AI 마케팅 효과분석, 솔루션 효과분석, 커머스솔루션 정기결제)
+- general_inquiry: 기타 일반 문의 (로그인, 판매자 탈퇴, 상품 조회, 즉시할인, 간이과세자)
+위 카테고리에 해당하면 직접 답변하지 말고 반드시 함수를 호출하세요. 해당하지 않는 질문만 함수 없이 답변하세요.
+"""
+
 FALLBACK_PROMPT = """
 
         당신은 네이버 스마트스토어 FAQ 전문 챗봇입니다.
@@ -53,27 +65,45 @@ FALLBACK_PROMPT = """
 """
 
 
-PROMPT_TEMPLATE = """
+# 답변 생성 프롬프트
+# 바뀌지 않는 지시문(ANSWER_SYSTEM_PROMPT)을 시스템 메시지로 먼저 보내고,
+# 요청마다 바뀌는 검색 예시와 사용자 질문(PROMPT_TEMPLATE)은 그 뒤의 사용자 메시지로 보낸다.
+# OpenAI 프롬프트 캐시는 1024 토큰 이상인 접두사에만 적용되므로, 지시문이 200 토큰 정도인 지금은 답변 생성 호출에 캐시가 적용되지 않는다
+# (캐시를 위해 고정 예시를 덧붙이면 요청마다 입력 토큰이 늘어 캐시 할인보다 비용이 커진다)
+ANSWER_SYSTEM_PROMPT = """
 
     역할: 사용자의 질문에 맞는 답변을 해주는 전문가
     역할설명: 너는 사용자의 질문에 맞는 답변을 해줘 나는 너에게 3가지를 알려줄거야 
-        1. 사용자의 질문, 
-        2. 과거 질문 예시들, 
-        3. 과거 답변 예시들,
+        1. 과거 질문 예시들, 
+        2. 과거 답변 예시들,
+        3. 사용자의 질문
     너는 해당 정보를 바탕으로 사용자의 질문에 맞는 답변을 해줘
     과거 질문예시들과 답변예시들에는 ID값이 있어 ID값이 일치하는 것들끼리 질문에 대한 답이야 이점 참고해서 답변을 잘해줘
 
-    사용자 질문:
-    {text}
+"""
+
 
+PROMPT_TEMPLATE = """
     질문 예시:
     {retriever}
 
     답변 예시:
     {answer}
 
+    사용자 질문:
+    {text}
+
     답변:
+"""
+
 
+HISTORY_SUMMARY_PROMPT = """
 
+    역할: 네이버 스마트스토어 FAQ 챗봇과 사용자의 대화를 요약하는 요약가
+    역할설명: 이전 요약과 새로 이어진 대화를 합쳐 하나의 요약으로 다시 써줘
+        1. 사용자가 무엇을 물었는지, 어떤 기능/메뉴/상품에 대한 이야기였는지 위주로 정리
+        2. 이후 질문의 "그거", "아까 말한 것"이 무엇을 가리키는지 알 수 있도록 핵심 용어를 그대로 남길 것
+        3. 챗봇 답변은 핵심만 짧게
+        4. 5문장 이내로, 요약만 출력
 
 """
@@ -1,10 +1,93 @@
 """
-프롬프트 템플릿을 처리하여 
+프롬프트 템플릿을 처리하여
 변수들을 실제 값으로 치환하는 유틸리티 모듈
 """
 
+from functools import lru_cache
+
+from VectorStore.token_counter import count_tokens, truncate_tokens
+
+# 예시 사이 구분자("\n", "\n\n")의 토큰 수
+SEPARATOR_TOKENS = 1
+
+
 def simple_prompt_template(template, **kwargs):
     """
     프롬프트 템플릿 함수
     """
     return template.format(**kwargs)
+
+
+@lru_cache(maxsize=16)
+def _template_tokens(template, system_prompt):
+    """템플릿에서 변수를 뺀 고정 부분과 시스템 프롬프트의 토큰 수 (조합마다 한 번만 계산)"""
+    return count_tokens(template.format(text="", retriever="", answer="")) + count_tokens(
+        system_prompt
+    )
+
+
+def budgeted_prompt_template(
+    template,
+    text,
+    passages,
+    budget,
+    passage_max_tokens=0,
+    min_passage_tokens=0,
+    system_prompt="",
+):
+    """
+    검색된 질문/답변 예시를 토큰 예산 안에서 순위순으로 채워 넣는 프롬프트 템플릿 함수
+
+    passages는 순위순 (질문 ID, 질문, 정리된 답변, 답변 토큰 수) 목록이다.
+    답변 토큰 수는 전처리 단계에서 계산한 값을 사용하므로 요청 시에는 질문 줄과 잘라야 하는 답변만 토큰화한다.
+    답변은 passage_max_tokens로 자르고, 남은 예산에 다 들어가지 않으면 남은 만큼 잘라 넣되
+    min_passage_tokens보다 적게 남으면 그 예시(질문 포함)를 뺀다. 1위 예시는 항상 넣는다.
+    budget, passage_max_tokens가 0 이하이면 제한하지 않는다.
+    템플릿을 사용자 메시지로 보내는 경우 함께 보낼 시스템 프롬프트를 system_prompt로 주면 예산에 포함한다.
+
+    (프롬프트, {"prompt_tokens", "budget", "passages", "trimmed", "dropped"})를 반환한다.
+    prompt_tokens는 조각별 토큰 수의 합이라 실제 토큰 수와 몇 토큰 차이가 날 수 있다.
+    """
+    used = _template_tokens(template, system_prompt) + count_tokens(text)
+    question_lines, answer_lines = [], []
+    trimmed = dropped = 0
+
+    for question_id, question, answer, answer_tokens in passages:
+        question_line = f"{len(question_lines) + 1}. [ID: {question_id}] {question}"
+        answer_prefix = f"[ID: {question_id}] "
+        if answer is None:
+            answer, answer_tokens = "답변을 찾을 수 없습니다.", None
+        if answer_tokens is None:
+            answer_tokens = count_tokens(answer)
+        overhead = count_tokens(question_line) + count_tokens(answer_prefix) + 2 * SEPARATOR_TOKENS
+
+        limit = passage_max_tokens if passage_max_tokens > 0 else answer_tokens
+        if budget > 0:
+            room = budget - used - overhead
+            if not question_lines:
+                room = max(room, min_passage_tokens, 1)
+            limit = min(limit, room)
+
+        if answer_tokens > limit:
+            if limit < max(min_passage_tokens, 1):
+                dropped += 1
+                continue
+            answer, answer_tokens = truncate_tokens(answer, limit), limit
+            trimmed += 1
+
+        question_lines.append(question_line)
+        answer_lines.append(answer_prefix + answer)
+        used += overhead + answer_tokens
+
+    prompt = template.format(
+        text=text,
+        retriever="\n".join(question_lines),
+        answer="\n\n".join(answer_lines) if answer_lines else "관련 답변을 찾을 수 없습니다.",
+    )
+    return prompt, {
+        "prompt_tokens": used,
+        "budget": budget,
+        "passages": len(question_lines),
+        "trimmed": trimmed,
+        "dropped": dropped,
+    }
@@ -0,0 +1,34 @@
+"""
+FAQ 답변 텍스트에서 별점 평가, 도움말 닫기 등 불필요한 줄을 제거하는 모듈
+데이터 전처리(categorize_to_csv.py) 단계에서 한 번 적용하여 정리된 답변을 CSV에 저장한다
+"""
+
+# 이 문구부터 끝까지는 답변 본문이 아닌 도움말 평가/관련 도움말/닫기 영역이다
+FEEDBACK_MARKER = "위 도움말이 도움이 되었나요"
+
+# 평가 영역 밖에 남아 있을 때만 지우는 안내 문구 (줄 전체가 정확히 같을 때만 제거)
+BOILERPLATE_LINES = frozenset(
+    [
+        "별점1점",
+        "별점2점",
+        "별점3점",
+        "별점4점",
+        "별점5점",
+        "소중한 의견을 남겨주시면 보완하도록 노력하겠습니다.",
+        "보내기",
+        "도움말 닫기",
+    ]
+)
+
+
+def clean_answer(answer: str) -> str:
+    """답변 끝의 도움말 평가 영역과 안내 문구 줄, 빈 줄을 제거하고 각 줄의 앞뒤 공백을 정리하는 함수
+
+    본문 줄은 별점, 만족도 같은 단어가 들어 있어도 지우지 않는다.
+    """
+    answer = str(answer)
+    marker = answer.find(FEEDBACK_MARKER)
+    if marker >= 0:
+        answer = answer[:marker]
+    lines = (line.strip() for line in answer.split("\n"))
+    return "\n".join(line for line in lines if line and line not in BOILERPLATE_LINES)
@@ -0,0 +1,23 @@
+"""
+질문 카테고리, ChromaDB 컬렉션 이름, GPT 검색 함수 이름의 대응 관계를
+인덱싱과 검색 양쪽에서 함께 사용하도록 한 곳에 정의하는 모듈
+"""
+
+# 카테고리 -> 컬렉션 이름 (ChromaDB는 한글을 허용하지 않음)
+CATEGORY_COLLECTIONS = {
+    "1. 계정/판매자 관리": "account_seller_management",
+    "2. 상품/플랫폼 관리": "product_platform_management",
+    "3. 마케팅/프로모션": "marketing_promotion",
+    "4. 운영/물류 관리": "operation_logistics_management",
+    "5. 분석/AI 도구": "analytics_ai_tools",
+    "기타": "general_inquiry",
+}
+
+# 컬렉션 이름 -> GPT function call 검색 함수 이름
+COLLECTION_FUNCTIONS = {
+    collection_name: f"{collection_name}_search"
+    for collection_name in CATEGORY_COLLECTIONS.values()
+}
+
+# 모든 카테고리를 카테고리 메타데이터와 함께 저장하는 통합 컬렉션 이름
+UNIFIED_COLLECTION = "faq_unified"
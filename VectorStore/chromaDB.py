@@ -3,127 +3,285 @@
 유사 질문 검색 기능을 제공하는 모듈
 """
 
+import argparse
 import os
+import sys
+import time
 import chromadb
 import pandas as pd
-import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 
 from dotenv import load_dotenv
-from openai import OpenAI
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.embedding import (
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_MODEL,
+    EMBEDDING_NATIVE_DIMENSIONS,
+    embed_texts,
+    embedding_cache,
+    embedding_model_id,
+    get_embedding as get_cached_embedding,
+    shorten_embedding,
+)
+from VectorStore.categories import CATEGORY_COLLECTIONS, UNIFIED_COLLECTION
+from VectorStore.index_manifest import (
+    content_hash,
+    diff_manifest,
+    load_manifest,
+    remove_manifest,
+    save_manifest,
+)
+from VectorStore.lexical_index import export_lexical_index
+from VectorStore.vector_backend import export_numpy_index
 
 # 환경 변수 로드
 load_dotenv()
-client = OpenAI()
 
 # ChromaDB 클라이언트 초기화
 chroma_client = chromadb.PersistentClient(path="./chroma_db")
 
+# 컬렉션별 인덱싱 매니페스트 저장 위치
+MANIFEST_DIR = "./chroma_db/manifests"
+
+# 동시에 처리할 카테고리 수 (실제 API 동시 요청 수는 embedding 모듈에서 제한)
+CATEGORY_WORKERS = int(os.getenv("CATEGORY_WORKERS", "6"))
+
+# 인덱스 구성: 카테고리별 컬렉션(sharded) / 카테고리 메타데이터가 있는 통합 컬렉션(unified) / 둘 다(both)
+INDEX_LAYOUT = os.getenv("INDEX_LAYOUT", "sharded")
+
+# 하이브리드 검색용 BM25 역색인 저장 위치 (동기화할 때마다 컬렉션 내용으로 다시 만든다)
+LEXICAL_INDEX_DIR = "./lexical_index"
+
+# NumPy 백엔드(VECTOR_BACKEND=numpy)로 검색할 때 동기화 후 컬렉션을 .npy 인덱스로 내보낼 위치
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+NUMPY_INDEX_DIR = "./numpy_index"
+# NumPy 인덱스 저장 형식: float32 / float16 / int8 (float16, int8은 float32 파일로 상위 후보를 다시 채점)
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "float32")
 
-def get_embedding(text: str, model: str = "text-embedding-3-small") -> List[float]:
-    """OpenAI API를 사용하여 주어진 텍스트의 벡터 임베딩을 생성하는 함수"""
+
+def get_embedding(text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+    """임베딩 캐시 또는 OpenAI API를 사용하여 주어진 텍스트의 벡터 임베딩을 생성하는 함수"""
     try:
-        response = client.embeddings.create(input=text, model=model)
-        return response.data[0].embedding
+        return shorten_embedding(get_cached_embedding(text, model=model))
     except Exception as e:
         print(f"임베딩 생성 중 오류 발생: {e}")
         return None
 
 
-def create_category_collection(category_name: str, category_data: pd.DataFrame) -> None:
-    """특정 카테고리의 질문 데이터로 ChromaDB 컬렉션을 생성하고 벡터 임베딩과 함께 저장하는 함수"""
+def create_category_collection(
+    category_name: str, category_data: pd.DataFrame, full_rebuild: bool = False
+) -> Dict:
+    """특정 카테고리의 질문 데이터를 카테고리 전용 ChromaDB 컬렉션에 반영하는 함수"""
 
     # 컬렉션 이름을 영어로 매핑 (ChromaDB는 한글을 허용하지 않음)
-    name_mapping = {
-        "1. 계정/판매자 관리": "account_seller_management",
-        "2. 상품/플랫폼 관리": "product_platform_management",
-        "3. 마케팅/프로모션": "marketing_promotion",
-        "4. 운영/물류 관리": "operations_logistics",
-        "5. 분석/AI 도구": "analytics_ai_tools",
-        "기타": "general_inquiry",
+    collection_name = CATEGORY_COLLECTIONS.get(category_name, "unknown_category")
+    return sync_collection(
+        collection_name,
+        category_data,
+        collection_metadata={"category": category_name},
+        full_rebuild=full_rebuild,
+        label=category_name,
+    )
+
+
+def create_unified_collection(
+    categories: Dict[str, pd.DataFrame], full_rebuild: bool = False
+) -> Dict:
+    """모든 카테고리의 질문을 카테고리 메타데이터와 함께 하나의 컬렉션(UNIFIED_COLLECTION)에 반영하는 함수
+
+    임베딩 대상 텍스트는 카테고리별 컬렉션과 같으므로, 카테고리별 컬렉션 동기화가 끝난 뒤에 실행하면
+    임베딩 캐시에 먼저 저장된 벡터를 그대로 사용한다 (동시에 실행하면 같은 텍스트를 두 번 임베딩한다).
+    """
+    frames = [
+        category_data.assign(category=CATEGORY_COLLECTIONS[category_name])
+        for category_name, category_data in categories.items()
+        if len(category_data) > 0 and category_name in CATEGORY_COLLECTIONS
+    ]
+    unified_data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return sync_collection(
+        UNIFIED_COLLECTION,
+        unified_data,
+        collection_metadata={"layout": "unified"},
+        full_rebuild=full_rebuild,
+        label="전체 카테고리 통합",
+    )
+
+
+def sync_collection(
+    collection_name: str,
+    data: pd.DataFrame,
+    collection_metadata: Dict,
+    full_rebuild: bool = False,
+    label: str = None,
+) -> Dict:
+    """질문 데이터를 ChromaDB 컬렉션에 반영하는 함수
+
+    매니페스트와 비교하여 새로 추가되었거나 내용/임베딩 모델이 바뀐 질문만 임베딩하여 upsert하고,
+    CSV에서 사라진 질문은 컬렉션에서 삭제한 뒤 변경 내역을 반환한다.
+    data에 category 컬럼이 있으면 각 문서의 메타데이터에 카테고리(컬렉션 이름)를 함께 저장한다.
+    full_rebuild=True이면 기존 컬렉션과 매니페스트를 지우고 처음부터 다시 만든다.
+    EMBEDDING_DIMENSIONS가 기존 컬렉션의 차원과 다르면 자동으로 다시 만든다 (임베딩은 캐시에서 재사용).
+    """
+    category_name = label or collection_name
+    collection_metadata = {**collection_metadata, "dimensions": EMBEDDING_DIMENSIONS}
+
+    report = {
+        "collection": collection_name,
+        "added": 0,
+        "updated": 0,
+        "deleted": 0,
+        "unchanged": 0,
+        "failed": 0,
     }
-    collection_name = name_mapping.get(category_name, "unknown_category")
 
-    print(f"\n=== {category_name} 컬렉션 생성 중... ===")
+    print(f"\n=== {category_name} 컬렉션 동기화 중... ===")
     print(f"컬렉션 이름: {collection_name}")
 
     try:
-        # 기존 컬렉션이 있다면 삭제
-        try:
-            chroma_client.delete_collection(collection_name)
-            print(f"기존 {collection_name} 컬렉션 삭제됨")
-        except:
-            pass
-
-        # 새 컬렉션 생성
-        collection = chroma_client.create_collection(
-            name=collection_name, metadata={"category": category_name}
+        if not full_rebuild:
+            try:
+                existing_metadata = chroma_client.get_collection(collection_name).metadata or {}
+            except Exception:
+                existing_metadata = None
+            if existing_metadata is not None:
+                stored_dimensions = existing_metadata.get(
+                    "dimensions", EMBEDDING_NATIVE_DIMENSIONS
+                )
+                if stored_dimensions != EMBEDDING_DIMENSIONS:
+                    print(
+                        f"임베딩 차원 변경({stored_dimensions} → {EMBEDDING_DIMENSIONS})으로 컬렉션을 다시 만듭니다"
+                    )
+                    full_rebuild = True
+
+        if full_rebuild:
+            # 기존 컬렉션이 있다면 삭제
+            try:
+                chroma_client.delete_collection(collection_name)
+                print(f"기존 {collection_name} 컬렉션 삭제됨")
+            except Exception:
+                pass
+            remove_manifest(MANIFEST_DIR, collection_name)
+
+        collection = chroma_client.get_or_create_collection(
+            name=collection_name, metadata=collection_metadata
         )
 
-        # 데이터 준비
-        documents = []
-        metadatas = []
-        ids = []
-        embeddings = []
-        failed_count = 0
+        previous_manifest = load_manifest(MANIFEST_DIR, collection_name)
+        if not previous_manifest and collection.count() > 0:
+            # 매니페스트 없이 만들어진 기존 컬렉션: 저장된 ID를 기준으로 삭제 대상을 찾는다
+            existing_ids = collection.get(include=[])["ids"]
+            prefix = f"{collection_name}_"
+            previous_manifest = {
+                chroma_id[len(prefix) :]: {}
+                for chroma_id in existing_ids
+                if chroma_id.startswith(prefix)
+            }
+
+        # 현재 CSV 기준 매니페스트 계산 (질문만으로 임베딩 생성)
+        rows = {}
+        current_manifest = {}
+        question_categories = (
+            data["category"].astype(str)
+            if "category" in data.columns
+            else [None] * len(data)
+        )
+        for question, question_id, category in zip(
+            data["질문"].astype(str), data["ID"].astype(str), question_categories
+        ):
+            question_text = f"질문: {question}"
+            rows[question_id] = (question, question_text, category)
+            # 카테고리가 바뀐 질문도 메타데이터를 갱신하도록 해시에 포함
+            current_manifest[question_id] = {
+                "hash": content_hash(
+                    question_text if category is None else f"{category}\n{question_text}"
+                ),
+                "model": embedding_model_id(),
+            }
+
+        changes = diff_manifest(previous_manifest, current_manifest)
+        report["unchanged"] = len(changes["unchanged"])
+
+        # CSV에서 사라진 질문 삭제
+        if changes["deleted"]:
+            collection.delete(
+                ids=[f"{collection_name}_{question_id}" for question_id in changes["deleted"]]
+            )
+            report["deleted"] = len(changes["deleted"])
 
-        print(f"총 {len(category_data)}개의 질문 처리 중...")
+        # 추가/변경된 질문만 배치 단위로 동시에 임베딩
+        pending_ids = changes["added"] + changes["updated"]
+        print(
+            f"총 {len(data)}개 중 {len(pending_ids)}개 임베딩 필요 "
+            f"(변경없음 {report['unchanged']}개, 삭제 {report['deleted']}개)"
+        )
 
-        for idx, row in category_data.iterrows():
-            try:
-                question = row["질문"]
-                question_id = row["ID"]
+        new_manifest = {
+            question_id: current_manifest[question_id]
+            for question_id in changes["unchanged"]
+        }
 
-                # 질문만으로 임베딩 생성
-                question_text = f"질문: {question}"
+        if pending_ids:
+            batch_embeddings = embed_texts(
+                [rows[question_id][1] for question_id in pending_ids],
+                label=collection_name,
+            )
+
+            documents = []
+            metadatas = []
+            ids = []
+            embeddings = []
+            added_ids = set(changes["added"])
 
-                # 임베딩 생성
-                embedding = get_embedding(question_text)
+            for question_id, embedding in zip(pending_ids, batch_embeddings):
+                question, question_text, category = rows[question_id]
                 if embedding is None:
-                    failed_count += 1
+                    report["failed"] += 1
                     print(f"⚠️ 임베딩 생성 실패 (ID: {question_id}): {question[:50]}...")
                     continue
 
                 documents.append(question_text)
-                metadatas.append(
-                    {"question": question, "question_id": str(question_id)}
-                )
+                embedding = shorten_embedding(embedding)
+                metadata = {"question": question, "question_id": question_id}
+                if category is not None:
+                    metadata["category"] = category
+                metadatas.append(metadata)
                 ids.append(f"{collection_name}_{question_id}")
                 embeddings.append(embedding)
+                new_manifest[question_id] = current_manifest[question_id]
+                if question_id in added_ids:
+                    report["added"] += 1
+                else:
+                    report["updated"] += 1
+
+            # ChromaDB에 반영 (클라이언트가 허용하는 최대 배치 크기 단위로 나눠 전송)
+            max_batch_size = chroma_client.get_max_batch_size()
+            for start in range(0, len(ids), max_batch_size):
+                end = start + max_batch_size
+                collection.upsert(
+                    embeddings=embeddings[start:end],
+                    documents=documents[start:end],
+                    metadatas=metadatas[start:end],
+                    ids=ids[start:end],
+                )
 
-                # API 호출 제한 고려 및 진행 상황 표시
-                if len(embeddings) % 10 == 0:
-                    progress = len(embeddings) / len(category_data) * 100
-                    print(
-                        f"진행률: {len(embeddings)}/{len(category_data)} ({progress:.1f}%) [실패: {failed_count}개]"
-                    )
-
-                if len(embeddings) % 50 == 0:
-                    time.sleep(1)  # API 제한 고려하여 1초 대기
-
-            except Exception as e:
-                failed_count += 1
-                print(f"❌ 데이터 처리 오류 (인덱스: {idx}): {e}")
-                continue
+        # 실패한 질문은 매니페스트에 남기지 않아 다음 실행 때 다시 시도된다
+        # 매니페스트 수정 시각이 인덱스 버전(시맨틱 캐시, 로컬 라우터 무효화 기준)이므로 바뀐 질문이 있을 때만 저장한다
+        if report["added"] or report["updated"] or report["deleted"]:
+            save_manifest(MANIFEST_DIR, collection_name, new_manifest)
 
-        # ChromaDB에 일괄 저장
-        if embeddings:
-            collection.add(
-                embeddings=embeddings, documents=documents, metadatas=metadatas, ids=ids
-            )
-
-            success_rate = len(embeddings) / len(category_data) * 100
-            print(f"✅ {category_name}: {len(embeddings)}개 문서 저장 완료")
-            print(
-                f"   성공률: {success_rate:.1f}% (총 {len(category_data)}개 중 {len(embeddings)}개 성공, {failed_count}개 실패)"
-            )
-        else:
-            print(
-                f"❌ {category_name}: 저장할 데이터가 없습니다 (실패: {failed_count}개)"
-            )
+        print(
+            f"✅ {category_name}: 추가 {report['added']}개, 변경 {report['updated']}개, "
+            f"삭제 {report['deleted']}개, 변경없음 {report['unchanged']}개, 실패 {report['failed']}개"
+        )
 
     except Exception as e:
-        print(f"❌ {category_name} 컬렉션 생성 중 오류: {e}")
+        print(f"❌ {category_name} 컬렉션 동기화 중 오류: {e}")
+        report["error"] = str(e)
+
+    return report
 
 
 def search_similar_questions(
@@ -184,47 +342,134 @@ for category_name, df in categories.items():
         print(f"  - {category_name}: {len(df)}개")
 
 
-def main():
-    """각 카테고리별 CSV 데이터를 로드하여 ChromaDB 컬렉션을 생성하는 메인 함수"""
+def main(
+    full_rebuild: bool = False,
+    layout: str = INDEX_LAYOUT,
+    export_numpy: bool = VECTOR_BACKEND == "numpy",
+):
+    """각 카테고리별 CSV 데이터를 로드하여 ChromaDB 컬렉션을 동기화하는 메인 함수
+
+    layout이 "sharded"이면 카테고리별 컬렉션을, "unified"이면 통합 컬렉션을, "both"이면 둘 다 동기화한다.
+    export_numpy이면 동기화한 컬렉션을 NumPy 백엔드용 인덱스로도 내보낸다.
+    """
     print("\n" + "=" * 50)
-    print("ChromaDB 벡터 데이터베이스 생성 시작")
+    print("ChromaDB 벡터 데이터베이스 " + ("전체 재생성" if full_rebuild else "증분 동기화") + " 시작")
     print("=" * 50)
 
     total_processed = 0
-    total_success = 0
+    reports = []
+
+    # 각 카테고리별로 ChromaDB 컬렉션을 병렬로 동기화
+    with ThreadPoolExecutor(max_workers=CATEGORY_WORKERS) as executor:
+        futures = []
+        for category_name, category_data in categories.items():
+            if len(category_data) > 0:
+                if layout in ("sharded", "both"):
+                    total_processed += len(category_data)
+                    futures.append(
+                        executor.submit(
+                            create_category_collection,
+                            category_name,
+                            category_data,
+                            full_rebuild,
+                        )
+                    )
+            else:
+                print(f"⚠️ {category_name}: 데이터가 없습니다")
 
-    # 각 카테고리별로 ChromaDB 컬렉션 생성
-    for category_name, category_data in categories.items():
-        if len(category_data) > 0:
-            total_processed += len(category_data)
-            create_category_collection(category_name, category_data)
-        else:
-            print(f"⚠️ {category_name}: 데이터가 없습니다")
+        for future in futures:
+            reports.append(future.result())
+
+        # "both"이면 카테고리별 동기화가 임베딩 캐시를 채운 뒤에 통합 컬렉션을 동기화한다
+        if layout in ("unified", "both"):
+            total_processed += sum(len(category_data) for category_data in categories.values())
+            reports.append(
+                executor.submit(create_unified_collection, categories, full_rebuild).result()
+            )
 
     print("\n" + "=" * 50)
-    print("모든 컬렉션 생성 완료!")
+    print("모든 컬렉션 동기화 완료!")
     print("=" * 50)
 
-    # 생성된 컬렉션 목록 확인
-    collections = chroma_client.list_collections()
-    print(f"\n생성된 컬렉션 목록 ({len(collections)}개):")
+    # 동기화한 컬렉션 목록 확인
+    print(f"\n동기화한 컬렉션 목록 ({len(reports)}개):")
 
     total_stored = 0
-    for collection in collections:
+    for report in reports:
+        try:
+            collection = chroma_client.get_collection(report["collection"])
+        except Exception:
+            continue
         count = collection.count()
         total_stored += count
         print(
             f"  - {collection.name}: {count}개 문서 (메타데이터: {collection.metadata})"
         )
 
+    # 하이브리드 검색용 BM25 역색인 생성
+    print(f"\nBM25 역색인 생성 ({LEXICAL_INDEX_DIR}):")
+    for report in reports:
+        try:
+            collection = chroma_client.get_collection(report["collection"])
+        except Exception:
+            continue
+        start = time.perf_counter()
+        count = export_lexical_index(collection, LEXICAL_INDEX_DIR)
+        print(f"  - {collection.name}: {count}개 질문 ({(time.perf_counter() - start) * 1000:.0f}ms)")
+
+    # NumPy 백엔드용 인덱스 내보내기
+    if export_numpy:
+        print(f"\nNumPy 인덱스 내보내기 ({NUMPY_INDEX_DIR}, {VECTOR_QUANTIZATION}):")
+        for report in reports:
+            try:
+                collection = chroma_client.get_collection(report["collection"])
+            except Exception:
+                continue
+            count = export_numpy_index(collection, NUMPY_INDEX_DIR, VECTOR_QUANTIZATION)
+            print(f"  - {collection.name}: {count}개 벡터")
+
+    # 변경 내역
+    print(f"\n=== 변경 내역 ===")
+    for report in reports:
+        print(
+            f"  - {report['collection']}: 추가 {report['added']}, 변경 {report['updated']}, "
+            f"삭제 {report['deleted']}, 변경없음 {report['unchanged']}, 실패 {report['failed']}"
+        )
+
     # 전체 통계
     print(f"\n=== 전체 처리 결과 ===")
     print(f"총 처리 대상: {total_processed}개")
     print(f"성공적으로 저장: {total_stored}개")
-    print(f"전체 성공률: {total_stored/total_processed*100:.1f}%")
+    if total_processed:
+        print(f"전체 성공률: {total_stored/total_processed*100:.1f}%")
+
+    cache_stats = embedding_cache.stats()
+    print(
+        f"임베딩 캐시: 적중 {cache_stats['hits']}개, 미스 {cache_stats['misses']}개 "
+        f"(적중률 {cache_stats['hit_rate']*100:.1f}%, 저장 {cache_stats['entries']}개)"
+    )
 
-    return True
+    return reports
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="카테고리별 ChromaDB 컬렉션 동기화")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="매니페스트를 무시하고 모든 컬렉션을 삭제 후 다시 생성",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=["sharded", "unified", "both"],
+        default=INDEX_LAYOUT,
+        help="카테고리별 컬렉션(sharded), 통합 컬렉션(unified) 또는 둘 다(both) 동기화",
+    )
+    parser.add_argument(
+        "--export-numpy",
+        action="store_true",
+        default=VECTOR_BACKEND == "numpy",
+        help="동기화한 컬렉션을 NumPy 백엔드용 메모리 맵 인덱스(.npy)로도 내보내기",
+    )
+    args = parser.parse_args()
+    main(full_rebuild=args.full, layout=args.layout, export_numpy=args.export_numpy)
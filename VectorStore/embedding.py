@@ -0,0 +1,277 @@
+"""
+OpenAI 임베딩 API를 여러 입력 단위(batch)로 호출하고
+배치들을 동시에 처리하며 rate limit 발생 시 재시도하는 임베딩 모듈
+인덱싱(chromaDB.py)과 검색(retriever.py)이 같은 영구 임베딩 캐시를 공유한다
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from openai import (
+    AsyncOpenAI,
+    OpenAI,
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+)
+
+from VectorStore.embedding_cache import EmbeddingCache
+
+# 환경 변수 로드
+load_dotenv()
+
+# 재시도는 이 모듈에서 직접 관리하므로 SDK 자체 재시도는 끈다
+client = OpenAI(max_retries=0)
+async_client = AsyncOpenAI(max_retries=0)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_NATIVE_DIMENSIONS = 1536
+
+# 인덱스에 저장하고 검색할 임베딩 차원 수 (기본값은 모델 원래 차원)
+# text-embedding-3 계열은 앞쪽 차원만 잘라 다시 정규화해도 되도록 학습되어 있으므로 (API의 dimensions 옵션과 같은 방식)
+# 캐시에는 원래 차원의 벡터를 저장하고, 인덱싱과 검색 직전에 잘라서 사용한다
+EMBEDDING_DIMENSIONS = min(
+    int(os.getenv("EMBEDDING_DIMENSIONS", str(EMBEDDING_NATIVE_DIMENSIONS))),
+    EMBEDDING_NATIVE_DIMENSIONS,
+)
+
+# 한 번의 요청에 담을 입력 개수
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+# 프로세스 전체에서 동시에 보낼 수 있는 임베딩 요청 수
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+# rate limit / 일시적 오류 발생 시 최대 재시도 횟수
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+
+# 영구 임베딩 캐시 (절대경로 사용)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join(current_dir, "embedding_cache.sqlite3")
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+embedding_cache = EmbeddingCache(
+    EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES
+)
+
+RETRYABLE_ERRORS = (
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+)
+
+# 여러 카테고리가 병렬로 돌아도 전체 동시 요청 수는 이 세마포어로 제한된다
+_request_slots = threading.BoundedSemaphore(EMBEDDING_MAX_CONCURRENCY)
+
+# rate limit 응답을 받으면 모든 스레드가 함께 쉬도록 공유하는 대기 종료 시각
+_cooldown_lock = threading.Lock()
+_cooldown_until = 0.0
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """응답 헤더의 retry-after 값 또는 지수 백오프로 다음 재시도까지 대기할 시간을 계산하는 함수"""
+    response = getattr(error, "response", None)
+    headers = response.headers if response is not None else {}
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    # 0.5, 1, 2, 4 ... 초 + jitter (최대 30초)
+    return min(30.0, 0.5 * (2**attempt)) + random.uniform(0, 0.5)
+
+
+def _wait_for_cooldown() -> None:
+    """다른 스레드가 rate limit을 만나 설정한 대기 시간이 끝날 때까지 기다리는 함수"""
+    remaining = _cooldown_until - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+def _extend_cooldown(delay: float) -> None:
+    """rate limit 발생 시 모든 요청이 함께 쉬도록 공유 대기 시각을 늘리는 함수"""
+    global _cooldown_until
+    with _cooldown_lock:
+        _cooldown_until = max(_cooldown_until, time.monotonic() + delay)
+
+
+def embedding_model_id(dimensions: int = EMBEDDING_DIMENSIONS) -> str:
+    """매니페스트에 기록할 임베딩 모델 식별자 (차원을 줄였으면 "모델@차원")"""
+    if dimensions >= EMBEDDING_NATIVE_DIMENSIONS:
+        return EMBEDDING_MODEL
+    return f"{EMBEDDING_MODEL}@{dimensions}"
+
+
+def shorten_embedding(
+    embedding: Optional[List[float]], dimensions: int = EMBEDDING_DIMENSIONS
+) -> Optional[List[float]]:
+    """임베딩을 앞쪽 dimensions개 차원만 남기고 다시 정규화하는 함수 (원래 차원 이상이면 그대로 반환)"""
+    if embedding is None or dimensions >= len(embedding):
+        return embedding
+    vector = np.asarray(embedding[:dimensions], dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector.tolist()
+
+
+def create_embeddings(
+    texts: List[str], model: str = EMBEDDING_MODEL
+) -> List[List[float]]:
+    """여러 텍스트를 한 번의 API 요청으로 임베딩하고, rate limit 등 일시적 오류는 백오프 후 재시도하는 함수"""
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        _wait_for_cooldown()
+        try:
+            with _request_slots:
+                response = client.embeddings.create(input=texts, model=model)
+            # 응답 순서는 index 필드를 기준으로 입력 순서와 맞춘다
+            data = sorted(response.data, key=lambda item: item.index)
+            return [item.embedding for item in data]
+        except RETRYABLE_ERRORS as e:
+            if attempt == EMBEDDING_MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            if isinstance(e, RateLimitError):
+                _extend_cooldown(delay)
+            print(
+                f"⏳ 임베딩 요청 재시도 ({attempt + 1}/{EMBEDDING_MAX_RETRIES}) - {delay:.1f}초 대기: {e}"
+            )
+            time.sleep(delay)
+
+
+async def create_embeddings_async(
+    texts: List[str], model: str = EMBEDDING_MODEL
+) -> List[List[float]]:
+    """create_embeddings의 비동기 버전 (요청 처리 경로에서 이벤트 루프를 막지 않는다)"""
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        remaining = _cooldown_until - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        try:
+            response = await async_client.embeddings.create(input=texts, model=model)
+            data = sorted(response.data, key=lambda item: item.index)
+            return [item.embedding for item in data]
+        except RETRYABLE_ERRORS as e:
+            if attempt == EMBEDDING_MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            if isinstance(e, RateLimitError):
+                _extend_cooldown(delay)
+            print(
+                f"⏳ 임베딩 요청 재시도 ({attempt + 1}/{EMBEDDING_MAX_RETRIES}) - {delay:.1f}초 대기: {e}"
+            )
+            await asyncio.sleep(delay)
+
+
+def get_embedding(text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+    """캐시를 먼저 조회하고, 없을 때만 OpenAI API로 텍스트 임베딩을 생성하는 함수"""
+    cached = embedding_cache.get_many([text], model)[0]
+    if cached is not None:
+        return cached
+
+    embedding = create_embeddings([text], model=model)[0]
+    embedding_cache.put_many([text], [embedding], model)
+    return embedding
+
+
+async def get_embedding_async(
+    text: str, model: str = EMBEDDING_MODEL, executor: Optional[ThreadPoolExecutor] = None
+) -> List[float]:
+    """get_embedding의 비동기 버전
+
+    SQLite 캐시 조회/저장은 이벤트 루프를 막지 않도록 executor(None이면 기본 스레드 풀)에서 실행한다.
+    """
+    loop = asyncio.get_running_loop()
+    cached = (
+        await loop.run_in_executor(executor, embedding_cache.get_many, [text], model)
+    )[0]
+    if cached is not None:
+        return cached
+
+    embedding = (await create_embeddings_async([text], model=model))[0]
+    await loop.run_in_executor(
+        executor, embedding_cache.put_many, [text], [embedding], model
+    )
+    return embedding
+
+
+def embed_texts(
+    texts: List[str],
+    model: str = EMBEDDING_MODEL,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    label: str = "",
+) -> List[Optional[List[float]]]:
+    """텍스트 리스트를 캐시에서 먼저 찾고, 없는 텍스트만 배치로 나누어 동시에 임베딩하여 입력 순서대로 반환하는 함수 (실패한 배치는 None)"""
+    results: List[Optional[List[float]]] = embedding_cache.get_many(texts, model)
+
+    # 캐시에 없는 텍스트만 (중복 제거 후) API로 요청
+    missing_texts = list(
+        dict.fromkeys(text for text, result in zip(texts, results) if result is None)
+    )
+    if label:
+        print(
+            f"{label} 임베딩 캐시: {len(texts) - len(missing_texts)}개 적중, {len(missing_texts)}개 요청 필요"
+        )
+    if not missing_texts:
+        return results
+
+    fetched = _embed_uncached(missing_texts, model, batch_size, label)
+    embedding_cache.put_many(missing_texts, fetched, model)
+
+    fetched_by_text = dict(zip(missing_texts, fetched))
+    return [
+        result if result is not None else fetched_by_text.get(text)
+        for text, result in zip(texts, results)
+    ]
+
+
+def _embed_uncached(
+    texts: List[str], model: str, batch_size: int, label: str
+) -> List[Optional[List[float]]]:
+    """캐시를 거치지 않고 텍스트 리스트를 배치로 나누어 동시에 임베딩하는 함수 (실패한 배치는 None)"""
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return []
+
+    results: List[Optional[List[float]]] = [None] * len(texts)
+    done_count = 0
+    progress_lock = threading.Lock()
+
+    def run_batch(batch_index: int) -> None:
+        nonlocal done_count
+        batch = batches[batch_index]
+        start = batch_index * batch_size
+        try:
+            embeddings = create_embeddings(batch, model=model)
+            results[start : start + len(batch)] = embeddings
+        except Exception as e:
+            print(f"❌ {label} 임베딩 배치 실패 ({start}~{start + len(batch) - 1}): {e}")
+
+        with progress_lock:
+            done_count += len(batch)
+            progress = done_count / len(texts) * 100
+            print(f"{label} 진행률: {done_count}/{len(texts)} ({progress:.1f}%)")
+
+    # 실제 동시 요청 수는 _request_slots 세마포어가 제한한다
+    with ThreadPoolExecutor(max_workers=EMBEDDING_MAX_CONCURRENCY) as executor:
+        list(executor.map(run_batch, range(len(batches))))
+
+    return results
@@ -0,0 +1,140 @@
+"""
+(임베딩 모델, 정규화된 텍스트 해시)를 키로 임베딩 벡터를 SQLite 파일에 저장하여
+인덱싱과 검색에서 같은 텍스트에 대한 임베딩 API 호출을 재사용하는 캐시 모듈
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, List, Optional
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """유니코드 정규화(NFC) 후 앞뒤 공백을 제거하고 연속된 공백을 하나로 합치는 함수"""
+    text = unicodedata.normalize("NFC", str(text))
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def cache_key(text: str, model: str) -> str:
+    """임베딩 모델과 정규화된 텍스트로 캐시 키(sha256)를 생성하는 함수"""
+    normalized = normalize_text(text)
+    return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite 기반의 크기 제한(LRU 방식 제거)이 있는 영구 임베딩 캐시"""
+
+    def __init__(self, path: str, max_entries: int = 200000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, texts: List[str], model: str) -> List[Optional[List[float]]]:
+        """여러 텍스트의 임베딩을 캐시에서 조회하여 입력 순서대로 반환하는 함수 (없으면 None)"""
+        keys = [cache_key(text, model) for text in texts]
+        found: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            # SQLite 변수 개수 제한을 고려하여 나누어 조회
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+            results = [found.get(key) for key in keys]
+            hit_count = sum(1 for result in results if result is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+
+        return results
+
+    def put_many(
+        self, texts: List[str], embeddings: List[List[float]], model: str
+    ) -> None:
+        """여러 텍스트의 임베딩을 캐시에 저장하고, 최대 개수를 넘으면 오래 사용되지 않은 항목을 제거하는 함수"""
+        now = time.time()
+        rows = [
+            (cache_key(text, model), model, array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+            if embedding is not None
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._count += self._conn.total_changes - before
+
+            if self._count > self.max_entries:
+                # 매번 제거하지 않도록 최대 개수의 90%까지 한 번에 줄인다
+                remove_count = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    """
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+                    )
+                    """,
+                    (remove_count,),
+                )
+                self.evictions += remove_count
+                self._count -= remove_count
+
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """캐시 적중/미스 횟수와 적중률, 저장된 항목 수를 반환하는 함수"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": self._count,
+                "evictions": self.evictions,
+            }
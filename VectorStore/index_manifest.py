@@ -0,0 +1,93 @@
+"""
+컬렉션별로 (질문 ID, 내용 해시, 임베딩 모델) 정보를 기록하는 매니페스트를 관리하고
+이전 인덱싱 결과와 비교하여 추가/변경/삭제된 질문을 계산하는 모듈
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+
+def content_hash(text: str) -> str:
+    """임베딩 대상 텍스트의 내용 해시(sha256)를 계산하는 함수"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def manifest_path(manifest_dir: str, collection_name: str) -> str:
+    """컬렉션 이름에 해당하는 매니페스트 파일 경로를 반환하는 함수"""
+    return os.path.join(manifest_dir, f"{collection_name}.json")
+
+
+def load_manifest(manifest_dir: str, collection_name: str) -> Dict[str, Dict[str, str]]:
+    """매니페스트 파일을 읽어 {질문 ID: {"hash", "model"}} 형태로 반환하는 함수 (없으면 빈 딕셔너리)"""
+    path = manifest_path(manifest_dir, collection_name)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("entries", {})
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"⚠️ 매니페스트를 읽을 수 없어 무시합니다 ({path}): {e}")
+        return {}
+
+
+def save_manifest(
+    manifest_dir: str, collection_name: str, entries: Dict[str, Dict[str, str]]
+) -> None:
+    """매니페스트를 임시 파일에 쓴 뒤 교체하여 중간에 중단되어도 파일이 깨지지 않도록 저장하는 함수"""
+    os.makedirs(manifest_dir, exist_ok=True)
+    path = manifest_path(manifest_dir, collection_name)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"collection": collection_name, "entries": entries},
+            f,
+            ensure_ascii=False,
+            indent=1,
+        )
+    os.replace(tmp_path, path)
+
+
+def remove_manifest(manifest_dir: str, collection_name: str) -> None:
+    """컬렉션 전체 재생성 시 기존 매니페스트를 삭제하는 함수"""
+    try:
+        os.remove(manifest_path(manifest_dir, collection_name))
+    except FileNotFoundError:
+        pass
+
+
+def manifest_version(manifest_dir: str, collection_name: str):
+    """매니페스트 파일의 수정 시각(ns)을 인덱스 버전으로 반환하는 함수 (없으면 None)
+
+    질문이 추가/변경/삭제된 동기화에서만 매니페스트가 다시 저장되므로, 값이 바뀌면 인덱스 내용이 바뀐 것이다.
+    """
+    try:
+        return os.stat(manifest_path(manifest_dir, collection_name)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def diff_manifest(
+    previous: Dict[str, Dict[str, str]],
+    current: Dict[str, Dict[str, str]],
+) -> Dict[str, List[str]]:
+    """이전/현재 매니페스트를 비교하여 추가, 변경, 삭제, 변경없음 질문 ID 목록을 반환하는 함수"""
+    added, updated, unchanged = [], [], []
+    for question_id, entry in current.items():
+        old_entry = previous.get(question_id)
+        if old_entry is None:
+            added.append(question_id)
+        elif old_entry != entry:
+            updated.append(question_id)
+        else:
+            unchanged.append(question_id)
+
+    deleted = [question_id for question_id in previous if question_id not in current]
+
+    return {
+        "added": added,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": unchanged,
+    }
@@ -0,0 +1,230 @@
+"""
+질문 텍스트에 대한 로컬 BM25 역색인 모듈
+"반품안심케어", "쇼핑라이브"처럼 정확한 상품 용어가 중요한 질문은 임베딩 검색만으로 놓치는 경우가 있어,
+띄어쓰기와 조사 차이에 강한 문자 n-gram으로 색인하고 벡터 검색 결과와 순위 기반(RRF)으로 합친다
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from VectorStore.embedding_cache import normalize_text
+
+# 문자 n-gram 길이 (한국어는 2-gram이 형태소 분석 없이도 재현율이 좋고, 3-gram이 정확도를 보완한다)
+NGRAM_SIZES = (2, 3)
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+def char_ngrams(text: str, sizes=NGRAM_SIZES) -> List[str]:
+    """텍스트를 정규화한 뒤 단어(공백/문장부호 기준)마다 문자 n-gram으로 나누는 함수
+
+    n보다 짧은 단어는 단어 자체를 토큰으로 사용하고, 단어 경계를 넘는 n-gram은 만들지 않는다.
+    """
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(normalize_text(text).lower()):
+        if len(word) < min(sizes):
+            tokens.append(word)
+            continue
+        for size in sizes:
+            tokens.extend(word[i : i + size] for i in range(len(word) - size + 1))
+    return tokens
+
+
+class BM25Index:
+    """문서별 BM25 가중치를 미리 계산해 둔 역색인
+
+    게시 목록(posting)은 토큰 순서로 이어 붙인 문서 번호/가중치 배열과 토큰별 시작 위치(offsets)로 저장하며(CSR 형식),
+    질문 처리 시에는 질문 토큰의 게시 목록 가중치만 더하면 되므로 검색 비용이 게시 목록 길이에 비례한다.
+    """
+
+    def __init__(self, ids, metadatas, documents, terms, offsets, rows, weights):
+        self.ids = ids
+        self.metadatas = metadatas
+        self.documents = documents
+        self.term_index = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+
+        self.category_rows: Dict[str, np.ndarray] = {}
+        categories = [metadata.get("category") for metadata in metadatas]
+        for category in set(categories):
+            if category is not None:
+                self.category_rows[category] = np.array(
+                    [i for i, value in enumerate(categories) if value == category],
+                    dtype=np.int64,
+                )
+
+    @classmethod
+    def build(cls, ids, metadatas, documents, texts: List[str]) -> "BM25Index":
+        """색인할 텍스트 목록으로 BM25 역색인을 만드는 함수"""
+        vocabulary: Dict[str, int] = {}
+        term_ids, rows, tfs, lengths = [], [], [], []
+        for row, text in enumerate(texts):
+            counts = Counter(char_ngrams(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                tfs.append(tf)
+
+        term_ids = np.array(term_ids, dtype=np.int64)
+        rows = np.array(rows, dtype=np.int64)
+        tfs = np.array(tfs, dtype=np.float32)
+        lengths = np.array(lengths, dtype=np.float32)
+        average_length = max(float(lengths.mean()), 1.0) if len(lengths) else 1.0
+
+        doc_freq = np.bincount(term_ids, minlength=len(vocabulary))
+        idf = np.log(1 + (len(texts) - doc_freq + 0.5) / (doc_freq + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / average_length)
+        weights = (idf[term_ids] * tfs * (BM25_K1 + 1) / (tfs + norm)).astype(np.float32)
+
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(doc_freq)]).astype(np.int64)
+        return cls(
+            ids, metadatas, documents, list(vocabulary), offsets, rows[order], weights[order]
+        )
+
+    def search(self, query: str, k: int, categories=None) -> Dict:
+        """질문과 BM25 점수가 높은 문서 k개를 ChromaDB 결과 형식(+ scores)으로 반환하는 함수"""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term, query_tf in Counter(char_ngrams(query)).items():
+            i = self.term_index.get(term)
+            if i is not None:
+                start, end = self.offsets[i], self.offsets[i + 1]
+                scores[self.rows[start:end]] += query_tf * self.weights[start:end]
+
+        if categories:
+            if isinstance(categories, str):
+                categories = [categories]
+            mask = np.zeros(len(scores), dtype=bool)
+            for category in dict.fromkeys(categories):
+                if category in self.category_rows:
+                    mask[self.category_rows[category]] = True
+            scores[~mask] = 0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = matched[np.argsort(-scores[matched], kind="stable")]
+
+        return {
+            "ids": [[self.ids[i] for i in top]],
+            "metadatas": [[self.metadatas[i] for i in top]],
+            "documents": [[self.documents[i] for i in top]],
+            "scores": [[float(scores[i]) for i in top]],
+        }
+
+    def save(self, path: str) -> None:
+        """역색인을 .npz 파일 하나로 저장하는 함수 (임시 파일에 쓴 뒤 교체)"""
+        tmp_path = f"{path}.tmp"
+        meta = {"ids": self.ids, "metadatas": self.metadatas, "documents": self.documents}
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                terms=np.array(list(self.term_index), dtype=str),
+                offsets=self.offsets,
+                rows=self.rows.astype(np.int32),
+                weights=self.weights,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """save로 저장한 역색인을 읽는 함수"""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                meta["ids"],
+                meta["metadatas"],
+                meta["documents"],
+                data["terms"].tolist(),
+                data["offsets"],
+                data["rows"].astype(np.int64),
+                data["weights"],
+            )
+
+
+def lexical_index_path(directory: str, collection_name: str) -> str:
+    return os.path.join(directory, f"{collection_name}.npz")
+
+
+def export_lexical_index(collection, directory: str) -> int:
+    """ChromaDB 컬렉션의 질문 메타데이터로 BM25 역색인을 만들어 저장하고 색인한 문서 수를 반환하는 함수"""
+    os.makedirs(directory, exist_ok=True)
+    data = collection.get(include=["metadatas", "documents"])
+    index = BM25Index.build(
+        data["ids"],
+        data["metadatas"],
+        data["documents"],
+        [metadata.get("question", "") for metadata in data["metadatas"]],
+    )
+    index.save(lexical_index_path(directory, collection.name))
+    return len(data["ids"])
+
+
+class LexicalIndexStore:
+    """컬렉션별 BM25 역색인 파일을 처음 필요할 때 읽고, 파일이 다시 저장되면 다시 읽는 저장소"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._indexes: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, collection_name: str) -> Optional[BM25Index]:
+        """컬렉션의 역색인을 반환하는 함수 (파일이 없으면 None)"""
+        path = lexical_index_path(self.directory, collection_name)
+        try:
+            version = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._indexes.get(collection_name)
+            if cached is None or cached[0] != version:
+                cached = (version, BM25Index.load(path))
+                self._indexes[collection_name] = cached
+            return cached[1]
+
+
+def reciprocal_rank_fusion(result_lists, k: int, rrf_k: int = 60) -> Dict:
+    """여러 검색 결과 목록을 질문 ID 기준 Reciprocal Rank Fusion 점수(sum 1 / (rrf_k + 순위))로 합쳐 상위 k개를 반환하는 함수
+
+    거리(distances)는 벡터 검색 결과에 있던 값을 유지하고, 어휘 검색에만 나온 문서는 None이다.
+    """
+    fused: Dict[str, dict] = {}
+    for results in result_lists:
+        if not results:
+            continue
+        metadatas = (results.get("metadatas") or [[]])[0]
+        documents = (results.get("documents") or [[]])[0] or [None] * len(metadatas)
+        distances = (results.get("distances") or [[]])[0] or [None] * len(metadatas)
+        for rank, (metadata, document, distance) in enumerate(
+            zip(metadatas, documents, distances), 1
+        ):
+            key = str(metadata.get("question_id"))
+            hit = fused.setdefault(
+                key,
+                {"score": 0.0, "metadata": metadata, "document": document, "distance": None},
+            )
+            hit["score"] += 1 / (rrf_k + rank)
+            if distance is not None and (hit["distance"] is None or distance < hit["distance"]):
+                hit["distance"] = distance
+
+    hits = sorted(fused.values(), key=lambda hit: -hit["score"])[:k]
+    return {
+        "metadatas": [[hit["metadata"] for hit in hits]],
+        "documents": [[hit["document"] for hit in hits]],
+        "distances": [[hit["distance"] for hit in hits]],
+    }
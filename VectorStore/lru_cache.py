@@ -0,0 +1,83 @@
+"""
+최대 크기와 만료 시간(TTL)을 가진 스레드 안전한 인메모리 LRU 캐시 모듈
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUTTLCache:
+    """최대 크기를 넘으면 가장 오래 사용되지 않은 항목을, TTL이 지나면 만료된 항목을 제거하는 캐시"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """키에 해당하는 값을 반환하고 최근 사용으로 표시하는 함수 (없거나 만료되면 None)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """적중/미스 통계와 사용 순서를 바꾸지 않고 값을 반환하는 함수 (없거나 만료되면 None)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                return None
+            return item[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """값을 저장하고 최대 크기를 넘으면 가장 오래 사용되지 않은 항목을 제거하는 함수"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """키에 해당하는 항목을 제거하고 값을 반환하는 함수"""
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[0] if item else None
+
+    def clear(self) -> None:
+        """모든 항목을 제거하는 함수"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        """적중/미스 횟수, 적중률, 현재 크기를 반환하는 함수"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "evictions": self.evictions,
+            }
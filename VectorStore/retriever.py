@@ -3,43 +3,303 @@ ChromaDB에서 유사한 질문을 검색하고
 결과를 파싱하여 반환하는 검색 모듈
 """
 
+import asyncio
 import os
+import sys
 import chromadb
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.categories import CATEGORY_COLLECTIONS, UNIFIED_COLLECTION
+from VectorStore.embedding import (
+    embedding_cache,
+    get_embedding,
+    get_embedding_async,
+    shorten_embedding,
+)
+from VectorStore.embedding_cache import normalize_text
+from VectorStore.index_manifest import manifest_version
+from VectorStore.lexical_index import LexicalIndexStore, reciprocal_rank_fusion
+from VectorStore.lru_cache import LRUTTLCache
+from VectorStore.vector_backend import ChromaBackend, NumpyBackend
 
 # 환경 변수 로드
 load_dotenv()
-client = OpenAI()
 
 # ChromaDB 클라이언트 초기화 (절대경로 사용)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 chroma_db_path = os.path.join(current_dir, "chroma_db")
 chroma_client = chromadb.PersistentClient(path=chroma_db_path)
+# chromaDB.py가 동기화할 때 기록하는 컬렉션별 매니페스트 위치
+manifest_dir = os.path.join(chroma_db_path, "manifests")
+
+# "unified"이면 카테고리별 컬렉션 대신 통합 컬렉션을 카테고리 메타데이터로 필터링하여 검색한다
+INDEX_LAYOUT = os.getenv("INDEX_LAYOUT", "sharded")
+
+# 벡터 검색 백엔드: "chroma"(기본) 또는 "numpy"(chromaDB.py가 내보낸 메모리 맵 .npy 인덱스를 전수 검색)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+numpy_index_dir = os.path.join(current_dir, "numpy_index")
+# NumPy 백엔드의 검색 행렬 형식 (float32 / float16 / int8)과, 양자화 시 float32로 다시 채점할 후보 수 배율
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "float32")
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+if VECTOR_BACKEND == "numpy":
+    vector_backend = NumpyBackend(
+        numpy_index_dir,
+        quantization=VECTOR_QUANTIZATION,
+        rescore_factor=VECTOR_RESCORE_FACTOR,
+    )
+else:
+    vector_backend = ChromaBackend(chroma_client)
+
+# 벡터 검색 결과와 BM25 문자 n-gram 어휘 검색 결과를 RRF로 합치는 하이브리드 검색 (chromaDB.py가 만든 역색인 사용)
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+# 각 검색에서 RRF에 넣을 후보 수와 RRF 순위 상수
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+lexical_index_dir = os.path.join(current_dir, "lexical_index")
+lexical_indexes = LexicalIndexStore(lexical_index_dir)
+_missing_lexical_indexes = set()
+
+# ChromaDB 조회, BM25 채점, SQLite 임베딩 캐시 조회는 동기 작업이므로 크기가 제한된 전용 스레드 풀에서 실행한다
+CHROMA_QUERY_WORKERS = int(os.getenv("CHROMA_QUERY_WORKERS", "8"))
+chroma_executor = ThreadPoolExecutor(
+    max_workers=CHROMA_QUERY_WORKERS, thread_name_prefix="chroma-query"
+)
+
+# 반복되는 질문의 임베딩을 프로세스 메모리에 보관하는 캐시
+QUERY_CACHE_MAX_SIZE = int(os.getenv("QUERY_CACHE_MAX_SIZE", "10000"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+query_embedding_cache = LRUTTLCache(
+    max_size=QUERY_CACHE_MAX_SIZE, ttl=QUERY_CACHE_TTL
+)
+
+
+def normalize_query(query: str) -> str:
+    """공백, 유니코드 표현 차이를 없앤 질문 캐시 키를 만드는 함수
+
+    문서 임베딩은 원래 대소문자로 만들었으므로 "AI", "PC" 같은 영문 용어의 대소문자는 그대로 둔다.
+    """
+    return normalize_text(query)
+
+
+def get_query_embedding(query: str) -> list:
+    """인메모리 LRU 캐시를 먼저 조회하고, 없을 때만 질문 임베딩을 생성하는 함수 (EMBEDDING_DIMENSIONS 차원으로 줄여 반환)
+
+    캐시 키와 같은 정규화된 질문을 임베딩하므로 공백만 다른 질문은 요청 순서와 관계없이 같은 벡터를 받는다.
+    """
+    key = normalize_query(query)
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        embedding = shorten_embedding(get_embedding(f"질문: {key}"))
+        query_embedding_cache.set(key, embedding)
+    return embedding
+
+
+async def get_query_embedding_async(query: str) -> list:
+    """get_query_embedding의 비동기 버전 (SQLite 임베딩 캐시 조회는 전용 스레드 풀에서 실행)"""
+    key = normalize_query(query)
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        embedding = shorten_embedding(
+            await get_embedding_async(f"질문: {key}", executor=chroma_executor)
+        )
+        query_embedding_cache.set(key, embedding)
+    return embedding
+
+
+def query_cache_stats() -> dict:
+    """질문 임베딩 캐시의 적중률 통계를 반환하는 함수"""
+    return query_embedding_cache.stats()
+
+
+def embedding_cache_stats() -> dict:
+    """인덱싱과 검색이 함께 쓰는 영구(SQLite) 임베딩 캐시의 적중률 통계를 반환하는 함수"""
+    return embedding_cache.stats()
+
+
+def index_version(collection_name: str):
+    """컬렉션의 인덱스 버전(매니페스트 수정 시각)을 반환하는 함수. 인덱스가 다시 만들어지면 값이 바뀐다"""
+    if INDEX_LAYOUT == "unified":
+        collection_name = UNIFIED_COLLECTION
+    return manifest_version(manifest_dir, collection_name)
+
+
+def query_unified(query_embedding: list, k: int, categories=None):
+    """통합 컬렉션에서 한 번의 ANN 검색으로 유사한 질문들을 k개만큼 검색하는 함수
+
+    categories가 None이면 전체, 컬렉션 이름 하나 또는 목록이면 해당 카테고리만 검색한다.
+    """
+    return vector_backend.query(UNIFIED_COLLECTION, [query_embedding], k, categories)
+
+
+def query_collection(collection_name: str, query_embedding: list, k: int):
+    """지정된 컬렉션에서 쿼리 임베딩과 유사한 질문들을 k개만큼 검색하는 함수
+
+    VECTOR_BACKEND에 따라 ChromaDB 또는 NumPy 인덱스를 검색하고, INDEX_LAYOUT이 "unified"이면 통합 컬렉션에서 해당 카테고리만 필터링하여 검색한다.
+    """
+    if INDEX_LAYOUT == "unified":
+        return query_unified(query_embedding, k, categories=collection_name)
+
+    # 유사도 검색 수행
+    return vector_backend.query(collection_name, [query_embedding], k)
 
 
-def get_embedding(text: str) -> list:
-    """OpenAI API를 사용하여 텍스트 임베딩 생성"""
-    response = client.embeddings.create(input=text, model="text-embedding-3-small")
-    return response.data[0].embedding
+def lexical_search(query: str, k: int, collection_name: str = None, categories=None):
+    """BM25 역색인에서 질문과 어휘가 겹치는 질문들을 k개만큼 검색하는 함수 (역색인이 없으면 None)
+
+    INDEX_LAYOUT이 "unified"이면 통합 역색인에서 collection_name(또는 categories) 카테고리만 검색한다.
+    """
+    if INDEX_LAYOUT == "unified":
+        if collection_name is not None:
+            categories = collection_name
+        collection_name = UNIFIED_COLLECTION
+
+    index = lexical_indexes.get(collection_name)
+    if index is None:
+        if collection_name not in _missing_lexical_indexes:
+            _missing_lexical_indexes.add(collection_name)
+            print(f"⚠️ {collection_name} 어휘 역색인이 없어 벡터 검색만 사용합니다 (chromaDB.py를 다시 실행하세요)")
+        return None
+    return index.search(query, k, categories=categories)
+
+
+def candidate_count(k: int) -> int:
+    """하이브리드 검색이면 RRF에 넣을 벡터 검색 후보 수를, 아니면 k를 반환하는 함수"""
+    return max(k, HYBRID_CANDIDATES) if HYBRID_SEARCH else k
+
+
+def fuse_results(vector_results, lexical_results, k: int):
+    """벡터 검색 결과와 어휘 검색 결과를 RRF로 합쳐 상위 k개만 남기는 함수 (어휘 검색 결과가 없으면 벡터 결과만 사용)"""
+    if not HYBRID_SEARCH or lexical_results is None:
+        return merge_results([vector_results], k)
+    return reciprocal_rank_fusion([vector_results, lexical_results], k, rrf_k=RRF_K)
 
 
 def chromadb_retriever_invoke(collection_name: str, query: str, k: int):
     """지정된 컬렉션에서 쿼리와 유사한 질문들을 k개만큼 검색하여 반환하는 함수"""
-    # 컬렉션 가져오기
-    collection = chroma_client.get_collection(collection_name)
-
     # 쿼리 임베딩 생성
-    query_embedding = get_embedding(f"질문: {query}")
+    query_embedding = get_query_embedding(query)
 
-    # 유사도 검색 수행
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=k,
-        include=["documents", "metadatas"],
+    if not HYBRID_SEARCH:
+        return query_collection(collection_name, query_embedding, k)
+
+    vector_results = query_collection(collection_name, query_embedding, candidate_count(k))
+    lexical_results = lexical_search(query, HYBRID_CANDIDATES, collection_name)
+    return fuse_results(vector_results, lexical_results, k)
+
+
+async def chromadb_retriever_invoke_async(collection_name: str, query: str, k: int):
+    """chromadb_retriever_invoke의 비동기 버전 (ChromaDB 조회와 BM25 채점은 전용 스레드 풀에서 실행)"""
+    query_embedding = await get_query_embedding_async(query)
+
+    loop = asyncio.get_running_loop()
+    if not HYBRID_SEARCH:
+        return await loop.run_in_executor(
+            chroma_executor, query_collection, collection_name, query_embedding, k
+        )
+
+    vector_results, lexical_results = await asyncio.gather(
+        loop.run_in_executor(
+            chroma_executor, query_collection, collection_name, query_embedding, candidate_count(k)
+        ),
+        loop.run_in_executor(
+            chroma_executor, lexical_search, query, HYBRID_CANDIDATES, collection_name
+        ),
+    )
+    return fuse_results(vector_results, lexical_results, k)
+
+
+async def search_categories_async(query: str, k: int, categories=None):
+    """여러 카테고리(또는 categories가 None이면 전체)에서 유사한 질문들을 k개만큼 검색하는 함수
+
+    통합 컬렉션이면 카테고리 필터와 함께 한 번만 검색하고, 카테고리별 컬렉션이면
+    각 컬렉션을 동시에 검색한 뒤 거리순으로 합친다.
+    하이브리드 검색이면 어휘 검색 결과도 같은 방식으로 모아 RRF로 합친다.
+    ChromaDB 조회와 BM25 채점은 모두 전용 스레드 풀에서 실행한다.
+    """
+    query_embedding = await get_query_embedding_async(query)
+    loop = asyncio.get_running_loop()
+    candidates = candidate_count(k)
+
+    if INDEX_LAYOUT == "unified":
+        if not HYBRID_SEARCH:
+            return await loop.run_in_executor(
+                chroma_executor, query_unified, query_embedding, candidates, categories
+            )
+        vector_results, lexical_results = await asyncio.gather(
+            loop.run_in_executor(
+                chroma_executor, query_unified, query_embedding, candidates, categories
+            ),
+            loop.run_in_executor(
+                chroma_executor, lexical_search, query, HYBRID_CANDIDATES, None, categories
+            ),
+        )
+        return fuse_results(vector_results, lexical_results, k)
+
+    if categories is None:
+        categories = list(CATEGORY_COLLECTIONS.values())
+    elif isinstance(categories, str):
+        categories = [categories]
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                chroma_executor, query_collection, collection_name, query_embedding, candidates
+            )
+            for collection_name in categories
+        )
     )
+    vector_results = merge_results(results, candidates)
+    if not HYBRID_SEARCH:
+        return vector_results
 
-    return results
+    lexical_results = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                chroma_executor, lexical_search, query, HYBRID_CANDIDATES, collection_name
+            )
+            for collection_name in categories
+        )
+    )
+    if any(results is None for results in lexical_results):
+        return fuse_results(vector_results, None, k)
+    return fuse_results(
+        vector_results, merge_lexical_results(lexical_results, HYBRID_CANDIDATES), k
+    )
+
+
+def merge_results(results_list, k: int):
+    """여러 컬렉션의 검색 결과를 거리순으로 합쳐 상위 k개만 남기는 함수"""
+    hits = []
+    for results in results_list:
+        metadatas = (results.get("metadatas") or [[]])[0]
+        documents = (results.get("documents") or [[]])[0] or [None] * len(metadatas)
+        distances = (results.get("distances") or [[]])[0] or [0.0] * len(metadatas)
+        hits.extend(zip(distances, metadatas, documents))
+    hits.sort(key=lambda hit: hit[0])
+    hits = hits[:k]
+    return {
+        "metadatas": [[metadata for _, metadata, _ in hits]],
+        "documents": [[document for _, _, document in hits]],
+        "distances": [[distance for distance, _, _ in hits]],
+    }
+
+
+def merge_lexical_results(results_list, k: int):
+    """여러 역색인의 어휘 검색 결과를 BM25 점수순으로 합쳐 상위 k개만 남기는 함수"""
+    hits = []
+    for results in results_list:
+        hits.extend(
+            zip(results["scores"][0], results["metadatas"][0], results["documents"][0])
+        )
+    hits.sort(key=lambda hit: -hit[0])
+    hits = hits[:k]
+    return {
+        "metadatas": [[metadata for _, metadata, _ in hits]],
+        "documents": [[document for _, _, document in hits]],
+        "scores": [[score for score, _, _ in hits]],
+    }
 
 
 def parse_results(results):
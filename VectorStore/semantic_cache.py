@@ -0,0 +1,149 @@
+"""
+질문 임베딩의 코사인 유사도로 이전에 생성한 답변을 찾아 재사용하는 시맨틱 답변 캐시 모듈
+카테고리(스코프)별로 따로 저장하고, 인덱스 버전이 바뀌면 해당 스코프의 답변을 모두 버린다
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import numpy as np
+
+
+class _Scope:
+    """한 스코프(카테고리)의 답변 목록과 유사도 계산용 행렬"""
+
+    def __init__(self, version: Hashable):
+        self.version = version
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.keys: list = []
+        # None이면 entries가 바뀌어 다시 만들어야 하는 상태
+        self.matrix: Optional[np.ndarray] = None
+
+    def rebuild(self) -> None:
+        """저장된 벡터가 바뀌었을 때 유사도 계산용 행렬을 다시 만드는 함수"""
+        self.keys = list(self.entries)
+        self.matrix = (
+            np.vstack([self.entries[key]["vector"] for key in self.keys])
+            if self.keys
+            else None
+        )
+
+
+class SemanticAnswerCache:
+    """질문 임베딩이 충분히 비슷한(코사인 유사도 >= threshold) 이전 질문의 답변을 반환하는 캐시
+
+    스코프마다 최대 max_entries개를 보관하고 넘으면 가장 오래 사용되지 않은 답변을 제거하며,
+    ttl초가 지난 답변은 사용하지 않는다.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000, ttl: float = 86400):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._scopes: Dict[Hashable, _Scope] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _get_scope(self, scope: Hashable, version: Hashable) -> _Scope:
+        """스코프를 반환하고, 인덱스 버전이 바뀌었으면 저장된 답변을 모두 버리는 함수 (잠금 안에서 호출)"""
+        current = self._scopes.get(scope)
+        if current is None or current.version != version:
+            if current is not None and current.entries:
+                self.invalidations += 1
+            current = _Scope(version)
+            self._scopes[scope] = current
+        return current
+
+    def lookup(self, scope: Hashable, vector, version: Hashable = None) -> Optional[Dict[str, Any]]:
+        """가장 비슷한 질문의 답변을 찾는 함수
+
+        유사도가 threshold 이상이면 {"answer", "question", "similarity", "metadata"}를, 아니면 None을 반환한다.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            current = self._get_scope(scope, version)
+            now = time.monotonic()
+            expired = [key for key, entry in current.entries.items() if entry["expires_at"] < now]
+            for key in expired:
+                del current.entries[key]
+            if expired or (current.matrix is None and current.entries):
+                current.rebuild()
+
+            if current.matrix is None:
+                self.misses += 1
+                return None
+
+            similarities = current.matrix @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            key = current.keys[best]
+            current.entries.move_to_end(key)
+            entry = current.entries[key]
+            self.hits += 1
+            return {
+                "answer": entry["answer"],
+                "question": key,
+                "similarity": round(similarity, 4),
+                "metadata": entry["metadata"],
+            }
+
+    def store(
+        self,
+        scope: Hashable,
+        question: str,
+        vector,
+        answer: str,
+        version: Hashable = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """답변을 저장하고 스코프의 최대 크기를 넘으면 가장 오래 사용되지 않은 답변을 제거하는 함수"""
+        with self._lock:
+            current = self._get_scope(scope, version)
+            current.entries[question] = {
+                "vector": self._normalize(vector),
+                "answer": answer,
+                "metadata": metadata or {},
+                "expires_at": time.monotonic() + self.ttl,
+            }
+            current.entries.move_to_end(question)
+            while len(current.entries) > self.max_entries:
+                current.entries.popitem(last=False)
+                self.evictions += 1
+            # 행렬은 다음 조회 때 다시 만든다
+            current.matrix = None
+
+    def invalidate(self, scope: Hashable = None) -> None:
+        """스코프 하나(또는 scope가 None이면 전체)의 답변을 모두 버리는 함수"""
+        with self._lock:
+            scopes = list(self._scopes) if scope is None else [scope]
+            for name in scopes:
+                if self._scopes.pop(name, None) is not None:
+                    self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        """적중/미스 횟수, 적중률, 저장된 답변 수를 반환하는 함수"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": sum(len(scope.entries) for scope in self._scopes.values()),
+                "scopes": len(self._scopes),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
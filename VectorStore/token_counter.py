@@ -0,0 +1,66 @@
+"""
+답변 생성 모델(gpt-4o)의 토크나이저로 토큰 수를 로컬에서 계산하는 모듈
+전처리 단계에서 답변별 토큰 수를 미리 저장하고, 요청 시 프롬프트를 토큰 예산에 맞출 때 사용한다
+"""
+
+import re
+from functools import lru_cache
+
+import tiktoken
+
+# 토큰 수를 계산할 모델 (tiktoken이 모델을 모르면 gpt-4o 계열 인코딩을 사용)
+TOKENIZER_MODEL = "gpt-4o"
+FALLBACK_ENCODING = "o200k_base"
+
+# 잘라낸 답변 끝에 붙이는 표시
+TRUNCATION_MARK = "…"
+
+# 인코딩 파일을 받을 수 없을 때의 근사 토큰: ASCII는 최대 4글자, 그 외(한글 등)는 한 글자를 한 토큰으로 센다
+# (o200k_base의 실제 토큰 수보다 약간 많게 세므로 토큰 예산을 넘기지 않는다)
+_ESTIMATE_TOKEN_PATTERN = re.compile(r"[\x00-\x7f]{1,4}|[^\x00-\x7f]", re.DOTALL)
+
+
+class CharEstimateEncoding:
+    """tiktoken 인코딩을 쓸 수 없을 때 글자 수로 토큰을 근사하는 인코딩 (encode/decode만 제공)"""
+
+    name = "char_estimate"
+
+    def encode(self, text: str, disallowed_special=()) -> list:
+        return _ESTIMATE_TOKEN_PATTERN.findall(text)
+
+    def decode(self, tokens, errors: str = "strict") -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = TOKENIZER_MODEL):
+    """모델의 tiktoken 인코딩을 한 번만 만들어 반환하는 함수
+
+    인터넷이 없어 인코딩 파일을 받을 수 없고 TIKTOKEN_CACHE_DIR에도 없으면 글자 수 기반 근사 인코딩을 사용한다.
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        print(f"⚠️ tiktoken 인코딩을 불러올 수 없어 글자 수로 토큰 수를 근사합니다: {e}")
+        return CharEstimateEncoding()
+
+
+def count_tokens(text) -> int:
+    """텍스트의 토큰 수를 반환하는 함수 (None이나 NaN은 0)"""
+    if not isinstance(text, str) or not text:
+        return 0
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """텍스트를 앞에서부터 max_tokens 토큰(잘림 표시 포함) 이내로 자르는 함수 (이미 짧으면 그대로 반환)"""
+    encoding = get_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    keep = max(max_tokens - len(encoding.encode(TRUNCATION_MARK)), 0)
+    # 토큰 경계가 글자 중간이면 깨진 글자가 생기므로 버린다
+    return encoding.decode(tokens[:keep], errors="ignore").rstrip() + TRUNCATION_MARK
@@ -0,0 +1,291 @@
+"""
+검색기(retriever)가 사용하는 벡터 검색 백엔드 모듈
+ChromaDB(PersistentClient, HNSW) 백엔드와, 정규화된 임베딩을 메모리 맵 .npy 파일에 두고
+내적으로 전수 검색하는 NumPy 백엔드를 같은 인터페이스로 제공한다
+"""
+
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 검색 결과는 두 백엔드 모두 ChromaDB query() 결과 형식
+# {"ids": [[...]], "metadatas": [[...]], "documents": [[...]], "distances": [[...]]} (질문 하나당 한 줄)
+
+
+def category_filter(categories):
+    """카테고리(컬렉션 이름) 목록을 통합 컬렉션 검색용 where 조건으로 바꾸는 함수 (없으면 전체 검색)"""
+    if not categories:
+        return None
+    if isinstance(categories, str):
+        categories = [categories]
+    categories = list(dict.fromkeys(categories))
+    if len(categories) == 1:
+        return {"category": categories[0]}
+    return {"category": {"$in": categories}}
+
+
+class VectorBackend(ABC):
+    """벡터 검색 백엔드 인터페이스 (query를 구현하지 않은 백엔드는 만들 때 TypeError가 난다)"""
+
+    @abstractmethod
+    def query(
+        self,
+        collection_name: str,
+        query_embeddings: List[List[float]],
+        k: int,
+        categories=None,
+    ) -> Dict:
+        """질문 임베딩 목록 각각에 대해 가장 가까운 k개를 검색하는 함수
+
+        categories를 주면 category 메타데이터가 해당 카테고리인 문서만 검색한다 (통합 컬렉션용).
+        """
+
+
+class ChromaBackend(VectorBackend):
+    """ChromaDB PersistentClient 컬렉션을 검색하는 백엔드"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def query(self, collection_name, query_embeddings, k, categories=None):
+        collection = self.client.get_collection(collection_name)
+        return collection.query(
+            query_embeddings=query_embeddings,
+            n_results=k,
+            where=category_filter(categories),
+            include=["documents", "metadatas", "distances"],
+        )
+
+
+# NumPy 인덱스 검색 행렬 형식 (float32는 양자화 없이 그대로 검색)
+QUANTIZATIONS = ("float32", "float16", "int8")
+
+# 양자화된 행렬을 float32로 바꾸어 채점할 때 한 번에 처리할 행 수 (임시 메모리 사용량 제한)
+_SCORE_BLOCK_ROWS = 4096
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int):
+    """(질문 수, 문서 수) 점수 행렬에서 질문마다 점수가 높은 k개의 위치와 점수를 내림차순으로 반환하는 함수"""
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def index_paths(directory: str, collection_name: str, quantization: str = "float32") -> Dict[str, str]:
+    """컬렉션의 NumPy 인덱스 파일 경로들을 반환하는 함수
+
+    full은 정규화된 float32 행렬(양자화 시 다시 채점용), meta는 ids/metadatas/documents,
+    양자화 형식이면 coarse(float16/int8 검색 행렬)와 int8의 행별 scale 파일이 추가된다.
+    """
+    base = os.path.join(directory, collection_name)
+    paths = {"full": f"{base}.npy", "meta": f"{base}.json"}
+    if quantization != "float32":
+        paths["coarse"] = f"{base}.{quantization}.npy"
+    if quantization == "int8":
+        paths["scale"] = f"{base}.int8.scale.npy"
+    return paths
+
+
+def quantize(matrix: np.ndarray, quantization: str):
+    """정규화된 float32 행렬을 검색 행렬 형식으로 변환하여 (행렬, 행별 scale 또는 None)을 반환하는 함수
+
+    int8은 행마다 절댓값 최대값을 127로 맞추는 대칭 양자화를 사용한다.
+    행이 없는 행렬(빈 컬렉션)과 영벡터 행도 오류 없이 변환한다.
+    """
+    if quantization == "float32":
+        return matrix, None
+    if quantization == "float16":
+        return matrix.astype(np.float16), None
+    if quantization == "int8":
+        if matrix.size == 0:
+            return matrix.astype(np.int8), np.zeros(len(matrix), dtype=np.float32)
+        max_abs = np.abs(matrix).max(axis=1)
+        # 영벡터 행은 scale을 1로 두어 0으로 나누지 않고 모두 0으로 양자화한다
+        scale = np.where(max_abs > 0, max_abs / 127, 1).astype(np.float32)
+        quantized = np.rint(matrix / scale[:, None]).clip(-127, 127).astype(np.int8)
+        return quantized, scale
+    raise ValueError(f"지원하지 않는 양자화 형식입니다: {quantization} (가능: {', '.join(QUANTIZATIONS)})")
+
+
+class _NumpyIndex:
+    """컬렉션 하나의 메모리 맵 임베딩 행렬과 메타데이터"""
+
+    def __init__(self, paths: Dict[str, str], version):
+        self.version = version
+        self.full = np.load(paths["full"], mmap_mode="r")
+        self.coarse = np.load(paths["coarse"], mmap_mode="r") if "coarse" in paths else None
+        self.scale = np.load(paths["scale"]) if "scale" in paths else None
+        with open(paths["meta"], "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.ids = meta["ids"]
+        self.metadatas = meta["metadatas"]
+        self.documents = meta["documents"]
+
+        # 카테고리 필터용 행 번호 목록
+        self.category_rows: Dict[str, np.ndarray] = {}
+        categories = [metadata.get("category") for metadata in self.metadatas]
+        for category in set(categories):
+            if category is not None:
+                self.category_rows[category] = np.array(
+                    [i for i, value in enumerate(categories) if value == category],
+                    dtype=np.int64,
+                )
+
+    def rows_for(self, categories) -> Optional[np.ndarray]:
+        """검색할 행 번호 목록을 반환하는 함수 (None이면 전체)"""
+        if not categories:
+            return None
+        if isinstance(categories, str):
+            categories = [categories]
+        parts = [self.category_rows[c] for c in dict.fromkeys(categories) if c in self.category_rows]
+        return np.sort(np.concatenate(parts)) if parts else np.array([], dtype=np.int64)
+
+    def coarse_scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """양자화된 행렬로 근사 코사인 유사도를 계산하는 함수 (float32 변환은 블록 단위로 수행)"""
+        matrix = self.coarse if rows is None else self.coarse[rows]
+        scores = np.empty((len(queries), matrix.shape[0]), dtype=np.float32)
+        for start in range(0, matrix.shape[0], _SCORE_BLOCK_ROWS):
+            block = np.asarray(matrix[start : start + _SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[:, start : start + len(block)] = queries @ block.T
+        if self.scale is not None:
+            scores *= self.scale if rows is None else self.scale[rows]
+        return scores
+
+
+class NumpyBackend(VectorBackend):
+    """{컬렉션}.npy(정규화된 float32 임베딩 행렬)와 {컬렉션}.json(ids, metadatas, documents)을 읽어
+    내적(코사인 유사도)으로 전수 검색하는 백엔드
+
+    파일은 메모리 맵으로 열어 프로세스 간에 페이지 캐시를 공유하고, 파일이 다시 저장되면 자동으로 다시 연다.
+    quantization이 float16/int8이면 작은 양자화 행렬로 상위 k * rescore_factor개 후보를 고른 뒤
+    해당 행만 float32 행렬에서 읽어 다시 채점하므로, 메모리에 상주하는 것은 주로 양자화 행렬이다.
+    거리는 ChromaDB 기본값과 같은 제곱 L2 거리(정규화된 벡터에서 2 - 2 * 코사인 유사도)로 반환한다.
+    """
+
+    def __init__(self, directory: str, quantization: str = "float32", rescore_factor: int = 4):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(
+                f"지원하지 않는 양자화 형식입니다: {quantization} (가능: {', '.join(QUANTIZATIONS)})"
+            )
+        self.directory = directory
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        self._indexes: Dict[str, _NumpyIndex] = {}
+        self._lock = threading.Lock()
+
+    def _get_index(self, collection_name: str) -> _NumpyIndex:
+        paths = index_paths(self.directory, collection_name, self.quantization)
+        try:
+            version = tuple(os.stat(path).st_mtime_ns for path in paths.values())
+        except FileNotFoundError:
+            raise ValueError(f"NumPy 인덱스가 없습니다: {paths.get('coarse', paths['full'])}")
+
+        with self._lock:
+            index = self._indexes.get(collection_name)
+            if index is None or index.version != version:
+                index = _NumpyIndex(paths, version)
+                self._indexes[collection_name] = index
+            return index
+
+    def query(self, collection_name, query_embeddings, k, categories=None):
+        index = self._get_index(collection_name)
+        queries = _normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+
+        rows = index.rows_for(categories)
+        n = index.full.shape[0] if rows is None else len(rows)
+        k = min(k, n)
+
+        result = {"ids": [], "metadatas": [], "documents": [], "distances": []}
+        if k == 0:
+            for key in result:
+                result[key] = [[] for _ in range(len(queries))]
+            return result
+
+        if index.coarse is None:
+            # 질문 여러 개를 행렬곱 한 번으로 계산하고 argpartition으로 상위 k개만 정렬
+            matrix = index.full if rows is None else index.full[rows]
+            top, top_scores = _top_k(queries @ matrix.T, k)
+            if rows is not None:
+                top = rows[top]
+        else:
+            # 양자화 행렬로 후보를 고르고, 후보 행만 float32로 다시 채점
+            candidates, _ = _top_k(
+                index.coarse_scores(queries, rows), min(n, k * self.rescore_factor)
+            )
+            if rows is not None:
+                candidates = rows[candidates]
+            # 메모리 맵에서 순서대로 읽도록 행 번호를 정렬
+            candidates = np.sort(candidates, axis=1)
+            exact = np.stack([index.full[c] @ q for q, c in zip(queries, candidates)])
+            positions, top_scores = _top_k(exact, k)
+            top = np.take_along_axis(candidates, positions, axis=1)
+
+        for source_rows, similarities in zip(top, top_scores):
+            result["ids"].append([index.ids[i] for i in source_rows])
+            result["metadatas"].append([index.metadatas[i] for i in source_rows])
+            result["documents"].append([index.documents[i] for i in source_rows])
+            result["distances"].append([float(2 - 2 * s) for s in similarities])
+        return result
+
+
+def write_numpy_index(
+    directory: str,
+    collection_name: str,
+    embeddings,
+    ids: List[str],
+    metadatas: List[Dict],
+    documents: List[str],
+    quantization: str = "float32",
+) -> None:
+    """임베딩과 메타데이터를 NumPy 백엔드용 파일로 저장하는 함수
+
+    임시 파일에 모두 쓴 뒤 교체하므로 검색 중인 프로세스는 다음 조회 때 새 파일을 연다.
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix = np.asarray(embeddings if embeddings is not None else [], dtype=np.float32)
+    matrix = _normalize_rows(matrix) if len(matrix) else matrix.reshape(0, 0)
+    coarse, scale = quantize(matrix, quantization)
+
+    paths = index_paths(directory, collection_name, quantization)
+    arrays = {"full": matrix, "coarse": coarse, "scale": scale}
+    written = []
+    for name, path in paths.items():
+        tmp_path = f"{path}.tmp"
+        if name == "meta":
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"ids": ids, "metadatas": metadatas, "documents": documents},
+                    f,
+                    ensure_ascii=False,
+                )
+        else:
+            # np.save는 파일 객체에 쓰면 확장자를 덧붙이지 않는다
+            with open(tmp_path, "wb") as f:
+                np.save(f, arrays[name])
+        written.append((tmp_path, path))
+    for tmp_path, path in written:
+        os.replace(tmp_path, path)
+
+
+def export_numpy_index(collection, directory: str, quantization: str = "float32") -> int:
+    """ChromaDB 컬렉션의 임베딩과 메타데이터를 NumPy 백엔드용 파일로 저장하고 저장한 문서 수를 반환하는 함수"""
+    data = collection.get(include=["embeddings", "metadatas", "documents"])
+    write_numpy_index(
+        directory,
+        collection.name,
+        data["embeddings"],
+        data["ids"],
+        data["metadatas"],
+        data["documents"],
+        quantization,
+    )
+    return len(data["ids"])
@@ -0,0 +1,132 @@
+"""
+전체 FAQ 답변에 대해 기존 clean_answer(요청마다 정규식 19개 실행)와
+현재 clean_answer(평가 영역 표시 문구에서 자르고 안내 문구 줄만 정확히 일치할 때 제거, 정규식 없음),
+전처리된 답변 조회 방식의 처리량을 비교하는 벤치마크
+"""
+
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.answer_cleaner import clean_answer
+
+DATA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "Data", "final_result.pkl"
+)
+
+
+def legacy_clean_answer(answer: str) -> str:
+    """비교용: 변경 전 Functioncall/answer_retriever.py의 clean_answer 구현"""
+    patterns_to_remove = [
+        r"위 도움말이 도움이 되었나요\?.*?$",
+        r"별점.*?주세요.*?$",
+        r"평가해.*?주세요.*?$",
+        r"만족도.*?평가.*?$",
+        r"★.*?★.*?$",
+        r"⭐.*?⭐.*?$",
+        r"도움이.*?되었다면.*?$",
+        r"별점\d+점",
+        r"소중한 의견을 남겨주시면.*?$",
+        r"보완하도록 노력하겠습니다.*?$",
+        r"보내기\s*$",
+        r"도움말 닫기\s*$",
+        r"별점\s*\d+\s*점\s*",
+        r"^별점.*",
+        r".*별점.*점.*",
+        r"소중한.*의견.*",
+        r"보완.*노력.*",
+        r"^보내기$",
+        r"^도움말.*닫기$",
+    ]
+
+    cleaned = answer
+    for pattern in patterns_to_remove:
+        cleaned = re.sub(pattern, "", cleaned, flags=re.MULTILINE | re.DOTALL)
+
+    lines = cleaned.split("\n")
+    filtered_lines = []
+
+    unwanted_phrases = [
+        "별점1점",
+        "별점2점",
+        "별점3점",
+        "별점4점",
+        "별점5점",
+        "소중한 의견을 남겨주시면",
+        "보완하도록 노력하겠습니다",
+        "보내기",
+        "도움말 닫기",
+        "별점",
+        "★",
+        "⭐",
+        "위 도움말이 도움이 되었나요",
+        "평가",
+        "만족도",
+    ]
+
+    for line in lines:
+        line = line.strip()
+        if line and not any(phrase in line for phrase in unwanted_phrases):
+            filtered_lines.append(line)
+
+    cleaned = "\n".join(filtered_lines)
+    cleaned = re.sub(r"\n\s*\n", "\n", cleaned)
+    cleaned = cleaned.strip()
+
+    return cleaned
+
+
+def measure(name, func, answers, repeat):
+    """answers 전체에 func를 repeat번 적용하여 처리량을 측정하는 함수"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for answer in answers:
+            func(answer)
+    elapsed = time.perf_counter() - start
+    count = len(answers) * repeat
+    print(
+        f"{name:<28} {elapsed:8.3f}초  {count / elapsed:12,.0f}건/초  "
+        f"({elapsed / count * 1e6:8.2f}µs/건)"
+    )
+    return elapsed
+
+
+def main(repeat: int = 3):
+    """전체 답변 코퍼스에 대해 세 가지 방식의 처리량과 결과 차이를 출력하는 메인 함수"""
+    data = pd.read_pickle(DATA_PATH)
+    answers = [str(answer) for answer in data.values()]
+    print(f"답변 {len(answers)}개 x {repeat}회 반복\n")
+
+    legacy_time = measure("기존 (정규식 19개, 요청마다)", legacy_clean_answer, answers, repeat)
+    new_time = measure("평가 영역 자르기 + 안내 문구 줄 일치", clean_answer, answers, repeat)
+
+    # 전처리 후에는 요청 시 딕셔너리 조회만 수행
+    cleaned_index = {i: clean_answer(answer) for i, answer in enumerate(answers)}
+    lookup_time = measure(
+        "전처리된 답변 조회", lambda i: cleaned_index[i], list(cleaned_index), repeat
+    )
+
+    print(f"\n평가 영역 자르기 속도 향상: {legacy_time / new_time:.1f}배")
+    print(f"전처리 조회 속도 향상: {legacy_time / lookup_time:.1f}배")
+
+    # 결과 비교: 새 정리 방식은 평가 영역부터 끝까지(관련 도움말 목록 포함)를 자르고 본문 줄은 지우지 않는다
+    legacy = [legacy_clean_answer(answer) for answer in answers]
+    different = [i for i, cleaned in enumerate(legacy) if cleaned != cleaned_index[i]]
+    print(f"결과가 다른 답변: {len(different)}/{len(answers)}개")
+    print(
+        f"빈 답변: 기존 {sum(not cleaned for cleaned in legacy)}개, "
+        f"새 방식 {sum(not cleaned for cleaned in cleaned_index.values())}개"
+    )
+
+    # 기존 방식에서 내용이 남던 답변이 새 방식에서 비면 본문을 지운 것이다
+    emptied = [i + 1 for i, cleaned in enumerate(legacy) if cleaned and not cleaned_index[i]]
+    print(f"기존에는 내용이 있었는데 비게 된 답변: {len(emptied)}개 {emptied[:20]}")
+    return 1 if emptied else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
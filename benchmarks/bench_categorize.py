@@ -0,0 +1,122 @@
+"""
+합성 대용량 질문 코퍼스에서 기존 키워드 분류(키워드마다 `in` 검사 + 행 단위 apply)와
+Aho-Corasick 오토마톤 분류(행 단위 / Series 일괄 처리)의 처리량을 비교하고 결과가 같은지 확인하는 벤치마크
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore import categorize_to_csv as categorize
+from VectorStore.categorize_to_csv import (
+    categorize_dataframe,
+    categorize_questions_old,
+    smart_categorize_questions,
+)
+
+DATA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "Data", "final_result.pkl"
+)
+
+
+LABELS = ["1. 계정/판매자 관리", "2. 상품/플랫폼 관리", "3. 마케팅/프로모션", "4. 운영/물류 관리", "5. 분석/AI 도구"]
+GROUPS = ["ACCOUNT", "PRODUCT", "MARKETING", "OPERATIONS", "ANALYTICS"]
+SMART_KEYWORDS = [getattr(categorize, f"SMART_{group}_KEYWORDS") for group in GROUPS]
+TAG_KEYWORDS = [getattr(categorize, f"TAG_{group}_KEYWORDS") for group in GROUPS]
+
+
+def legacy_categorize(text, keyword_groups, lowercase):
+    """비교용: 변경 전 구현처럼 카테고리 순서대로 키워드마다 `in` 검사를 하는 함수"""
+    if pd.isna(text):
+        return "기타"
+
+    text = str(text).lower() if lowercase else str(text).strip()
+    for label, keywords in zip(LABELS, keyword_groups):
+        for keyword in keywords:
+            if keyword in text:
+                return label
+    return "기타"
+
+
+def legacy_categorize_dataframe(df):
+    """비교용: 변경 전 main()의 apply + apply(axis=1) 분류"""
+    df["기존_질문유형"] = df["질문"].str.extract(r"\[([^\[\]]+)\]", expand=False)
+    df["기존_카테고리"] = df["기존_질문유형"].apply(
+        lambda tag: legacy_categorize(tag, TAG_KEYWORDS, lowercase=False)
+    )
+    df["스마트_카테고리"] = df["질문"].apply(
+        lambda question: legacy_categorize(question, SMART_KEYWORDS, lowercase=True)
+    )
+    df["카테고리"] = df.apply(
+        lambda row: row["기존_카테고리"] if row["기존_카테고리"] != "기타" else row["스마트_카테고리"],
+        axis=1,
+    )
+    return df
+
+
+def make_corpus(rows, duplicate_ratio, seed=0):
+    """실제 FAQ 질문을 잘라 붙이고 변형하여 rows개의 합성 질문을 만드는 함수"""
+    rng = random.Random(seed)
+    questions = [str(question) for question in pd.read_pickle(DATA_PATH)]
+    words = [word for question in questions for word in question.split()]
+
+    unique_count = max(1, int(rows * (1 - duplicate_ratio)))
+    unique = []
+    for i in range(unique_count):
+        base = rng.choice(questions)
+        extra = " ".join(rng.choices(words, k=rng.randint(0, 6)))
+        unique.append(f"{base} {extra} #{i}" if rng.random() < 0.8 else f"{extra} 문의 #{i}")
+    corpus = unique + rng.choices(unique, k=rows - unique_count)
+    rng.shuffle(corpus)
+    return pd.DataFrame({"질문": corpus})
+
+
+def measure(name, func, df):
+    start = time.perf_counter()
+    result = func(df.copy())
+    elapsed = time.perf_counter() - start
+    print(f"{name:<34} {elapsed:8.2f}초  {len(df) / elapsed:12,.0f}행/초")
+    return result, elapsed
+
+
+def main(rows: int, duplicate_ratio: float):
+    """합성 코퍼스에서 세 가지 방식의 처리량과 결과 일치 여부를 출력하는 메인 함수"""
+    df = make_corpus(rows, duplicate_ratio)
+    print(f"합성 질문 {len(df):,}개 (중복 비율 {duplicate_ratio:.0%})\n")
+
+    legacy, legacy_time = measure("기존 (키워드별 in + apply)", legacy_categorize_dataframe, df)
+
+    def automaton_apply(frame):
+        frame["기존_질문유형"] = frame["질문"].str.extract(r"\[([^\[\]]+)\]", expand=False)
+        frame["기존_카테고리"] = frame["기존_질문유형"].apply(categorize_questions_old)
+        frame["스마트_카테고리"] = frame["질문"].apply(smart_categorize_questions)
+        frame["카테고리"] = frame["기존_카테고리"].where(
+            frame["기존_카테고리"] != "기타", frame["스마트_카테고리"]
+        )
+        return frame
+
+    applied, applied_time = measure("오토마톤 (행 단위 apply)", automaton_apply, df)
+    batched, batched_time = measure("오토마톤 (Series 일괄 처리)", categorize_dataframe, df)
+
+    print(f"\n행 단위 오토마톤 속도 향상: {legacy_time / applied_time:.1f}배")
+    print(f"일괄 처리 속도 향상: {legacy_time / batched_time:.1f}배")
+
+    columns = ["기존_카테고리", "스마트_카테고리", "카테고리"]
+    same = legacy[columns].equals(applied[columns]) and legacy[columns].equals(batched[columns])
+    print(f"결과 일치: {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="키워드 분류 처리량 측정")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="합성 질문 수")
+    parser.add_argument(
+        "--duplicate-ratio", type=float, default=0.3, help="중복 질문 비율 (0~1)"
+    )
+    args = parser.parse_args()
+    main(args.rows, args.duplicate_ratio)
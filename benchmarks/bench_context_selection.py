@@ -0,0 +1,101 @@
+"""
+검색 결과 상위 k개를 그대로 프롬프트에 넣을 때와, 더 많은 후보에서 중복 답변을 합치고 MMR로 k개를 고를 때의
+프롬프트 컨텍스트 크기(질문 수, 서로 다른 답변 수, 글자 수)를 비교하는 벤치마크
+질문 임베딩은 이미 저장된 임베딩을 사용하므로 OpenAI API를 호출하지 않는다 (벡터 검색만 사용)
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(os.path.dirname(__file__))), "Functioncall")
+)
+
+from Functioncall.answer_retriever import (
+    extract_ids_from_results,
+    get_answers_from_retriever_results,
+    lookup_answers,
+)
+from Functioncall.context_selector import (
+    answer_shingles,
+    collapse_duplicates,
+    select_results,
+    similarity_matrix,
+)
+from VectorStore.categories import CATEGORY_COLLECTIONS
+from VectorStore.retriever import chroma_client, parse_results, query_collection
+
+COLLECTIONS = list(CATEGORY_COLLECTIONS.values())
+
+
+def load_samples(count, seed=0):
+    """카테고리별 컬렉션에서 (컬렉션 이름, 임베딩) 샘플을 뽑는 함수"""
+    samples = []
+    for collection_name in COLLECTIONS:
+        data = chroma_client.get_collection(collection_name).get(include=["embeddings"])
+        samples.extend((collection_name, list(embedding)) for embedding in data["embeddings"])
+    return random.Random(seed).sample(samples, min(count, len(samples)))
+
+
+def context_stats(results, threshold):
+    """프롬프트에 들어갈 질문 수, 서로 다른 답변 수, 질문 예시 + 답변 예시 글자 수를 계산하는 함수"""
+    ids = extract_ids_from_results(results)
+    similarity = similarity_matrix(
+        [answer_shingles(answer) for answer in lookup_answers(ids, cleaned=True)]
+    )
+    distinct = len(collapse_duplicates(list(range(len(ids))), similarity, threshold))
+    chars = len("\n".join(parse_results(results))) + len(
+        get_answers_from_retriever_results(results)
+    )
+    return len(ids), distinct, chars
+
+
+def main(samples_count, k, candidates, threshold, lambda_):
+    """기존 방식과 후처리 방식의 컨텍스트 크기 평균과 후처리 시간을 출력하는 메인 함수"""
+    samples = load_samples(samples_count)
+    print(f"질문 {len(samples)}개, k={k}, 후보 {candidates}개, 중복 기준 {threshold}, MMR lambda {lambda_}\n")
+
+    baseline, selected, latencies = [], [], []
+    for collection_name, embedding in samples:
+        baseline.append(context_stats(query_collection(collection_name, embedding, k), threshold))
+
+        pool = query_collection(collection_name, embedding, candidates)
+        start = time.perf_counter()
+        chosen = select_results(
+            pool,
+            lookup_answers(extract_ids_from_results(pool), cleaned=True),
+            k,
+            duplicate_threshold=threshold,
+            lambda_=lambda_,
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        selected.append(context_stats(chosen, threshold))
+
+    baseline = np.array(baseline, dtype=float)
+    selected = np.array(selected, dtype=float)
+    print(f"{'':<16}{'질문 수':>10}{'서로 다른 답변':>14}{'글자 수':>10}")
+    for name, stats in [(f"상위 {k}개", baseline), ("중복 제거 + MMR", selected)]:
+        print(f"{name:<16}{stats[:, 0].mean():>10.2f}{stats[:, 1].mean():>14.2f}{stats[:, 2].mean():>10.0f}")
+    duplicated = np.mean(baseline[:, 1] < baseline[:, 0])
+    print(f"\n상위 {k}개에 중복 답변이 있던 질문 비율: {duplicated * 100:.1f}%")
+    print(f"컨텍스트 글자 수 변화: {(selected[:, 2].mean() / baseline[:, 2].mean() - 1) * 100:+.1f}%")
+    print(
+        f"후처리 시간: p50 {np.percentile(latencies, 50):.2f}ms, p95 {np.percentile(latencies, 95):.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="중복 답변 제거 + MMR 전후 프롬프트 컨텍스트 크기 비교")
+    parser.add_argument("--samples", type=int, default=300, help="측정할 질문 수")
+    parser.add_argument("--k", type=int, default=5, help="프롬프트에 넣을 질문 수")
+    parser.add_argument("--candidates", type=int, default=15, help="MMR 후보 수")
+    parser.add_argument("--threshold", type=float, default=0.9, help="같은 답변으로 볼 Jaccard 유사도")
+    parser.add_argument("--lambda", dest="lambda_", type=float, default=0.7, help="MMR 관련도 가중치")
+    args = parser.parse_args()
+    main(args.samples, args.k, args.candidates, args.threshold, args.lambda_)
@@ -0,0 +1,132 @@
+"""
+임베딩 차원 축소(EMBEDDING_DIMENSIONS)와 NumPy 인덱스 양자화(VECTOR_QUANTIZATION) 설정별로
+인덱스 크기, 검색 지연 시간, recall@k를 비교하는 벤치마크
+원래 차원으로 만든 통합 컬렉션이 필요하므로 먼저 `python chromaDB.py --layout unified`로 인덱스를 만든다
+저장된 질문 임베딩을 질문으로 사용하고(자기 자신은 결과에서 제외), 원래 차원 float32 전수 검색 결과를 정답으로 삼는다
+OpenAI API는 호출하지 않는다
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.categories import UNIFIED_COLLECTION
+from VectorStore.embedding import shorten_embedding
+from VectorStore.retriever import chroma_client
+from VectorStore.vector_backend import (
+    QUANTIZATIONS,
+    NumpyBackend,
+    index_paths,
+    write_numpy_index,
+)
+
+
+def load_collection():
+    data = chroma_client.get_collection(UNIFIED_COLLECTION).get(
+        include=["embeddings", "metadatas", "documents"]
+    )
+    return data, np.asarray(data["embeddings"], dtype=np.float32)
+
+
+def neighbours(results, self_id):
+    """검색 결과에서 질문으로 쓴 자기 자신을 뺀 ID 목록"""
+    return [chroma_id for chroma_id in results["ids"][0] if chroma_id != self_id]
+
+
+def evaluate(backend, queries, query_ids, truth, k):
+    """질문마다 검색하여 지연 시간(ms)과 정답 대비 recall@k를 계산하는 함수"""
+    latencies = []
+    recalls = []
+    for query, query_id, expected in zip(queries, query_ids, truth):
+        start = time.perf_counter()
+        results = backend.query(UNIFIED_COLLECTION, [query], k + 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = neighbours(results, query_id)[:k]
+        recalls.append(len(set(found) & set(expected)) / k)
+    return latencies, float(np.mean(recalls))
+
+
+def file_sizes(directory, quantization):
+    """(검색 시 메모리에 상주하는 행렬 크기, 디스크 전체 크기)를 바이트로 반환하는 함수"""
+    paths = index_paths(directory, UNIFIED_COLLECTION, quantization)
+    sizes = {name: os.path.getsize(path) for name, path in paths.items()}
+    resident = sizes.get("coarse", sizes["full"]) + sizes.get("scale", 0)
+    return resident, sum(sizes.values())
+
+
+def main(dimensions_list, samples_count, k, rescore_factor):
+    """차원 x 양자화 조합마다 인덱스를 만들고 크기/지연 시간/recall@k 표를 출력하는 메인 함수"""
+    data, matrix = load_collection()
+    native = matrix.shape[1]
+    dimensions_list = [d for d in dimensions_list if d <= native] or [native]
+    rng = random.Random(0)
+    sample_rows = rng.sample(range(len(matrix)), min(samples_count, len(matrix)))
+    query_ids = [data["ids"][row] for row in sample_rows]
+
+    # 정답: 원래 차원 float32 전수 검색
+    with tempfile.TemporaryDirectory() as directory:
+        write_numpy_index(
+            directory, UNIFIED_COLLECTION, matrix, data["ids"], data["metadatas"], data["documents"]
+        )
+        exact = NumpyBackend(directory)
+        truth = [
+            neighbours(exact.query(UNIFIED_COLLECTION, [matrix[row]], k + 1), query_id)[:k]
+            for row, query_id in zip(sample_rows, query_ids)
+        ]
+
+    print(
+        f"벡터 {len(matrix)}개 (원래 차원 {native}), 질문 {len(sample_rows)}개, k={k}, "
+        f"재채점 후보 k x {rescore_factor}\n"
+    )
+    print(
+        f"{'차원':>6} {'형식':>8} {'상주 행렬':>10} {'디스크':>10} "
+        f"{'p50(ms)':>9} {'p95(ms)':>9} {f'recall@{k}':>10}"
+    )
+    for dimensions in dimensions_list:
+        shortened = np.asarray(
+            [shorten_embedding(list(vector), dimensions) for vector in matrix],
+            dtype=np.float32,
+        )
+        queries = shortened[sample_rows]
+        for quantization in QUANTIZATIONS:
+            with tempfile.TemporaryDirectory() as directory:
+                write_numpy_index(
+                    directory,
+                    UNIFIED_COLLECTION,
+                    shortened,
+                    data["ids"],
+                    data["metadatas"],
+                    data["documents"],
+                    quantization,
+                )
+                backend = NumpyBackend(
+                    directory, quantization=quantization, rescore_factor=rescore_factor
+                )
+                # 첫 조회에서 메모리 맵을 여는 비용은 제외
+                backend.query(UNIFIED_COLLECTION, [queries[0]], k)
+                latencies, recall = evaluate(backend, queries, query_ids, truth, k)
+                resident, total = file_sizes(directory, quantization)
+            print(
+                f"{dimensions:>6} {quantization:>8} {resident / 1024:>8.0f}KB {total / 1024:>8.0f}KB "
+                f"{np.percentile(latencies, 50):>9.3f} {np.percentile(latencies, 95):>9.3f} "
+                f"{recall * 100:>9.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 차원 축소 / 양자화 설정별 인덱스 크기, 지연 시간, recall 비교")
+    parser.add_argument(
+        "--dims", type=int, nargs="+", default=[1536, 1024, 512, 256], help="비교할 임베딩 차원"
+    )
+    parser.add_argument("--samples", type=int, default=300, help="측정할 질문 수")
+    parser.add_argument("--k", type=int, default=5, help="검색 결과 수")
+    parser.add_argument("--rescore-factor", type=int, default=4, help="양자화 시 다시 채점할 후보 배율")
+    args = parser.parse_args()
+    main(args.dims, args.samples, args.k, args.rescore_factor)
@@ -0,0 +1,112 @@
+"""
+벡터 검색만 사용할 때와 BM25 어휘 검색을 RRF로 합친 하이브리드 검색의 recall@k와 지연 시간을 비교하는 벤치마크
+통합 컬렉션과 역색인이 필요하므로 먼저 `python chromaDB.py --layout unified`로 인덱스를 만든다
+
+질문은 저장된 질문에서 앞의 [태그]를 떼고 단어 일부를 지워 만든 짧은 질문이며, 원래 질문을 찾으면 정답으로 본다
+질문 임베딩은 OpenAI API로 생성하므로(영구 캐시에 저장되어 다시 실행할 때는 호출하지 않는다) OPENAI_API_KEY가 필요하다
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.categories import UNIFIED_COLLECTION
+from VectorStore.lexical_index import BM25Index, reciprocal_rank_fusion
+from VectorStore.retriever import (
+    HYBRID_CANDIDATES,
+    RRF_K,
+    chroma_client,
+    get_query_embedding,
+    query_unified,
+)
+
+
+def make_queries(metadatas, count, drop_ratio, seed=0):
+    """저장된 질문에서 [태그]를 떼고 단어 일부를 지운 (질문, 정답 질문 ID) 목록을 만드는 함수"""
+    rng = random.Random(seed)
+    queries = []
+    for metadata in rng.sample(metadatas, min(count, len(metadatas))):
+        words = re.sub(r"^\s*\[[^\[\]]+\]\s*", "", metadata["question"]).split()
+        kept = [word for word in words if rng.random() >= drop_ratio] or words[:1]
+        queries.append((" ".join(kept), str(metadata["question_id"])))
+    return queries
+
+
+def rank_of(results, question_id):
+    """검색 결과에서 정답 질문의 순위(1부터)를 반환하는 함수 (없으면 None)"""
+    for rank, metadata in enumerate(results["metadatas"][0], 1):
+        if str(metadata.get("question_id")) == question_id:
+            return rank
+    return None
+
+
+def percentiles(latencies):
+    return f"p50 {np.percentile(latencies, 50):6.2f}ms  p95 {np.percentile(latencies, 95):6.2f}ms"
+
+
+def main(samples_count, ks, drop_ratio):
+    """BM25 역색인 생성/검색 시간과 벡터 / 하이브리드 검색의 recall@k를 출력하는 메인 함수"""
+    data = chroma_client.get_collection(UNIFIED_COLLECTION).get(
+        include=["metadatas", "documents"]
+    )
+
+    start = time.perf_counter()
+    index = BM25Index.build(
+        data["ids"],
+        data["metadatas"],
+        data["documents"],
+        [metadata.get("question", "") for metadata in data["metadatas"]],
+    )
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"BM25 역색인: 질문 {len(data['ids'])}개, 토큰 {len(index.term_index)}개, 생성 {build_ms:.0f}ms")
+
+    queries = make_queries(data["metadatas"], samples_count, drop_ratio)
+    print(f"질문 {len(queries)}개 임베딩 중...")
+    embeddings = [get_query_embedding(query) for query, _ in queries]
+
+    candidates = max(max(ks), HYBRID_CANDIDATES)
+    vector_ranks, lexical_ranks, hybrid_ranks = [], [], []
+    vector_latencies, lexical_latencies, fusion_latencies = [], [], []
+    for (query, question_id), embedding in zip(queries, embeddings):
+        start = time.perf_counter()
+        vector_results = query_unified(embedding, candidates)
+        vector_latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        lexical_results = index.search(query, HYBRID_CANDIDATES)
+        lexical_latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        hybrid_results = reciprocal_rank_fusion(
+            [vector_results, lexical_results], max(ks), rrf_k=RRF_K
+        )
+        fusion_latencies.append((time.perf_counter() - start) * 1000)
+
+        vector_ranks.append(rank_of(vector_results, question_id))
+        lexical_ranks.append(rank_of(lexical_results, question_id))
+        hybrid_ranks.append(rank_of(hybrid_results, question_id))
+
+    print(f"\n[지연 시간] 벡터 검색 {percentiles(vector_latencies)}")
+    print(f"[지연 시간] BM25 검색 {percentiles(lexical_latencies)}")
+    print(f"[지연 시간] RRF 병합  {percentiles(fusion_latencies)}")
+
+    print(f"\n{'':<10}" + "".join(f"{f'recall@{k}':>12}" for k in ks))
+    for name, ranks in [("벡터", vector_ranks), ("BM25", lexical_ranks), ("하이브리드", hybrid_ranks)]:
+        recalls = [np.mean([rank is not None and rank <= k for rank in ranks]) for k in ks]
+        print(f"{name:<10}" + "".join(f"{recall * 100:>11.1f}%" for recall in recalls))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="벡터 검색 / 하이브리드(BM25 + RRF) 검색 recall@k 비교")
+    parser.add_argument("--samples", type=int, default=300, help="측정할 질문 수")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10], help="recall을 계산할 k 값")
+    parser.add_argument("--drop", type=float, default=0.3, help="질문에서 지울 단어 비율")
+    args = parser.parse_args()
+    main(args.samples, sorted(args.k), args.drop)
@@ -0,0 +1,141 @@
+"""
+카테고리별 컬렉션(sharded)과 카테고리 메타데이터가 있는 통합 컬렉션(unified)의 검색 지연 시간을 비교하는 벤치마크
+두 구성이 모두 있어야 하므로 먼저 `python chromaDB.py --layout both`로 인덱스를 만든다
+질문 임베딩은 이미 저장된 임베딩을 사용하므로 OpenAI API를 호출하지 않는다
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.categories import CATEGORY_COLLECTIONS
+from VectorStore.retriever import chroma_client, merge_results, query_unified
+
+COLLECTIONS = list(CATEGORY_COLLECTIONS.values())
+
+
+def query_sharded(collection_name, query_embedding, k):
+    return chroma_client.get_collection(collection_name).query(
+        query_embeddings=[query_embedding],
+        n_results=k,
+        include=["documents", "metadatas", "distances"],
+    )
+
+
+def load_samples(count, seed=0):
+    """카테고리별 컬렉션에서 (컬렉션 이름, 임베딩) 샘플을 뽑는 함수"""
+    samples = []
+    for collection_name in COLLECTIONS:
+        data = chroma_client.get_collection(collection_name).get(include=["embeddings"])
+        samples.extend((collection_name, embedding) for embedding in data["embeddings"])
+    return random.Random(seed).sample(samples, min(count, len(samples)))
+
+
+def measure(name, func, samples):
+    """샘플마다 func를 실행하여 지연 시간(ms) p50/p95/평균을 출력하는 함수"""
+    latencies = []
+    results = []
+    for sample in samples:
+        start = time.perf_counter()
+        results.append(func(*sample))
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(
+        f"{name:<44} p50 {np.percentile(latencies, 50):7.2f}ms  "
+        f"p95 {np.percentile(latencies, 95):7.2f}ms  평균 {np.mean(latencies):7.2f}ms"
+    )
+    return results
+
+
+def ids(results):
+    return [metadata["question_id"] for metadata in results["metadatas"][0]]
+
+
+def main(samples_count: int, k: int):
+    """단일/다중/전체 카테고리 검색의 지연 시간과 결과 일치도를 출력하는 메인 함수"""
+    samples = load_samples(samples_count)
+    rng = random.Random(1)
+    pairs = [
+        (rng.sample([c for c in COLLECTIONS if c != collection], 1)[0], collection, embedding)
+        for collection, embedding in samples
+    ]
+    executor = ThreadPoolExecutor(max_workers=len(COLLECTIONS))
+    print(f"질문 {len(samples)}개, k={k}\n")
+
+    print("[단일 카테고리]")
+    sharded_single = measure(
+        "sharded: 카테고리 컬렉션 검색",
+        lambda collection, embedding: query_sharded(collection, embedding, k),
+        samples,
+    )
+    unified_single = measure(
+        "unified: category 필터 검색",
+        lambda collection, embedding: query_unified(embedding, k, categories=collection),
+        samples,
+    )
+
+    print("\n[두 카테고리]")
+    measure(
+        "sharded: 컬렉션 2개 동시 검색 후 병합",
+        lambda other, collection, embedding: merge_results(
+            list(
+                executor.map(
+                    lambda name: query_sharded(name, embedding, k), [collection, other]
+                )
+            ),
+            k,
+        ),
+        pairs,
+    )
+    measure(
+        "unified: $in 필터 1회 검색",
+        lambda other, collection, embedding: query_unified(
+            embedding, k, categories=[collection, other]
+        ),
+        pairs,
+    )
+
+    print("\n[전체 카테고리]")
+    sharded_all = measure(
+        f"sharded: 컬렉션 {len(COLLECTIONS)}개 순차 검색 후 병합",
+        lambda collection, embedding: merge_results(
+            [query_sharded(name, embedding, k) for name in COLLECTIONS], k
+        ),
+        samples,
+    )
+    measure(
+        f"sharded: 컬렉션 {len(COLLECTIONS)}개 동시 검색 후 병합",
+        lambda collection, embedding: merge_results(
+            list(executor.map(lambda name: query_sharded(name, embedding, k), COLLECTIONS)),
+            k,
+        ),
+        samples,
+    )
+    unified_all = measure(
+        "unified: 필터 없이 1회 검색",
+        lambda collection, embedding: query_unified(embedding, k),
+        samples,
+    )
+
+    # ANN 근사 차이 외에는 같은 결과여야 한다
+    single_overlap = np.mean(
+        [len(set(ids(a)) & set(ids(b))) / k for a, b in zip(sharded_single, unified_single)]
+    )
+    all_overlap = np.mean(
+        [len(set(ids(a)) & set(ids(b))) / k for a, b in zip(sharded_all, unified_all)]
+    )
+    print(f"\n상위 {k}개 일치율: 단일 카테고리 {single_overlap * 100:.1f}%, 전체 {all_overlap * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="sharded / unified 인덱스 검색 지연 시간 비교")
+    parser.add_argument("--samples", type=int, default=300, help="측정할 질문 수")
+    parser.add_argument("--k", type=int, default=5, help="검색 결과 수")
+    args = parser.parse_args()
+    main(args.samples, args.k)
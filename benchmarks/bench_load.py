@@ -0,0 +1,300 @@
+"""
+POST /chat에 동시 사용자 수를 단계적으로 올려 가며 요청을 보내는 부하 테스트
+단계(동시 사용자 수)마다 처리량, p50/p95/p99 지연 시간, 오류율과 답변 경로별 요청 수(GET /metrics 차이)를 출력하고
+결과를 JSON으로 저장하여 --compare로 이전 커밋의 결과와 비교할 수 있다.
+
+질문은 카테고리별 CSV(Data/category_csv)에서 뽑고, --drop 비율만큼 단어를 지워 저장된 FAQ와 똑같지 않은 질문을 섞는다.
+--spawn을 주면 OpenAI 호환 스텁 서버(benchmarks/openai_stub.py)와 FastAPI 서버를 직접 띄워 오프라인으로 측정한다.
+
+    uv run benchmarks/bench_load.py --spawn --concurrency 1 4 16 32 --duration 30 --output load.json
+    uv run benchmarks/bench_load.py --url http://127.0.0.1:8000 --compare load.json
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+CATEGORY_CSV_DIR = os.path.join(ROOT_DIR, "Data", "category_csv")
+# FastAPI가 예외를 잡아 200으로 돌려주는 오류 답변
+ERROR_PREFIXES = ("죄송합니다. 처리 중 오류가 발생했습니다", "오류:")
+
+
+def load_queries(count, drop_ratio, seed=0):
+    """카테고리별 CSV에서 질문을 뽑아 drop_ratio 비율의 질문은 [태그]를 떼고 단어 일부를 지운 질문 목록을 만드는 함수"""
+    frames = [pd.read_csv(path) for path in glob.glob(os.path.join(CATEGORY_CSV_DIR, "*.csv"))]
+    if not frames:
+        raise FileNotFoundError(f"카테고리 CSV가 없습니다: {CATEGORY_CSV_DIR}")
+    questions = pd.concat(frames, ignore_index=True)["질문"].dropna().astype(str).tolist()
+
+    rng = random.Random(seed)
+    queries = []
+    for question in rng.sample(questions, min(count, len(questions))):
+        if rng.random() < drop_ratio:
+            words = re.sub(r"^\s*\[[^\[\]]+\]\s*", "", question).split()
+            kept = [word for word in words if rng.random() >= 0.3] or words[:1]
+            question = " ".join(kept)
+        queries.append(question)
+    return queries
+
+
+async def fetch_metrics(client):
+    try:
+        response = await client.get("/metrics")
+        return response.json().get("requests", {})
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+async def worker(client, queries, rng, deadline, records, sessions):
+    """마감 시간까지 응답을 받자마자 다음 요청을 보내는 가상 사용자 (닫힌 루프)"""
+    session_id = uuid.uuid4().hex if sessions else None
+    while time.perf_counter() < deadline:
+        body = {"query": rng.choice(queries), "session_id": session_id}
+        start = time.perf_counter()
+        try:
+            response = await client.post("/chat", json=body)
+            ok = response.status_code == 200 and not str(
+                response.json().get("response", "")
+            ).startswith(ERROR_PREFIXES)
+        except (httpx.HTTPError, ValueError):
+            ok = False
+        records.append(((time.perf_counter() - start) * 1000, ok))
+
+
+async def run_stage(client, queries, concurrency, duration, seed, sessions):
+    """동시 사용자 concurrency명으로 duration초 동안 요청을 보내고 단계 결과를 반환하는 함수"""
+    before = await fetch_metrics(client)
+    records = []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(
+        *(
+            worker(client, queries, random.Random(seed * 1000 + i), deadline, records, sessions)
+            for i in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    after = await fetch_metrics(client)
+
+    latencies = np.array([latency for latency, _ in records] or [0.0])
+    errors = sum(1 for _, ok in records if not ok)
+    paths = Counter(after)
+    paths.subtract(before)
+    return {
+        "concurrency": concurrency,
+        "requests": len(records),
+        "errors": errors,
+        "error_rate": errors / len(records) if records else 0.0,
+        "throughput_rps": len(records) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+        "paths": {path: count for path, count in paths.items() if count and path != "requests"},
+    }
+
+
+async def run(url, queries, concurrencies, duration, warmup, sessions):
+    limits = httpx.Limits(max_connections=max(concurrencies), max_keepalive_connections=max(concurrencies))
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        if warmup > 0:
+            await run_stage(client, queries, min(concurrencies), warmup, seed=-1, sessions=sessions)
+
+        stages = []
+        for stage, concurrency in enumerate(concurrencies):
+            result = await run_stage(client, queries, concurrency, duration, stage, sessions)
+            print_stage(result)
+            stages.append(result)
+        return stages
+
+
+def print_header():
+    print(
+        f"{'동시 사용자':>10}{'요청 수':>8}{'처리량(rps)':>12}{'p50(ms)':>10}{'p95(ms)':>10}"
+        f"{'p99(ms)':>10}{'오류율':>8}  답변 경로"
+    )
+
+
+def print_stage(result):
+    paths = ", ".join(f"{path} {count}" for path, count in sorted(result["paths"].items()))
+    print(
+        f"{result['concurrency']:>10}{result['requests']:>8}{result['throughput_rps']:>12.2f}"
+        f"{result['p50_ms']:>10.0f}{result['p95_ms']:>10.0f}{result['p99_ms']:>10.0f}"
+        f"{result['error_rate'] * 100:>7.1f}%  {paths}"
+    )
+
+
+def compare(stages, baseline_path, max_regression):
+    """기준 결과와 동시 사용자 수가 같은 단계끼리 비교하여, 허용 비율을 넘게 나빠진 지표 목록을 반환하는 함수"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {stage["concurrency"]: stage for stage in json.load(f)["stages"]}
+
+    print(f"\n기준 결과와 비교: {baseline_path}")
+    print(f"{'동시 사용자':>10}{'처리량':>10}{'p95':>10}{'p99':>10}{'오류율':>10}")
+    regressions = []
+    for stage in stages:
+        base = baseline.get(stage["concurrency"])
+        if base is None:
+            continue
+        changes = {
+            key: (stage[key] - base[key]) / base[key] if base[key] else 0.0
+            for key in ("throughput_rps", "p95_ms", "p99_ms")
+        }
+        error_delta = stage["error_rate"] - base["error_rate"]
+        print(
+            f"{stage['concurrency']:>10}{changes['throughput_rps'] * 100:>+9.1f}%"
+            f"{changes['p95_ms'] * 100:>+9.1f}%{changes['p99_ms'] * 100:>+9.1f}%{error_delta * 100:>+9.1f}p"
+        )
+        if changes["throughput_rps"] < -max_regression:
+            regressions.append(f"동시 사용자 {stage['concurrency']}: 처리량 {changes['throughput_rps'] * 100:+.1f}%")
+        if changes["p95_ms"] > max_regression:
+            regressions.append(f"동시 사용자 {stage['concurrency']}: p95 {changes['p95_ms'] * 100:+.1f}%")
+        if error_delta > 0.01:
+            regressions.append(f"동시 사용자 {stage['concurrency']}: 오류율 {error_delta * 100:+.1f}%p")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def wait_until_ready(url, process, timeout=120):
+    """서버가 응답할 때까지 기다리는 함수"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"서버가 종료되었습니다: {' '.join(process.args)}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise TimeoutError(f"서버 응답 대기 시간 초과: {url}")
+
+
+def spawn_servers(args):
+    """OpenAI 호환 스텁 서버와 스텁에 연결한 FastAPI 서버를 띄우는 함수"""
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    stub = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(ROOT_DIR, "benchmarks", "openai_stub.py"),
+            "--port", str(args.stub_port),
+            "--latency-ms", str(args.stub_latency_ms),
+            "--jitter-ms", str(args.stub_jitter_ms),
+            "--error-rate", str(args.stub_error_rate),
+        ],
+        cwd=ROOT_DIR,
+    )
+    wait_until_ready(f"{stub_url}/docs", stub)
+
+    env = dict(os.environ, OPENAI_BASE_URL=f"{stub_url}/v1", OPENAI_API_KEY="stub")
+    app = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "fast_api:app",
+            "--port", str(args.app_port), "--log-level", "warning",
+        ],
+        cwd=ROOT_DIR,
+        env=env,
+    )
+    processes = [stub, app]
+    try:
+        wait_until_ready(f"http://127.0.0.1:{args.app_port}/metrics", app)
+    except Exception:
+        stop_servers(processes)
+        raise
+    return f"http://127.0.0.1:{args.app_port}", processes
+
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(args):
+    """부하 단계를 실행하여 결과를 출력/저장하고, 기준 결과보다 나빠졌으면 종료 코드 1을 반환하는 메인 함수"""
+    queries = load_queries(args.queries, args.drop)
+    url, processes = spawn_servers(args) if args.spawn else (args.url, [])
+    print(
+        f"대상 {url}, 질문 {len(queries)}개, 단계당 {args.duration}초, "
+        f"세션 {'사용' if args.sessions else '미사용'}{' (스텁 서버)' if args.spawn else ''}\n"
+    )
+    print_header()
+    try:
+        stages = asyncio.run(
+            run(url, queries, args.concurrency, args.duration, args.warmup, args.sessions)
+        )
+    finally:
+        stop_servers(processes)
+
+    if args.output:
+        result = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "config": {
+                "url": url,
+                "spawn": args.spawn,
+                "stub_latency_ms": args.stub_latency_ms if args.spawn else None,
+                "queries": len(queries),
+                "drop": args.drop,
+                "duration": args.duration,
+                "sessions": args.sessions,
+            },
+            "stages": stages,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+    if args.compare:
+        regressions = compare(stages, args.compare, args.max_regression)
+        if regressions:
+            print("\n⚠️ 성능 저하:\n" + "\n".join(f"- {line}" for line in regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="POST /chat 동시 사용자 단계별 처리량/지연 시간/오류율 부하 테스트")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="FastAPI 서버 주소 (--spawn이면 무시)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32], help="단계별 동시 사용자 수")
+    parser.add_argument("--duration", type=float, default=30, help="단계별 측정 시간(초)")
+    parser.add_argument("--warmup", type=float, default=5, help="측정 전 예열 시간(초)")
+    parser.add_argument("--queries", type=int, default=500, help="CSV에서 뽑을 질문 수")
+    parser.add_argument("--drop", type=float, default=0.7, help="단어 일부를 지워 FAQ와 다르게 만들 질문 비율")
+    parser.add_argument("--sessions", action="store_true", help="가상 사용자마다 session_id를 두어 멀티턴 대화로 보낸다")
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", help="비교할 기준 결과 JSON 파일")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="처리량/p95가 이 비율보다 나빠지면 종료 코드 1")
+    parser.add_argument("--spawn", action="store_true", help="스텁 서버와 FastAPI 서버를 직접 띄워 측정한다")
+    parser.add_argument("--app-port", type=int, default=8010)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--stub-latency-ms", type=float, default=300, help="스텁 서버 응답 지연 시간")
+    parser.add_argument("--stub-jitter-ms", type=float, default=100)
+    parser.add_argument("--stub-error-rate", type=float, default=0)
+    sys.exit(main(parser.parse_args()))
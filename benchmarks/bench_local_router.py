@@ -0,0 +1,172 @@
+"""
+카테고리가 표시된 CSV(Data/category_csv)를 기준으로 로컬 라우터의 정확도, 로컬 처리 비율, 지연 시간을 측정하는 벤치마크
+--llm N 옵션을 주면 같은 질문 N개를 GPT 라우팅으로도 보내 정확도와 지연 시간을 비교한다
+"""
+
+import argparse
+import asyncio
+import glob
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.join(ROOT_DIR, "Functioncall"))
+
+from VectorStore.categories import CATEGORY_COLLECTIONS
+from VectorStore.retriever import chroma_client
+from local_router import classify, keyword_collection
+
+CATEGORY_CSV_DIR = os.path.join(ROOT_DIR, "Data", "category_csv")
+
+
+def load_labeled_questions():
+    """카테고리별 CSV에서 (질문 ID, 질문, 정답 컬렉션) 목록을 읽는 함수"""
+    frames = [pd.read_csv(path) for path in glob.glob(os.path.join(CATEGORY_CSV_DIR, "*.csv"))]
+    df = pd.concat(frames, ignore_index=True)
+    df["collection"] = df["카테고리"].map(CATEGORY_COLLECTIONS)
+    return df.dropna(subset=["collection"])
+
+
+def load_stored_embeddings():
+    """ChromaDB에 저장된 질문 임베딩을 {질문 ID: (컬렉션 이름, 벡터)} 형태로 읽는 함수"""
+    stored = {}
+    for collection_name in CATEGORY_COLLECTIONS.values():
+        try:
+            collection = chroma_client.get_collection(collection_name)
+        except Exception as e:
+            print(f"⚠️ {collection_name} 컬렉션 없음: {e}")
+            continue
+        data = collection.get(include=["embeddings", "metadatas"])
+        for metadata, embedding in zip(data["metadatas"], data["embeddings"]):
+            vector = np.asarray(embedding, dtype=np.float32)
+            stored[str(metadata["question_id"])] = (
+                collection_name,
+                vector / (np.linalg.norm(vector) or 1.0),
+            )
+    return stored
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def accuracy(predicted, label):
+    """예측과 정답이 일치하는 비율(%)을 반환하는 함수 (대상이 없으면 0)"""
+    return float((predicted == label).mean() * 100) if len(predicted) else 0.0
+
+
+async def measure_llm_routing(samples):
+    """샘플 질문들을 GPT 라우팅으로 보내 (정답 여부, 지연 시간) 목록을 반환하는 함수"""
+    from ask_functioncall import build_routing_messages, route_query
+    from function_to_call import parse_search_tool_call
+
+    results = []
+    for question, label in samples:
+        start = time.perf_counter()
+        response = await route_query(build_routing_messages(question))
+        elapsed = (time.perf_counter() - start) * 1000
+        tool_calls = response.choices[0].message.tool_calls or []
+        parsed = parse_search_tool_call(tool_calls[0]) if tool_calls else None
+        predicted = parsed[1] if parsed else None
+        results.append((predicted == label, elapsed))
+    return results
+
+
+def main(llm_samples: int = 0):
+    """로컬 라우터를 라벨된 질문 전체에 적용하여 정확도/처리 비율/지연 시간을 출력하는 메인 함수"""
+    df = load_labeled_questions()
+    stored = load_stored_embeddings()
+
+    # 자기 자신을 제외한 중심점(leave-one-out)으로 평가하기 위해 컬렉션별 합계를 미리 계산
+    sums = {}
+    counts = {}
+    for collection_name, vector in stored.values():
+        sums[collection_name] = sums.get(collection_name, 0) + vector
+        counts[collection_name] = counts.get(collection_name, 0) + 1
+    names = list(sums)
+
+    def centroid(name, exclude=None):
+        total, count = sums[name], counts[name]
+        if exclude is not None:
+            total, count = total - exclude, count - 1
+        vector = total / max(count, 1)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    base_matrix = np.vstack([centroid(name) for name in names])
+
+    rows = []
+    latencies = []
+    for question_id, question, label in zip(
+        df["ID"].astype(str), df["질문"].astype(str), df["collection"]
+    ):
+        if question_id not in stored:
+            continue
+        own_collection, vector = stored[question_id]
+        matrix = base_matrix.copy()
+        matrix[names.index(own_collection)] = centroid(own_collection, exclude=vector)
+
+        start = time.perf_counter()
+        decision = classify(question, vector, (names, matrix))
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+        rows.append(
+            {
+                "label": label,
+                "decided": decision["collection"],
+                "centroid": decision["centroid_collection"],
+                "keyword": keyword_collection(question),
+            }
+        )
+
+    result = pd.DataFrame(rows)
+    decided = result[result["decided"].notna()]
+
+    print(f"평가 질문: {len(result)}개\n")
+    print(f"로컬 처리 비율 (GPT 라우팅 생략): {len(decided) / len(result) * 100:.1f}%")
+    print(f"로컬 처리 질문 정확도: {accuracy(decided['decided'], decided['label']):.1f}%")
+    print(f"중심점 1위 정확도 (전체): {accuracy(result['centroid'], result['label']):.1f}%")
+    keyword_rows = result[result["keyword"].notna()]
+    print(
+        f"키워드 규칙 정확도 (매칭된 {len(keyword_rows)}개): "
+        f"{accuracy(keyword_rows['keyword'], keyword_rows['label']):.1f}%"
+    )
+    print(
+        f"로컬 판단 지연 시간: p50 {percentile(latencies, 50):.1f}µs, "
+        f"p95 {percentile(latencies, 95):.1f}µs (질문 임베딩 제외)\n"
+    )
+
+    print("카테고리별:")
+    for label, group in result.groupby("label"):
+        group_decided = group[group["decided"].notna()]
+        print(
+            f"  - {label:<32} {len(group):5d}개  로컬 처리 {len(group_decided) / len(group) * 100:5.1f}%  "
+            f"정확도 {accuracy(group_decided['decided'], group_decided['label']):5.1f}%"
+        )
+
+    if llm_samples:
+        samples = random.Random(0).sample(
+            list(zip(df["질문"].astype(str), df["collection"])),
+            min(llm_samples, len(df)),
+        )
+        llm_results = asyncio.run(measure_llm_routing(samples))
+        llm_latencies = [elapsed for _, elapsed in llm_results]
+        print(
+            f"\nGPT 라우팅 ({len(llm_results)}개): 정확도 "
+            f"{sum(correct for correct, _ in llm_results) / len(llm_results) * 100:.1f}%, "
+            f"p50 {percentile(llm_latencies, 50):.0f}ms, p95 {percentile(llm_latencies, 95):.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 라우터 정확도/지연 시간 측정")
+    parser.add_argument(
+        "--llm", type=int, default=0, help="비교를 위해 GPT 라우팅으로도 보낼 질문 수"
+    )
+    args = parser.parse_args()
+    main(llm_samples=args.llm)
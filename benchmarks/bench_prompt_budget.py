@@ -0,0 +1,113 @@
+"""
+검색된 질문/답변 예시를 모두 넣는 기존 프롬프트와 토큰 예산(PROMPT_TOKEN_BUDGET)에 맞춰 조립한 프롬프트의
+토큰 수 분포(평균, p50, p95, 최대)와 조립 시간을 비교하는 벤치마크
+질문 임베딩은 이미 저장된 임베딩을 사용하므로 OpenAI API를 호출하지 않는다 (벡터 검색만 사용)
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(os.path.dirname(__file__))), "Functioncall")
+)
+
+from Functioncall.answer_retriever import (
+    extract_ids_from_results,
+    lookup_answer_tokens,
+    lookup_answers,
+)
+from Functioncall.prompt.system_setup import ANSWER_SYSTEM_PROMPT, PROMPT_TEMPLATE
+from Functioncall.prompt.template import budgeted_prompt_template
+from VectorStore.categories import CATEGORY_COLLECTIONS
+from VectorStore.retriever import chroma_client, query_collection
+from VectorStore.token_counter import count_tokens
+
+COLLECTIONS = list(CATEGORY_COLLECTIONS.values())
+
+
+def load_samples(count, seed=0):
+    """카테고리별 컬렉션에서 (컬렉션 이름, 질문, 임베딩) 샘플을 뽑는 함수"""
+    samples = []
+    for collection_name in COLLECTIONS:
+        data = chroma_client.get_collection(collection_name).get(
+            include=["embeddings", "metadatas"]
+        )
+        samples.extend(
+            (collection_name, metadata.get("question", ""), list(embedding))
+            for metadata, embedding in zip(data["metadatas"], data["embeddings"])
+        )
+    return random.Random(seed).sample(samples, min(count, len(samples)))
+
+
+def passages_of(results):
+    """검색 결과를 순위순 (질문 ID, 질문, 정리된 답변, 답변 토큰 수) 목록으로 바꾸는 함수"""
+    ids = extract_ids_from_results(results)
+    questions = [metadata.get("question") for metadata in results["metadatas"][0]]
+    return list(zip(ids, questions, lookup_answers(ids, cleaned=True), lookup_answer_tokens(ids)))
+
+
+def summary(tokens):
+    tokens = np.asarray(tokens)
+    return (
+        f"{tokens.mean():>8.0f}{np.percentile(tokens, 50):>8.0f}"
+        f"{np.percentile(tokens, 95):>8.0f}{tokens.max():>8.0f}"
+    )
+
+
+def main(samples_count, k, budget, passage_max_tokens, min_passage_tokens):
+    """질문마다 예산 없이 / 예산을 두고 프롬프트를 조립하여 토큰 수 분포와 조립 시간을 출력하는 메인 함수"""
+    samples = load_samples(samples_count)
+    print(
+        f"질문 {len(samples)}개, k={k}, 예산 {budget} 토큰, "
+        f"예시 답변 최대 {passage_max_tokens} / 최소 {min_passage_tokens} 토큰\n"
+    )
+
+    unbounded, budgeted, latencies = [], [], []
+    trimmed = dropped = 0
+    for collection_name, question, embedding in samples:
+        passages = passages_of(query_collection(collection_name, embedding, k))
+
+        message, _ = budgeted_prompt_template(PROMPT_TEMPLATE, question, passages, 0)
+        unbounded.append(count_tokens(ANSWER_SYSTEM_PROMPT) + count_tokens(message))
+
+        start = time.perf_counter()
+        message, info = budgeted_prompt_template(
+            PROMPT_TEMPLATE,
+            question,
+            passages,
+            budget,
+            passage_max_tokens=passage_max_tokens,
+            min_passage_tokens=min_passage_tokens,
+            system_prompt=ANSWER_SYSTEM_PROMPT,
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        # 보고값(조각별 합)이 아니라 실제 프롬프트 토큰 수로 비교
+        budgeted.append(count_tokens(ANSWER_SYSTEM_PROMPT) + count_tokens(message))
+        trimmed += info["trimmed"]
+        dropped += info["dropped"]
+
+    print(f"{'':<12}{'평균':>8}{'p50':>8}{'p95':>8}{'최대':>8}")
+    print(f"{'예산 없음':<12}{summary(unbounded)}")
+    print(f"{'예산 적용':<12}{summary(budgeted)}")
+    print(f"\n예산 초과 프롬프트: {np.mean(np.asarray(budgeted) > budget) * 100:.1f}%")
+    print(f"잘린 예시 {trimmed}개, 뺀 예시 {dropped}개 (질문당 {(trimmed + dropped) / len(samples):.2f}개)")
+    print(
+        f"조립 시간: p50 {np.percentile(latencies, 50):.2f}ms, p95 {np.percentile(latencies, 95):.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="토큰 예산 적용 전후 답변 생성 프롬프트 크기 비교")
+    parser.add_argument("--samples", type=int, default=300, help="측정할 질문 수")
+    parser.add_argument("--k", type=int, default=5, help="프롬프트에 넣을 질문 수")
+    parser.add_argument("--budget", type=int, default=3000, help="프롬프트 토큰 예산")
+    parser.add_argument("--passage-max-tokens", type=int, default=600, help="예시 답변 하나의 최대 토큰 수")
+    parser.add_argument("--passage-min-tokens", type=int, default=80, help="잘라 넣을 최소 토큰 수")
+    args = parser.parse_args()
+    main(args.samples, args.k, args.budget, args.passage_max_tokens, args.passage_min_tokens)
@@ -0,0 +1,97 @@
+"""
+GPT 라우팅 요청에 보내는 함수 정의와 시스템 프롬프트를 기존 방식(카테고리별 검색 함수 6개, ROUTING_MODE=full)과
+압축 방식(faq_search 함수 하나 + 카테고리 요약 프롬프트, ROUTING_MODE=compact)으로 비교하는 벤치마크
+--samples N 옵션을 주면 라벨된 질문 N개를 두 방식으로 번갈아 보내 실제 prompt_tokens, 라우팅 정확도, 지연 시간을 측정한다 (OPENAI_API_KEY 필요)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.join(ROOT_DIR, "Functioncall"))
+
+from bench_local_router import load_labeled_questions
+from function_description import Compact_Function_Description, Function_Description
+from prompt.system_setup import COMPACT_SYSTEM_SETUP, SYSTEM_SETUP
+from VectorStore.token_counter import count_tokens
+
+MODES = {
+    "full": (SYSTEM_SETUP, Function_Description),
+    "compact": (COMPACT_SYSTEM_SETUP, Compact_Function_Description),
+}
+
+
+def local_size(system_prompt, tools):
+    """(시스템 프롬프트 + 함수 정의 JSON)의 글자 수와 로컬 토큰 수 추정치를 반환하는 함수
+
+    OpenAI가 함수 정의를 프롬프트로 바꾸는 형식은 공개되어 있지 않으므로 JSON 직렬화 기준의 추정치이다.
+    """
+    tools_json = json.dumps(tools, ensure_ascii=False)
+    return len(system_prompt) + len(tools_json), count_tokens(system_prompt) + count_tokens(tools_json)
+
+
+async def measure(samples):
+    """샘플 질문마다 두 방식을 번갈아 호출하여 방식별 (정답 여부, prompt_tokens, 지연 시간) 목록을 반환하는 함수"""
+    from ask_functioncall import route_query
+    from function_to_call import parse_search_tool_call
+
+    results = {mode: [] for mode in MODES}
+    for i, (question, label) in enumerate(samples):
+        # 호출 순서에 따른 편향이 없도록 질문마다 순서를 바꾼다
+        modes = list(MODES) if i % 2 == 0 else list(reversed(MODES))
+        for mode in modes:
+            system_prompt, tools = MODES[mode]
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": question},
+            ]
+            start = time.perf_counter()
+            response = await route_query(messages, tools=tools)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            tool_calls = response.choices[0].message.tool_calls or []
+            parsed = parse_search_tool_call(tool_calls[0]) if tool_calls else None
+            predicted = parsed[1] if parsed else None
+            results[mode].append((predicted == label, response.usage.prompt_tokens, elapsed))
+    return results
+
+
+def main(samples_count):
+    """두 방식의 요청 크기를 출력하고, samples_count가 있으면 실제 API 호출로 토큰/정확도/지연 시간을 비교하는 메인 함수"""
+    print(f"{'방식':<10}{'함수 수':>8}{'글자 수':>10}{'토큰(추정)':>12}")
+    for mode, (system_prompt, tools) in MODES.items():
+        chars, tokens = local_size(system_prompt, tools)
+        print(f"{mode:<10}{len(tools):>8}{chars:>10}{tokens:>12}")
+
+    if not samples_count:
+        return
+
+    df = load_labeled_questions()
+    samples = random.Random(0).sample(
+        list(zip(df["질문"].astype(str), df["collection"])), min(samples_count, len(df))
+    )
+    results = asyncio.run(measure(samples))
+
+    print(f"\n질문 {len(samples)}개 (gpt-4o 라우팅 호출)")
+    print(f"{'방식':<10}{'prompt_tokens':>14}{'정확도':>10}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for mode, rows in results.items():
+        correct, prompt_tokens, latencies = (np.array(column) for column in zip(*rows))
+        print(
+            f"{mode:<10}{prompt_tokens.mean():>14.0f}{correct.mean() * 100:>9.1f}%"
+            f"{np.percentile(latencies, 50):>10.0f}{np.percentile(latencies, 95):>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="라우팅 함수 정의 기존 방식 vs 압축 방식 요청 크기/정확도/지연 시간 비교")
+    parser.add_argument("--samples", type=int, default=0, help="실제 GPT 라우팅으로 보낼 질문 수")
+    args = parser.parse_args()
+    main(args.samples)
@@ -0,0 +1,143 @@
+"""
+ChromaDB 백엔드와 NumPy(메모리 맵 .npy 전수 검색) 백엔드의 검색 지연 시간과 결과 일치도를 비교하는 벤치마크
+NumPy 인덱스가 있어야 하므로 먼저 `python chromaDB.py --layout both --export-numpy`로 인덱스를 만든다
+질문 임베딩은 이미 저장된 임베딩을 사용하므로 OpenAI API를 호출하지 않는다
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.categories import CATEGORY_COLLECTIONS, UNIFIED_COLLECTION
+from VectorStore.retriever import chroma_client, numpy_index_dir
+from VectorStore.vector_backend import ChromaBackend, NumpyBackend
+
+COLLECTIONS = list(CATEGORY_COLLECTIONS.values())
+
+
+def load_samples(count, seed=0):
+    """카테고리별 컬렉션에서 (컬렉션 이름, 임베딩) 샘플을 뽑는 함수"""
+    samples = []
+    for collection_name in COLLECTIONS:
+        data = chroma_client.get_collection(collection_name).get(include=["embeddings"])
+        samples.extend((collection_name, list(embedding)) for embedding in data["embeddings"])
+    return random.Random(seed).sample(samples, min(count, len(samples)))
+
+
+def measure(name, func, samples, per_call=1):
+    """샘플마다 func를 실행하여 질문 1개당 지연 시간(ms) p50/p95/평균을 출력하는 함수"""
+    latencies = []
+    results = []
+    for sample in samples:
+        start = time.perf_counter()
+        results.append(func(*sample))
+        latencies.append((time.perf_counter() - start) * 1000 / per_call)
+    print(
+        f"{name:<44} p50 {np.percentile(latencies, 50):7.3f}ms  "
+        f"p95 {np.percentile(latencies, 95):7.3f}ms  평균 {np.mean(latencies):7.3f}ms"
+    )
+    return results
+
+
+def ids(results, row=0):
+    return [metadata["question_id"] for metadata in results["metadatas"][row]]
+
+
+def overlap(results_a, results_b, k):
+    return np.mean([len(set(ids(a)) & set(ids(b))) / k for a, b in zip(results_a, results_b)])
+
+
+def main(samples_count: int, k: int, batch_size: int):
+    """컬렉션별/통합 컬렉션/배치 검색의 지연 시간과 상위 k개 일치율을 출력하는 메인 함수"""
+    chroma = ChromaBackend(chroma_client)
+    numpy_backend = NumpyBackend(numpy_index_dir)
+    samples = load_samples(samples_count)
+    print(f"질문 {len(samples)}개, k={k}, 배치 크기 {batch_size}\n")
+
+    # 첫 조회에서 메모리 맵을 여는 비용은 제외
+    for collection_name in COLLECTIONS + [UNIFIED_COLLECTION]:
+        numpy_backend.query(collection_name, [samples[0][1]], k)
+
+    print("[카테고리 컬렉션]")
+    chroma_single = measure(
+        "chroma: 컬렉션 검색",
+        lambda collection, embedding: chroma.query(collection, [embedding], k),
+        samples,
+    )
+    numpy_single = measure(
+        "numpy: 컬렉션 검색",
+        lambda collection, embedding: numpy_backend.query(collection, [embedding], k),
+        samples,
+    )
+
+    print("\n[통합 컬렉션]")
+    chroma_filtered = measure(
+        "chroma: category 필터 검색",
+        lambda collection, embedding: chroma.query(
+            UNIFIED_COLLECTION, [embedding], k, categories=collection
+        ),
+        samples,
+    )
+    numpy_filtered = measure(
+        "numpy: category 필터 검색",
+        lambda collection, embedding: numpy_backend.query(
+            UNIFIED_COLLECTION, [embedding], k, categories=collection
+        ),
+        samples,
+    )
+    chroma_all = measure(
+        "chroma: 전체 검색",
+        lambda collection, embedding: chroma.query(UNIFIED_COLLECTION, [embedding], k),
+        samples,
+    )
+    numpy_all = measure(
+        "numpy: 전체 검색",
+        lambda collection, embedding: numpy_backend.query(UNIFIED_COLLECTION, [embedding], k),
+        samples,
+    )
+
+    print(f"\n[통합 컬렉션 배치 검색, 질문 1개당]")
+    batches = [
+        ([embedding for _, embedding in samples[i : i + batch_size]],)
+        for i in range(0, len(samples) - batch_size + 1, batch_size)
+    ]
+    measure(
+        f"chroma: 질문 {batch_size}개 한 번에 검색",
+        lambda embeddings: chroma.query(UNIFIED_COLLECTION, embeddings, k),
+        batches,
+        per_call=batch_size,
+    )
+    measure(
+        f"numpy: 질문 {batch_size}개 행렬곱 1회",
+        lambda embeddings: numpy_backend.query(UNIFIED_COLLECTION, embeddings, k),
+        batches,
+        per_call=batch_size,
+    )
+
+    # NumPy는 정확한 전수 검색이므로 차이는 ChromaDB HNSW 근사에서 생긴다
+    print(
+        f"\n상위 {k}개 일치율: 컬렉션 {overlap(chroma_single, numpy_single, k) * 100:.1f}%, "
+        f"필터 {overlap(chroma_filtered, numpy_filtered, k) * 100:.1f}%, "
+        f"전체 {overlap(chroma_all, numpy_all, k) * 100:.1f}%"
+    )
+    distance_gap = max(
+        abs(a["distances"][0][0] - b["distances"][0][0])
+        for a, b in zip(chroma_all, numpy_all)
+        if ids(a)[0] == ids(b)[0]
+    )
+    print(f"1위 결과가 같을 때 거리 차이 최대값: {distance_gap:.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ChromaDB / NumPy 벡터 백엔드 검색 지연 시간 비교")
+    parser.add_argument("--samples", type=int, default=300, help="측정할 질문 수")
+    parser.add_argument("--k", type=int, default=5, help="검색 결과 수")
+    parser.add_argument("--batch-size", type=int, default=32, help="배치 검색 질문 수")
+    args = parser.parse_args()
+    main(args.samples, args.k, args.batch_size)
@@ -0,0 +1,333 @@
+"""
+인터넷과 API 키 없이 파이프라인 전체를 실행/측정하기 위한 OpenAI 호환 로컬 스텁 서버
+chat completions(함수 호출, 스트리밍 포함)와 embeddings 엔드포인트를 흉내 낸다.
+
+- 임베딩: 문자 2/3-gram을 해시하여 만든 결정적 벡터 (글자가 많이 겹치는 문장끼리 가깝다)
+- 라우팅: 함수 정의가 있는 요청은 --routes 파일(질문 -> 컬렉션 이름) 또는 키워드 분류기로 카테고리를 정해 검색 함수를 호출한다
+  (어느 카테고리에도 해당하지 않으면 함수를 호출하지 않아 폴백 답변으로 간다)
+- 답변: 사용자 메시지 해시로 만든 결정적 답변, 스트리밍이면 단어 단위로 나눠 보낸다
+- 지연 시간(--latency-ms, --jitter-ms, --token-delay-ms)과 오류 응답(--error-rate, --error-status)을 설정할 수 있다
+
+실행 (프로젝트 루트에서):
+    uv run benchmarks/openai_stub.py --port 8100 --latency-ms 300
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub uvicorn fast_api:app
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from VectorStore.categories import CATEGORY_COLLECTIONS, COLLECTION_FUNCTIONS
+from VectorStore.categorize_to_csv import smart_categorize_questions
+
+DEFAULT_DIMENSIONS = 1536
+# OpenAI 프롬프트 캐시와 같이 1024 토큰 이상인 고정 접두사만 128 토큰 단위로 캐시된 것으로 보고한다
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+
+settings = argparse.Namespace(
+    latency_ms=0.0,
+    jitter_ms=0.0,
+    token_delay_ms=0.0,
+    error_rate=0.0,
+    error_status=500,
+    answer_words=40,
+    routes={},
+)
+rng = random.Random(0)
+# 이전 요청에서 본 고정 접두사(함수 정의 + 첫 시스템 메시지) 해시
+seen_prefixes = set()
+
+app = FastAPI()
+
+
+def estimate_tokens(text):
+    """토크나이저 없이 토큰 수를 추정하는 함수 (UTF-8 3바이트당 1토큰, 한국어는 대략 글자당 1토큰)"""
+    return max(1, len(text.encode("utf-8")) // 3) if text else 0
+
+
+def text_embedding(text, dimensions=DEFAULT_DIMENSIONS):
+    """문자 2/3-gram을 차원에 해시하여 단위 벡터로 만드는 함수 (같은 입력은 항상 같은 벡터)"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    compact = " ".join(text.lower().split())
+    grams = [compact[i : i + n] for n in (2, 3) for i in range(len(compact) - n + 1)] or [compact]
+    for gram in grams:
+        digest = hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        return vector
+    return vector / norm
+
+
+def last_user_message(messages):
+    for message in reversed(messages):
+        if message.get("role") == "user" and isinstance(message.get("content"), str):
+            return message["content"]
+    return ""
+
+
+def route_collection(query):
+    """질문의 카테고리 컬렉션 이름을 정하는 함수 (--routes 파일 우선, 없으면 키워드 분류, 해당 없으면 None)"""
+    if query in settings.routes:
+        return settings.routes[query]
+    category = smart_categorize_questions(query)
+    return None if category == "기타" else CATEGORY_COLLECTIONS[category]
+
+
+def routing_tool_call(tools, query):
+    """함수 정의 목록에 맞춰 질문 카테고리의 검색 함수 호출을 만드는 함수 (호출할 함수가 없으면 None)"""
+    collection_name = route_collection(query)
+    if collection_name is None:
+        return None
+
+    names = {tool["function"]["name"] for tool in tools if tool.get("type") == "function"}
+    if "faq_search" in names:
+        name, arguments = "faq_search", {"category": collection_name, "text": query}
+    elif COLLECTION_FUNCTIONS.get(collection_name) in names:
+        name, arguments = COLLECTION_FUNCTIONS[collection_name], {"text": query}
+    else:
+        return None
+    return {
+        "id": f"call_{uuid.uuid4().hex[:24]}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)},
+    }
+
+
+def answer_text(messages):
+    """사용자 메시지 해시로 결정적인 답변 문장을 만드는 함수 (settings.answer_words 단어)"""
+    digest = hashlib.sha1(last_user_message(messages).encode("utf-8")).hexdigest()
+    words = [f"답변{digest[i % 32]}" for i in range(max(settings.answer_words - 2, 0))]
+    return " ".join(["스텁", digest[:8]] + words)
+
+
+def usage_of(body, completion_text):
+    """요청 메시지와 함수 정의로 토큰 사용량을 추정하는 함수
+
+    함수 정의와 첫 시스템 메시지를 고정 접두사로 보고, 이전에 본 접두사이면 cached_tokens로 보고한다.
+    """
+    messages = body.get("messages") or []
+    tools_json = json.dumps(body.get("tools") or [], ensure_ascii=False, sort_keys=True)
+    first = messages[0]["content"] if messages and messages[0].get("role") == "system" else ""
+    prompt_tokens = estimate_tokens(tools_json if body.get("tools") else "") + sum(
+        estimate_tokens(message.get("content") or "") for message in messages
+    )
+
+    prefix_tokens = estimate_tokens(tools_json if body.get("tools") else "") + estimate_tokens(first)
+    prefix_key = hashlib.sha1((tools_json + "\0" + first).encode("utf-8")).hexdigest()
+    cached_tokens = 0
+    if prefix_key in seen_prefixes and prefix_tokens >= CACHE_MIN_TOKENS:
+        cached_tokens = prefix_tokens // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS
+    seen_prefixes.add(prefix_key)
+
+    completion_tokens = estimate_tokens(completion_text)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+
+
+async def simulate_latency():
+    """설정한 지연 시간만큼 기다리고, 오류 비율에 따라 보낼 오류 응답을 반환하는 함수 (정상이면 None)"""
+    delay = settings.latency_ms + rng.uniform(-settings.jitter_ms, settings.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if rng.random() < settings.error_rate:
+        return JSONResponse(
+            status_code=settings.error_status,
+            content={
+                "error": {
+                    "message": "스텁 서버가 주입한 오류입니다.",
+                    "type": "stub_error",
+                    "code": settings.error_status,
+                }
+            },
+        )
+    return None
+
+
+def completion_chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+async def stream_completion(completion_id, model, text, usage, include_usage):
+    """답변을 단어 단위 청크로 나눠 server-sent events로 보내는 함수"""
+    yield f"data: {json.dumps(completion_chunk(completion_id, model, {'role': 'assistant', 'content': ''}))}\n\n"
+    for i, word in enumerate(text.split(" ")):
+        if settings.token_delay_ms > 0:
+            await asyncio.sleep(settings.token_delay_ms / 1000)
+        piece = word if i == 0 else " " + word
+        chunk = completion_chunk(completion_id, model, {"content": piece})
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    yield f"data: {json.dumps(completion_chunk(completion_id, model, {}, 'stop'))}\n\n"
+    if include_usage:
+        chunk = completion_chunk(completion_id, model, {})
+        chunk["choices"], chunk["usage"] = [], usage
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+async def stream_tool_call(completion_id, model, tool_call, usage, include_usage):
+    """함수 호출을 OpenAI 스트리밍 형식(delta.tool_calls: 이름 청크 뒤에 인자 조각 청크)으로 보내는 함수"""
+    first = {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "index": 0,
+                "id": tool_call["id"],
+                "type": "function",
+                "function": {"name": tool_call["function"]["name"], "arguments": ""},
+            }
+        ],
+    }
+    yield f"data: {json.dumps(completion_chunk(completion_id, model, first), ensure_ascii=False)}\n\n"
+    arguments = tool_call["function"]["arguments"]
+    for start in range(0, len(arguments), 16):
+        if settings.token_delay_ms > 0:
+            await asyncio.sleep(settings.token_delay_ms / 1000)
+        delta = {"tool_calls": [{"index": 0, "function": {"arguments": arguments[start : start + 16]}}]}
+        yield f"data: {json.dumps(completion_chunk(completion_id, model, delta), ensure_ascii=False)}\n\n"
+    yield f"data: {json.dumps(completion_chunk(completion_id, model, {}, 'tool_calls'))}\n\n"
+    if include_usage:
+        chunk = completion_chunk(completion_id, model, {})
+        chunk["choices"], chunk["usage"] = [], usage
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    error = await simulate_latency()
+    if error is not None:
+        return error
+
+    model = body.get("model", "gpt-4o")
+    messages = body.get("messages") or []
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+    tool_call = None
+    if body.get("tools") and body.get("tool_choice") != "none":
+        tool_call = routing_tool_call(body["tools"], last_user_message(messages))
+    text = None if tool_call else answer_text(messages)
+    usage = usage_of(body, text or tool_call["function"]["arguments"])
+
+    if body.get("stream"):
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        if tool_call:
+            # 비스트리밍 요청과 같은 함수 호출을 tool_calls 청크로 보낸다
+            events = stream_tool_call(completion_id, model, tool_call, usage, include_usage)
+        else:
+            events = stream_completion(completion_id, model, text, usage, include_usage)
+        return StreamingResponse(events, media_type="text/event-stream")
+
+    message = {"role": "assistant", "content": text}
+    if tool_call:
+        message["tool_calls"] = [tool_call]
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_call else "stop",
+            }
+        ],
+        "usage": usage,
+    }
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    error = await simulate_latency()
+    if error is not None:
+        return error
+
+    texts = body.get("input")
+    texts = [texts] if isinstance(texts, str) else list(texts)
+    dimensions = body.get("dimensions") or DEFAULT_DIMENSIONS
+    data = []
+    for index, text in enumerate(texts):
+        vector = text_embedding(str(text), dimensions)
+        # openai SDK는 기본으로 base64 형식을 요청한다
+        if body.get("encoding_format") == "base64":
+            embedding = base64.b64encode(vector.astype(np.float32).tobytes()).decode("ascii")
+        else:
+            embedding = vector.tolist()
+        data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+    prompt_tokens = sum(estimate_tokens(str(text)) for text in texts)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+    }
+
+
+def load_routes(path):
+    """--routes JSON 파일({질문: 컬렉션 이름 또는 null})을 읽는 함수"""
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        routes = json.load(f)
+    unknown = {value for value in routes.values() if value is not None} - set(COLLECTION_FUNCTIONS)
+    if unknown:
+        raise ValueError(f"알 수 없는 컬렉션 이름: {sorted(unknown)}")
+    return routes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="오프라인 벤치마크/테스트용 OpenAI 호환 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0, help="요청마다 기다릴 평균 지연 시간")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="지연 시간에 더할 균등 분포 잡음 폭 (±)")
+    parser.add_argument("--token-delay-ms", type=float, default=0, help="스트리밍 답변 단어 사이 지연 시간")
+    parser.add_argument("--error-rate", type=float, default=0, help="오류 응답을 보낼 요청 비율 (0~1)")
+    parser.add_argument("--error-status", type=int, default=500, help="주입할 오류의 HTTP 상태 코드 (429, 500 등)")
+    parser.add_argument("--answer-words", type=int, default=40, help="생성 답변 단어 수")
+    parser.add_argument("--routes", help="질문별 라우팅 결과 JSON 파일 ({질문: 컬렉션 이름 또는 null})")
+    parser.add_argument("--seed", type=int, default=0, help="지연 시간 잡음과 오류 주입 난수 시드")
+    args = parser.parse_args()
+
+    settings.latency_ms = args.latency_ms
+    settings.jitter_ms = args.jitter_ms
+    settings.token_delay_ms = args.token_delay_ms
+    settings.error_rate = args.error_rate
+    settings.error_status = args.error_status
+    settings.answer_words = args.answer_words
+    settings.routes = load_routes(args.routes)
+    rng.seed(args.seed)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -5,14 +5,22 @@ FastAPI 웹 서버 모듈
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+import json
 import sys
 import os
 import time
 
 # Functioncall 모듈 경로 추가
 sys.path.append(os.path.join(os.path.dirname(__file__), "Functioncall"))
-from Functioncall.ask_functioncall import ask_gpt_functioncall
+from Functioncall.ask_functioncall import (
+    ask_gpt_functioncall,
+    delete_chat_history,
+    get_metrics,
+    stream_gpt_functioncall,
+)
 
 app = FastAPI()
 
@@ -24,20 +32,29 @@ app.add_middleware(
 
 class ChatRequest(BaseModel):
     query: str
+    # session_id를 보내면 서버에 저장된 대화 기록을 사용하므로 chat_history는 보내지 않아도 된다
+    session_id: Optional[str] = Field(None, max_length=128)
     chat_history: list = []
 
 
 class ChatResponse(BaseModel):
     response: str
     tokens: int = 0
+    cached_tokens: int = 0
     time: float = 0
+    cached: bool = False
+    short_circuit: Optional[dict] = None
+    prompt: Optional[dict] = None
+    session_id: Optional[str] = None
 
 
 @app.post("/chat")
 async def chat(request: ChatRequest):
     """사용자 질문을 받아 GPT 함수 호출을 통해 답변을 생성하고 반환하는 API 엔드포인트"""
     try:
-        result = ask_gpt_functioncall(request.query, request.chat_history)
+        result = await ask_gpt_functioncall(
+            request.query, request.chat_history, request.session_id
+        )
 
         response_text = result.get("response", "응답 오류")
         usage = result.get("usage", {})
@@ -45,13 +62,55 @@ async def chat(request: ChatRequest):
         processing_time = result.get("time", 0)
 
         return ChatResponse(
-            response=response_text, tokens=total_tokens, time=round(processing_time, 2)
+            response=response_text,
+            tokens=total_tokens,
+            cached_tokens=usage.get("cached_tokens", 0),
+            time=round(processing_time, 2),
+            cached=result.get("cached", False),
+            short_circuit=result.get("short_circuit"),
+            prompt=result.get("prompt"),
+            session_id=request.session_id,
         )
 
     except Exception as e:
         return ChatResponse(response=f"오류: {str(e)}", tokens=0, time=0)
 
 
+def format_sse(event: str, data: dict) -> str:
+    """이벤트 이름과 데이터를 server-sent events 형식의 문자열로 변환하는 함수"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """/chat과 같은 요청을 받아 라우팅 결과, 검색된 FAQ, 답변 토큰, 사용량을 server-sent events로 스트리밍하는 API 엔드포인트"""
+
+    async def event_stream():
+        async for event, data in stream_gpt_functioncall(
+            request.query, request.chat_history, request.session_id
+        ):
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """서버에 저장된 세션의 대화 기록을 지우는 API 엔드포인트"""
+    await delete_chat_history(session_id)
+    return {"session_id": session_id, "deleted": True}
+
+
+@app.get("/metrics")
+async def metrics():
+    """답변 경로별 요청 수(FAQ 바로 응답, 시맨틱 캐시, GPT 생성 등)와 캐시 통계를 반환하는 API 엔드포인트"""
+    return await get_metrics()
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -3,24 +3,87 @@ FastAPI 서버와 통신하여 챗봇 인터페이스를 제공하는
 Streamlit 웹 애플리케이션 모듈
 """
 
+import json
+import uuid
+
 import streamlit as st
 import requests
 
 st.set_page_config(page_title="챗봇", page_icon="🤖")
 
-def call_api(query, history):
-    """FastAPI 서버의 /chat 엔드포인트를 호출하여 사용자 질문에 대한 답변을 요청하는 함수"""
+API_URL = "http://localhost:8000"
+
+
+def iter_sse(response):
+    """server-sent events 응답을 (이벤트 이름, 데이터) 튜플로 하나씩 변환하는 함수"""
+    event = "message"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        if line.startswith("event:"):
+            event = line[len("event:") :].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[len("data:") :].strip())
+            event = "message"
+
+
+def stream_api(query, session_id, result, status):
+    """FastAPI 서버의 /chat/stream 엔드포인트를 호출하여 답변 토큰을 받는 대로 내보내는 함수
+
+    라우팅 결과와 참고한 FAQ 질문은 status 영역에 표시하고, 토큰 사용량과 시간은 result에 저장한다.
+    """
     try:
-        response = requests.post("http://localhost:8000/chat", 
-                               json={"query": query, "chat_history": history}, 
-                               timeout=30)
-        if response.status_code == 200:
-            data = response.json()
-            return data
-        else:
-            return {"response": f"API 오류 (코드: {response.status_code})", "tokens": 0, "time": 0}
+        with requests.post(
+            f"{API_URL}/chat/stream",
+            json={"query": query, "session_id": session_id},
+            stream=True,
+            timeout=(5, 120),
+        ) as response:
+            if response.status_code != 200:
+                yield f"API 오류 (코드: {response.status_code})"
+                return
+
+            response.encoding = "utf-8"
+            status_lines = []
+            for event, data in iter_sse(response):
+                if event == "route" and data.get("function"):
+                    status_lines.append(f"🧭 검색 카테고리: {data['collection']}")
+                    status.caption("  \n".join(status_lines))
+                elif event == "retrieval":
+                    questions = ", ".join(
+                        item["question"] for item in data.get("questions", [])[:3]
+                    )
+                    status_lines.append(f"🔍 참고한 FAQ: {questions}")
+                    status.caption("  \n".join(status_lines))
+                elif event == "token":
+                    yield data["text"]
+                elif event == "done":
+                    if data.get("short_circuit"):
+                        status_lines.append(
+                            f"📌 FAQ 답변 그대로 사용 (ID: {data['short_circuit']['question_id']})"
+                        )
+                        status.caption("  \n".join(status_lines))
+                    elif data.get("cached"):
+                        status_lines.append(
+                            f"⚡ 비슷한 질문의 답변 재사용 (유사도 {data['cached']['similarity']})"
+                        )
+                        status.caption("  \n".join(status_lines))
+                    elif data.get("prompt"):
+                        prompt_info = data["prompt"]
+                        status_lines.append(
+                            f"🧾 프롬프트 {prompt_info['prompt_tokens']} 토큰 "
+                            f"(예시 {prompt_info['passages']}개, 잘림 {prompt_info['trimmed']}, 제외 {prompt_info['dropped']})"
+                        )
+                        status.caption("  \n".join(status_lines))
+                    if data["usage"].get("cached_tokens"):
+                        status_lines.append(f"♻️ 프롬프트 캐시 {data['usage']['cached_tokens']} 토큰")
+                        status.caption("  \n".join(status_lines))
+                    result["tokens"] = data["usage"].get("total_tokens", 0)
+                    result["time"] = round(data["timings"].get("total_ms", 0) / 1000, 2)
+                elif event == "error":
+                    yield data["message"]
     except Exception as e:
-        return {"response": f"연결 오류: {str(e)}", "tokens": 0, "time": 0}
+        yield f"연결 오류: {str(e)}"
 
 
 st.title("🤖 COXWAVE 과제 챗봇")
@@ -28,6 +91,9 @@ st.title("🤖 COXWAVE 과제 챗봇")
 # 세션 상태 초기화
 if "messages" not in st.session_state:
     st.session_state.messages = []
+# 대화 기록은 서버가 세션 ID별로 저장하므로 요청마다 새 질문만 보낸다
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # 채팅 기록 표시
 for msg in st.session_state.messages:
@@ -43,18 +109,20 @@ if user_input := st.chat_input("질문을 입력하세요..."):
     with st.chat_message("user"):
         st.write(user_input)
 
-    # AI 응답
+    # AI 응답 (생성되는 대로 표시)
     with st.chat_message("assistant"):
-        with st.spinner("답변 생성중..."):
-            result = call_api(user_input, st.session_state.messages[:-1])
-            st.write(result["response"])
-            if result.get("tokens", 0) > 0:
-                st.info(f"📊 토큰: {result['tokens']} | 시간: {result['time']}초")
+        status = st.empty()
+        result = {"tokens": 0, "time": 0}
+        response_text = st.write_stream(
+            stream_api(user_input, st.session_state.session_id, result, status)
+        )
+        if result["tokens"] > 0:
+            st.info(f"📊 토큰: {result['tokens']} | 시간: {result['time']}초")
 
     # AI 메시지 저장
     st.session_state.messages.append({
         "role": "assistant",
-        "content": result["response"],
-        "tokens": result.get("tokens", 0),
-        "time": result.get("time", 0)
+        "content": response_text,
+        "tokens": result["tokens"],
+        "time": result["time"]
     })